@@ -1,9 +1,19 @@
 # groundkg/candidates.py
 import sys
 import json
-import itertools
+import argparse
+import bisect
+import heapq
+import io
+import multiprocessing
+import os
 import re
 
+try:
+    from groundkg import pack_io
+except ImportError:  # run as a script: python groundkg/candidates.py
+    import pack_io
+
 SUBJ_LABELS = {"ORG", "PRODUCT", "PERSON", "FAC", "GPE", "EVENT", "LAW", "NORP"}
 OBJ_LABELS = {
     "ORG",
@@ -23,20 +33,42 @@ MAX_PAIRS_PER_SENT = 10  # cap to reduce noise
 NP_REGEX = re.compile(r"\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+){0,3})\b")
 
 
+def span_index(spans):
+    """
+    Purpose: Index spans for overlap queries: starts sorted ascending, plus the
+    running max of ends over that order. Works for nested/overlapping spans.
+    """
+    ordered = sorted((e["start"], e["end"]) for e in spans)
+    starts = [start for start, _ in ordered]
+    max_ends, top = [], float("-inf")
+    for _, end in ordered:
+        top = max(top, end)
+        max_ends.append(top)
+    return starts, max_ends
+
+
+def overlaps(index, start, end):
+    """True if [start, end) overlaps any indexed span (O(log n))."""
+    starts, max_ends = index
+    i = bisect.bisect_left(starts, end)  # spans starting before `end`
+    return i > 0 and max_ends[i - 1] > start
+
+
 def non_overlapping_chunks(sent_text, ents):
-    """ 
+    """
     Purpose: Extract noun phrases from a sentence that are not overlapping with any entity.
+    Matching and filtering happen in one pass over NP_REGEX; entity overlap is
+    a bisect into span_index(ents). Usable on any in-memory sentence.
     """
+    index = span_index(ents)
     chunks = []
     for m in NP_REGEX.finditer(sent_text):
         start, end = m.start(), m.end()
-        if end - start < 3:
-            continue
-        if any(not (end <= e["start"] or start >= e["end"]) for e in ents):
+        if end - start < 3 or overlaps(index, start, end):
             continue
         chunks.append(
             {
-                "text": sent_text[start:end],
+                "text": m.group(),
                 "start": start,
                 "end": end,
                 "label": "NOUNPHRASE",
@@ -45,53 +77,131 @@ def non_overlapping_chunks(sent_text, ents):
     return chunks
 
 
-def main():
-    ner_path = sys.argv[1]
-    with open(ner_path, "r", encoding="utf-8") as f:
-        for line in f:
-            sent = json.loads(line)
-            ents = sent.get("entities", [])
-            chunks = non_overlapping_chunks(sent["text"], ents)
-            objs_pool = ents + chunks
-            subs = [e for e in ents if e["label"] in SUBJ_LABELS] or ents or chunks
-            objs = [
-                e
-                for e in objs_pool
-                if (e["label"] in OBJ_LABELS or e["label"] == "NOUNPHRASE")
-            ] or objs_pool
-
-            # Build candidates with a simple proximity score (shorter span distance first)
-            pairs = []
-            seen_pairs = set()  # deduplicate by (subject text, object text)
-            for s, o in itertools.product(subs, objs):
+def select_pairs(subs, objs, max_dist=MAX_CHAR_DIST, k=MAX_PAIRS_PER_SENT):
+    """
+    Purpose: Pick the k closest (subject, object) pairs, closest first.
+    Same result as filtering itertools.product(subs, objs) and stable-sorting
+    by width, but objects are sorted by start so each subject only visits the
+    ones starting within max_dist after it, and a bounded heap keeps the top k.
+    """
+    order = sorted(range(len(objs)), key=lambda j: objs[j]["start"])
+    starts = [objs[j]["start"] for j in order]
+
+    def scored():
+        seen_pairs = set()  # deduplicate by (subject text, object text)
+        for s in subs:
+            # subject before object (reduces symmetric noise), within max_dist
+            lo = bisect.bisect_right(starts, s["start"])
+            hi = bisect.bisect_right(starts, s["start"] + max_dist, lo)
+            for j in sorted(order[lo:hi]):  # product order, so dedup keeps the same pair
+                o = objs[j]
                 if s is o:
                     continue
-                # enforce subject before object to reduce symmetric noise
-                if s["start"] >= o["start"]:
+                width = max(s["end"], o["end"]) - s["start"]  # lower is better
+                if width > max_dist:
                     continue
-                span_min = min(s["start"], o["start"])
-                span_max = max(s["end"], o["end"])
-                width = span_max - span_min
-                if width > MAX_CHAR_DIST:
-                    continue
-                # deduplicate: same subject-object text pair
                 pair_key = (s["text"].strip().lower(), o["text"].strip().lower())
                 if pair_key in seen_pairs:
                     continue
                 seen_pairs.add(pair_key)
-                prox = width  # lower is better
-                pairs.append((prox, s, o))
-            pairs.sort(key=lambda x: x[0])
-            for _, s, o in pairs[:MAX_PAIRS_PER_SENT]:
-                out = {
-                    "doc_id": sent["doc_id"],
-                    "sent_idx": sent["sent_idx"],
-                    "sent_start": sent["sent_start"],
-                    "text": sent["text"],
-                    "subject": s,
-                    "object": o,
-                }
-                sys.stdout.write(json.dumps(out, ensure_ascii=False) + "\n")
+                yield width, s, o
+
+    return [(s, o) for _, s, o in heapq.nsmallest(k, scored(), key=lambda p: p[0])]
+
+
+def sentence_candidates(sent):
+    """
+    Purpose: Candidate records (subject/object pairs) for one NER sentence record.
+    """
+    ents = sent.get("entities", [])
+    chunks = non_overlapping_chunks(sent["text"], ents)
+    objs_pool = ents + chunks
+    subs = [e for e in ents if e["label"] in SUBJ_LABELS] or ents or chunks
+    objs = [
+        e
+        for e in objs_pool
+        if (e["label"] in OBJ_LABELS or e["label"] == "NOUNPHRASE")
+    ] or objs_pool
+
+    return [
+        {
+            "doc_id": sent["doc_id"],
+            "sent_idx": sent["sent_idx"],
+            "sent_start": sent["sent_start"],
+            "text": sent["text"],
+            "subject": s,
+            "object": o,
+        }
+        for s, o in select_pairs(subs, objs)
+    ]
+
+
+def iter_candidates(sentences):
+    """Yield candidate records for an iterable of NER sentence records."""
+    for sent in sentences:
+        yield from sentence_candidates(sent)
+
+
+def candidate_lines(lines, normalized=False):
+    """Yield candidate JSONL lines for an iterable of NER JSONL lines."""
+    return pack_io.record_lines(iter_candidates(json.loads(line) for line in lines), normalized)
+
+
+SHARD_BYTES = 8 * 1024 * 1024
+
+
+def shard_ranges(path, n_shards):
+    """
+    Purpose: Split a JSONL file into byte ranges that start and end on line
+    boundaries, in file order.
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for k in range(1, n_shards):
+            pos = max(size * k // n_shards, bounds[-1])
+            if pos == 0 or pos >= size:
+                continue
+            f.seek(pos - 1)
+            f.readline()  # finish the line `pos` falls in (no-op read of "\n" at a line start)
+            bounds.append(f.tell())
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def _shard_candidates(task):
+    path, start, end, normalized = task
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return "".join(candidate_lines(io.BytesIO(data), normalized))  # splits on b"\n" only, like the serial reader
+
+
+def parallel_candidate_chunks(ner_path, workers, shard_bytes=SHARD_BYTES, normalized=False):
+    """
+    Purpose: Generate candidates over byte-range shards in a process pool,
+    yielding each shard's output in file order (identical to a serial run).
+    """
+    n_shards = max(workers * 4, os.path.getsize(ner_path) // shard_bytes + 1)
+    tasks = [(ner_path, a, b, normalized) for a, b in shard_ranges(ner_path, n_shards)]
+    with multiprocessing.Pool(workers) as pool:
+        for text in pool.imap(_shard_candidates, tasks):
+            yield text
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate subject/object candidate pairs from NER JSONL.")
+    ap.add_argument("ner_path")
+    ap.add_argument("--workers", type=int, default=1, help="process pool size (output order is preserved)")
+    ap.add_argument("--normalized", action="store_true", help="write each sentence once plus compact pair rows (see pack_io)")
+    args = ap.parse_args()
+    if args.workers > 1:
+        for text in parallel_candidate_chunks(args.ner_path, args.workers, normalized=args.normalized):
+            sys.stdout.write(text)
+        return
+    with open(args.ner_path, "r", encoding="utf-8") as f:
+        for line in candidate_lines(f, args.normalized):
+            sys.stdout.write(line)
 
 
 if __name__ == "__main__":
@@ -13,16 +13,21 @@ def key(e):
     )
 
 
+def iter_unique(edges):
+    """Yield edges, dropping repeats of the same key (first one wins)."""
+    seen = set()
+    for e in edges:
+        k = key(e)
+        if k in seen:
+            continue
+        seen.add(k)
+        yield e
+
+
 def main():
     in_path = sys.argv[1]
-    seen = set()
     with open(in_path, "r", encoding="utf-8") as f:
-        for line in f:
-            e = json.loads(line)
-            k = key(e)
-            if k in seen:
-                continue
-            seen.add(k)
+        for e in iter_unique(json.loads(line) for line in f):
             sys.stdout.write(json.dumps(e, ensure_ascii=False) + "\n")
 
 
@@ -0,0 +1,157 @@
+# groundkg/embed_cache.py
+"""Persistent embedding cache for re_score.
+
+The sentence encoder is frozen, and only the ONNX head changes when the model
+is retrained. Embeddings of marked texts are therefore kept on disk and reused
+across runs. Each encoder key gets its own directory holding two files:
+
+    embeddings.bin   row-major float32/float16 matrix (opened as a np.memmap)
+    index.bin        16-byte blake2b digest of the marked text per row
+
+Both files are append-only. On open, only rows that are present in both
+files are trusted, so an interrupted append is ignored.
+
+Writers hold an exclusive ``flock`` on index.bin while they append (or trim
+a torn tail), and first pick up the rows other writers appended since, so
+e.g. a score_server daemon and an in-process re_score can share a cache.
+Scoring workers open the cache with ``readonly=True``: they read existing
+rows and hand the rows they encoded to the parent (``take_pending``), which
+appends them.
+"""
+import fcntl
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+DIGEST_SIZE = 16
+
+
+def text_digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+def encoder_key(name, version, dim, dtype):
+    """Directory name for one encoder (name + version) and storage layout."""
+    raw = json.dumps([name, version, dim, np.dtype(dtype).name])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class EmbeddingCache:
+    """Append-only text-hash → embedding-row store backed by a memmap."""
+
+    def __init__(self, cache_dir, name, version, dim, dtype="float32", readonly=False):
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.readonly = readonly
+        self.pending = []  # (digests, embeddings) encoded by a read-only cache
+        self.dir = os.path.join(cache_dir, encoder_key(name, version, dim, self.dtype))
+        os.makedirs(self.dir, exist_ok=True)
+        if not readonly:
+            with open(os.path.join(self.dir, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"encoder": name, "version": version, "dim": dim, "dtype": self.dtype.name}, f)
+        self._emb_path = os.path.join(self.dir, "embeddings.bin")
+        self._idx_path = os.path.join(self.dir, "index.bin")
+        self.index = {}
+        self.rows = 0
+        self._mmap = None
+        self.hits = 0
+        self.misses = 0
+        if readonly:
+            self._catch_up()
+        else:
+            with self._locked():
+                self._catch_up()
+
+    @contextmanager
+    def _locked(self):
+        """Hold the writers' exclusive lock on index.bin."""
+        with open(self._idx_path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _catch_up(self):
+        """Index the rows present in both files that this instance has not seen yet."""
+        row_bytes = self.dim * self.dtype.itemsize
+        emb_rows = os.path.getsize(self._emb_path) // row_bytes if os.path.exists(self._emb_path) else 0
+        idx_rows = os.path.getsize(self._idx_path) // DIGEST_SIZE if os.path.exists(self._idx_path) else 0
+        n = min(emb_rows, idx_rows)
+        if n > self.rows:
+            with open(self._idx_path, "rb") as f:
+                f.seek(self.rows * DIGEST_SIZE)
+                digests = f.read((n - self.rows) * DIGEST_SIZE)
+            for i in range(n - self.rows):
+                self.index.setdefault(digests[i * DIGEST_SIZE : (i + 1) * DIGEST_SIZE], self.rows + i)
+            self.rows = n
+        if not self.readonly:  # under the lock: drop a torn tail so new rows line up in both files
+            for path, size in ((self._emb_path, n * row_bytes), (self._idx_path, n * DIGEST_SIZE)):
+                if os.path.exists(path) and os.path.getsize(path) != size:
+                    os.truncate(path, size)
+
+    def _matrix(self):
+        if self._mmap is None or len(self._mmap) < self.rows:
+            self._mmap = np.memmap(self._emb_path, dtype=self.dtype, mode="r", shape=(self.rows, self.dim))
+        return self._mmap
+
+    def add(self, digests, embeddings):
+        """Append rows for new digests; returns their row numbers.
+
+        Digests another writer appended in the meantime are not written again.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=self.dtype).reshape(len(digests), self.dim)
+        with self._locked():
+            self._catch_up()
+            keep = [i for i, d in enumerate(digests) if d not in self.index]
+            if keep:
+                with open(self._emb_path, "ab") as f:
+                    f.write(embeddings[keep].tobytes())
+                with open(self._idx_path, "ab") as f:
+                    f.write(b"".join(digests[i] for i in keep))
+                for i in keep:
+                    self.index[digests[i]] = self.rows
+                    self.rows += 1
+        return [self.index[d] for d in digests]
+
+    def embed(self, texts, encode):
+        """[len(texts), dim] float32 embeddings, calling ``encode`` only for unseen texts."""
+        digests = [text_digest(t) for t in texts]
+        missing = {}
+        for d, t in zip(digests, texts):
+            if d not in self.index and d not in missing:
+                missing[d] = t
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        if missing and self.readonly:
+            return self._embed_readonly(digests, missing, encode)
+        if missing:
+            self.add(list(missing), encode(list(missing.values())))
+        rows = np.fromiter((self.index[d] for d in digests), dtype=np.int64, count=len(digests))
+        return np.asarray(self._matrix()[rows], dtype=np.float32)
+
+    def _embed_readonly(self, digests, missing, encode):
+        new = np.asarray(encode(list(missing.values())), dtype=self.dtype).reshape(len(missing), self.dim)
+        self.pending.append((list(missing), new))
+        fresh = {d: i for i, d in enumerate(missing)}
+        out = np.empty((len(digests), self.dim), dtype=np.float32)
+        cached = [i for i, d in enumerate(digests) if d not in fresh]
+        if cached:
+            out[cached] = self._matrix()[[self.index[digests[i]] for i in cached]]
+        encoded = [i for i, d in enumerate(digests) if d in fresh]
+        out[encoded] = new[[fresh[digests[i]] for i in encoded]]
+        return out
+
+    def take_pending(self):
+        """Rows encoded since the last call, as (digests, embeddings) pairs; clears them."""
+        pending, self.pending = self.pending, []
+        return pending
+
+    def add_missing(self, digests, embeddings):
+        """Append the rows whose digests are not cached yet (rows from a read-only cache)."""
+        keep = [i for i, d in enumerate(digests) if d not in self.index]  # another worker may have sent it
+        if keep:
+            self.add([digests[i] for i in keep], np.asarray(embeddings)[keep])
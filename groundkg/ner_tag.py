@@ -1,26 +1,70 @@
 # groundkg/ner_tag.py
-import sys
+import argparse
+import functools
+import glob
+import hashlib
+import itertools
 import json
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import time
 import warnings
+from pathlib import Path
 
 # Suppress thinc FutureWarnings about torch.cuda.amp.autocast deprecation
 warnings.filterwarnings("ignore", category=FutureWarning, module="thinc")
 
-import spacy
+DEFAULT_MODEL = "en_core_web_trf"
+RULER_PATTERNS = "training/ruler_patterns.jsonl"
+RULER_CACHE_DIR = ".cache/ruler"
+# compile_ruler_patterns/_add_phrases fill the EntityRuler through private
+# spaCy internals; other releases fall back to the public add_patterns path.
+COMPILED_RULER_SPACY = ((3, 0), (4, 0))
+CORPUS_DIR = "data/corpus"
+MANIFEST_SUFFIXES = {".yaml", ".yml", ".jsonl"}
+# Sentence end (punctuation + closing quotes/brackets) followed by whitespace
+SENT_END = re.compile(r"[.!?][\"'\u2019\u201d)\]]*(?=\s)")
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
 
+# Speed/quality profiles. Only doc.ents and sentence boundaries are read, so
+# tagger/parser/lemmatizer output is wasted work. "accurate" keeps the trf
+# weights loaded but only runs transformer + ner (parser boundaries are
+# replaced by the sentencizer either way); "fast" drops everything but ner
+# from a small CNN model; "custom" takes --model and --exclude as given.
+UNUSED_PIPES = ["textcat", "tagger", "morphologizer", "parser", "attribute_ruler", "lemmatizer"]
+PROFILES = {
+    "accurate": {"model": DEFAULT_MODEL, "disable": UNUSED_PIPES},
+    "fast": {"model": "en_core_web_sm", "exclude": UNUSED_PIPES + ["tok2vec", "senter"]},
+    "custom": {"model": None, "disable": ["textcat"]},
+}
 
-def main():
-    in_path = sys.argv[1]
-    doc_id = "doc"
-    model = "en_core_web_trf"
-    for i, a in enumerate(sys.argv):
-        if a == "--doc-id" and i + 1 < len(sys.argv):
-            doc_id = sys.argv[i + 1]
-        if a == "--model" and i + 1 < len(sys.argv):
-            model = sys.argv[i + 1]
-
-    # Enable NER + sentence boundaries; parser not needed here
-    nlp = spacy.load(model, disable=["textcat"])
+# Per-process pipeline for --workers mode (set by _init_worker)
+_worker_nlp = None
+
+
+def load_pipeline(model=None, profile="accurate", exclude=None, ruler_cache=RULER_CACHE_DIR):
+    """Load the spaCy pipeline once and attach sentencizer + entity_ruler.
+
+    ``model`` overrides the profile's default model; ``exclude`` adds
+    components to leave out entirely; ``ruler_cache`` is where the compiled
+    entity_ruler artifact lives (falsy to always compile from the JSONL).
+    """
+    cfg = PROFILES[profile]
+    model = model or cfg["model"]
+    if not model:
+        raise ValueError(f"profile {profile!r} needs an explicit model")
+    kwargs = {}
+    if cfg.get("disable"):
+        kwargs["disable"] = list(cfg["disable"])
+    if cfg.get("exclude") or exclude:
+        kwargs["exclude"] = list(cfg.get("exclude", [])) + list(exclude or [])
+    import spacy  # imported here: it takes most of a second, and --help or a bad argument should not wait
+
+    # Enable NER + sentence boundaries only
+    nlp = spacy.load(model, **kwargs)
     # 1) sentence boundaries first
     pipe_names = list(getattr(nlp, "pipe_names", []))
     if hasattr(nlp, "add_pipe"):
@@ -38,9 +82,12 @@ def main():
                     else nlp.add_pipe("entity_ruler")
                 )
                 try:
-                    ruler.from_disk("training/ruler_patterns.jsonl")
+                    load_ruler_patterns(nlp, ruler, RULER_PATTERNS, ruler_cache)
                 except Exception:
-                    pass  # ok if file missing in some environments
+                    try:
+                        ruler.from_disk(RULER_PATTERNS)  # uncompiled fallback
+                    except Exception:
+                        pass  # ok if file missing in some environments
             except Exception:
                 pass
     if hasattr(nlp, "enable_pipe"):
@@ -48,30 +95,687 @@ def main():
             nlp.enable_pipe("ner")
         except Exception:
             pass
-    text = open(in_path, "r", encoding="utf-8").read()
-    doc = nlp(text) # main call to the pipeline
-
-    for sent in doc.sents:
-        ents = []
-        for ent in doc.ents:
-            if ent.start_char >= sent.start_char and ent.end_char <= sent.end_char:
-                ents.append(
-                    {
-                        "text": ent.text,
-                        "start": ent.start_char
-                        - sent.start_char,  # relative to sentence
-                        "end": ent.end_char - sent.start_char,
-                        "label": ent.label_,
-                    }
-                )
-        rec = {
+    return nlp
+
+
+def _phrase_words(pattern):
+    """Words of a token pattern that is just an exact ORTH/TEXT sequence, else None."""
+    words = []
+    for tok in pattern:
+        if not (isinstance(tok, dict) and len(tok) == 1):
+            return None
+        (attr, value), = tok.items()
+        if attr not in ("ORTH", "TEXT") or not isinstance(value, str):
+            return None
+        words.append(value)
+    return words or None
+
+
+def compiled_ruler_supported(ruler):
+    """True if this spaCy's EntityRuler has the internals the compiled artifact is loaded through."""
+    import spacy
+
+    try:
+        version = tuple(int(v) for v in spacy.__version__.split(".")[:2])
+    except (AttributeError, ValueError):
+        return False
+    lo, hi = COMPILED_RULER_SPACY
+    return (
+        lo <= version < hi
+        and hasattr(getattr(ruler, "phrase_matcher", None), "_convert_to_array")
+        and hasattr(getattr(ruler, "matcher", None), "_normalize_key")
+        and hasattr(ruler, "_create_label")
+        and isinstance(getattr(ruler, "_ent_ids", None), dict)
+    )
+
+
+def compile_ruler_patterns(nlp, ruler, patterns):
+    """Split patterns into PhraseMatcher keywords and token patterns.
+
+    String patterns are tokenized the way EntityRuler.add_patterns does it
+    (components from the ruler onwards disabled). Exact ORTH/TEXT token
+    patterns become phrases too, so they go through the PhraseMatcher instead
+    of the token Matcher. Returns (phrases, token entries), phrases being
+    (label, id, [attribute hash per token]).
+    """
+    matcher = ruler.phrase_matcher
+    route = getattr(ruler, "phrase_matcher_attr", None) in (None, "ORTH")
+    texts, text_meta, phrases, tokens = [], [], [], []
+    for entry in patterns:
+        pattern = entry["pattern"]
+        if isinstance(pattern, str):
+            texts.append(pattern)
+            text_meta.append((entry["label"], entry.get("id")))
+            continue
+        words = _phrase_words(pattern) if route else None
+        if words:
+            phrases.append((entry["label"], entry.get("id"), [nlp.vocab.strings.add(w) for w in words]))
+        else:
+            tokens.append(entry)
+    later = nlp.pipe_names[nlp.pipe_names.index(ruler.name):] if ruler.name in nlp.pipe_names else []
+    with nlp.select_pipes(disable=later):
+        keywords = [matcher._convert_to_array(doc) for doc in nlp.pipe(texts)]
+    phrases = [(label, ent_id, kw) for (label, ent_id), kw in zip(text_meta, keywords)] + phrases
+    return phrases, tokens
+
+
+def _add_phrases(ruler, phrases):
+    # Same bookkeeping as EntityRuler.add_patterns, but the PhraseMatcher is
+    # fed attribute-hash keywords directly and no pattern Docs are kept, which
+    # is where most of the ruler's memory goes for large gazetteers.
+    by_label = {}
+    for label, ent_id, keyword in phrases:
+        if ent_id:
+            key_label = ruler._create_label(label, ent_id)
+            ruler._ent_ids[ruler.matcher._normalize_key(key_label)] = (label, ent_id)
+            label = key_label
+        by_label.setdefault(label, []).append(keyword)
+    for label, keywords in by_label.items():
+        ruler.phrase_matcher.add(label, keywords)
+
+
+def load_ruler_patterns(nlp, ruler, patterns_path, cache_dir=RULER_CACHE_DIR):
+    """Fill ``ruler`` from a pattern JSONL, reusing a compiled artifact when possible.
+
+    The artifact (msgpack of PhraseMatcher keywords plus token patterns) is
+    keyed by the pattern file hash, matcher attribute and model/spaCy version,
+    so large gazetteers are tokenized once per pattern-file change instead of
+    on every start. Phrase patterns are not kept as Docs, so ``ruler.patterns``
+    and ``len(ruler)`` count only token patterns. Without ``cache_dir``, or on a
+    spaCy release outside ``COMPILED_RULER_SPACY``, the patterns go through
+    ``ruler.from_disk`` (i.e. ``add_patterns``). Returns the number of patterns
+    loaded.
+    """
+    import spacy
+    import srsly
+
+    patterns_path = Path(patterns_path)
+    if cache_dir and not compiled_ruler_supported(ruler):
+        print(
+            f"[WARN] spaCy {getattr(spacy, '__version__', '?')} is not supported by the compiled entity_ruler "
+            "cache; loading the patterns without it",
+            file=sys.stderr,
+        )
+        cache_dir = None
+    if not cache_dir:
+        ruler.from_disk(patterns_path)
+        return len(ruler)
+    meta = getattr(nlp, "meta", None) or {}
+    key = hashlib.sha256(
+        json.dumps(
+            [
+                _file_sha256(patterns_path),
+                getattr(ruler, "phrase_matcher_attr", None),
+                meta.get("lang"),
+                meta.get("name"),
+                meta.get("version"),
+                getattr(spacy, "__version__", None),
+            ]
+        ).encode("utf-8")
+    ).hexdigest()
+    artifact = Path(cache_dir) / f"entity_ruler-{key[:16]}.msgpack"
+    if artifact.is_file():
+        data = srsly.msgpack_loads(artifact.read_bytes())
+        phrases, tokens = data["phrases"], data["tokens"]
+    else:
+        patterns = [json.loads(line) for line in patterns_path.open("r", encoding="utf-8") if line.strip()]
+        phrases, tokens = compile_ruler_patterns(nlp, ruler, patterns)
+        artifact.parent.mkdir(parents=True, exist_ok=True)
+        tmp = artifact.with_name(f"{artifact.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(srsly.msgpack_dumps({"phrases": phrases, "tokens": tokens}))
+        os.replace(tmp, artifact)
+    if tokens:
+        ruler.add_patterns(tokens)
+    _add_phrases(ruler, phrases)
+    return len(phrases) + len(tokens)
+
+
+def _crawled_text_paths(corpus_dir):
+    """doc_id → text_path as tools/crawl.py recorded them in the meta.jsonl next to ``corpus_dir``."""
+    meta = Path(corpus_dir).parent / "meta.jsonl"
+    paths = {}
+    if meta.is_file():
+        with meta.open("r", encoding="utf-8") as f:
+            for line in f:
+                m = json.loads(line) if line.strip() else {}
+                if m.get("text_path"):
+                    paths.setdefault(m["doc_id"], m["text_path"])
+    return paths
+
+
+def _corpus_file(corpus_dir, doc_id):
+    """``<corpus_dir>/<slug>.txt``, slugified like tools/crawl.py names it, unless ``<doc_id>.txt`` exists."""
+    plain = Path(corpus_dir) / f"{doc_id}.txt"
+    try:
+        from slugify import slugify  # python-slugify, as crawl.py uses
+    except ImportError:
+        return plain
+    return plain if plain.is_file() else Path(corpus_dir) / f"{slugify(doc_id)}.txt"
+
+
+def _read_manifest(path, corpus_dir):
+    """Yield (doc_id, text_path) from docs.yaml or data/meta.jsonl, in manifest order.
+
+    docs.yaml entries have no text_path; they resolve through data/meta.jsonl,
+    then to the slugified file name crawl.py writes.
+    """
+    if path.suffix in (".yaml", ".yml"):
+        import yaml
+
+        with path.open("r", encoding="utf-8") as f:
+            entries = yaml.safe_load(f) or []
+    else:
+        with path.open("r", encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+    seen, crawled = set(), None
+    for m in entries:
+        doc_id = m["doc_id"]
+        if doc_id in seen:
+            continue
+        seen.add(doc_id)
+        text_path = m.get("text_path")
+        if not text_path:
+            if crawled is None:
+                crawled = _crawled_text_paths(corpus_dir)
+            text_path = crawled.get(doc_id) or _corpus_file(corpus_dir, doc_id)
+        yield doc_id, Path(text_path)
+
+
+def iter_documents(source, doc_id=None, corpus_dir=CORPUS_DIR):
+    """Resolve a file, directory, glob or manifest to ordered (doc_id, path) pairs.
+
+    Directories and globs are sorted by path so the combined output is
+    deterministic; manifests keep their own order. Corpus files use their
+    stem as doc_id, matching the old one-process-per-file Makefile loop.
+    """
+    p = Path(source)
+    if p.is_dir():
+        docs = [(f.stem, f) for f in sorted(p.glob("*.txt"))]
+    elif p.is_file() and p.suffix in MANIFEST_SUFFIXES:
+        docs = list(_read_manifest(p, corpus_dir))
+    elif p.is_file():
+        docs = [(doc_id or "doc", p)]
+    else:
+        docs = [(Path(f).stem, Path(f)) for f in sorted(glob.glob(source))]
+    for d_id, path in docs:
+        if not path.is_file():
+            print(f"[SKIP missing] {d_id} {path}", file=sys.stderr)
+            continue
+        yield d_id, path
+
+
+def assign_entities(sents, ents):
+    """Pair each sentence with the entities that lie fully inside it.
+
+    Both sequences are sorted by offset (as ``doc.sents``/``doc.ents`` are), so
+    a single merge pass gives O(S + E) instead of scanning every entity for
+    every sentence. Entities crossing a sentence boundary are dropped.
+    """
+    ents = list(ents)
+    i, n = 0, len(ents)
+    for sent in sents:
+        while i < n and ents[i].start_char < sent.start_char:
+            i += 1
+        inside = []
+        while i < n and ents[i].start_char < sent.end_char:
+            if ents[i].end_char <= sent.end_char:
+                inside.append(ents[i])
+            i += 1
+        yield sent, inside
+
+
+def sentence_records(doc, doc_id, char_offset=0, token_offset=0):
+    """Yield one record per sentence with sentence-relative entity offsets.
+
+    ``char_offset``/``token_offset`` shift ``sent_start``/``sent_idx`` from
+    chunk coordinates back to document coordinates.
+    """
+    for sent, sent_ents in assign_entities(doc.sents, doc.ents):
+        ents = [
+            {
+                "text": ent.text,
+                "start": ent.start_char - sent.start_char,  # relative to sentence
+                "end": ent.end_char - sent.start_char,
+                "label": ent.label_,
+            }
+            for ent in sent_ents
+        ]
+        yield {
             "doc_id": doc_id,
-            "sent_idx": sent.start,
-            "sent_start": sent.start_char,  # document-relative
+            "sent_idx": sent.start + token_offset,
+            "sent_start": sent.start_char + char_offset,  # document-relative
             "text": sent.text.strip(),
             "entities": ents,
         }
-        sys.stdout.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+
+def _cut_point(nlp, buf, limit):
+    """Index <= limit at which to end a chunk so it closes on a sentence boundary.
+
+    Prefers the pipeline's own sentencizer (tokenizer + rules only, no model)
+    so the cut lands exactly where an unchunked run starts a sentence; falls
+    back to the last punctuation-terminated sentence, then the last space.
+    """
+    window = buf[:limit]
+    if hasattr(nlp, "make_doc") and "sentencizer" in getattr(nlp, "pipe_names", []):
+        doc = nlp.get_pipe("sentencizer")(nlp.make_doc(window))
+        # ignore a boundary on the last token: it may be cut mid-word
+        starts = [s.start_char for s in doc.sents if 0 < s.start < len(doc) - 1]
+        if starts:
+            return starts[-1]
+    cut = 0
+    for m in SENT_END.finditer(buf, 0, limit + 1):
+        end = m.end() + (buf[m.end()] == " ")  # single space stays on the token
+        if end <= limit:
+            cut = end
+    if not cut:
+        cut = window.rfind(" ") + 1
+    return cut or limit
+
+
+def iter_chunks(path, chunk_chars, nlp=None):
+    """Yield (char_offset, text) pieces of at most ``chunk_chars``, ending at sentence boundaries.
+
+    The file is read incrementally, so memory is bounded by a couple of
+    chunks regardless of document size.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        buf, offset, eof = "", 0, False
+        while True:
+            while not eof and len(buf) <= chunk_chars:
+                data = f.read(chunk_chars)
+                eof = not data
+                buf += data
+            if len(buf) <= chunk_chars:
+                if buf:
+                    yield offset, buf
+                return
+            cut = _cut_point(nlp, buf, chunk_chars)
+            yield offset, buf[:cut]
+            offset += cut
+            buf = buf[cut:]
+
+
+def _pipe(nlp, texts, batch_size):
+    """Stream (text, context) tuples through the pipeline, preserving order."""
+    if hasattr(nlp, "pipe"):
+        return nlp.pipe(texts, as_tuples=True, batch_size=batch_size)
+    return ((nlp(text), ctx) for text, ctx in texts)
+
+
+def new_metrics():
+    """Counters filled by tag_documents when metrics are requested."""
+    return {"docs": 0, "docs_tagged": 0, "cache_hits": 0, "chars": 0, "sentences": 0, "components": {}}
+
+
+def merge_metrics(into, other):
+    for key, value in other.items():
+        if key == "components":
+            for name, secs in value.items():
+                into["components"][name] = into["components"].get(name, 0.0) + secs
+        else:
+            into[key] += value
+    return into
+
+
+def _pipe_timed(nlp, texts, batch_size, metrics):
+    """Like nlp.pipe(as_tuples=True), but times the tokenizer and every component.
+
+    Each batch goes through the components one after another (as
+    Language.pipe does), so each component's wall time is measured on its own.
+    """
+    comps = metrics["components"]
+    for batch in _batched(texts, batch_size):
+        if not hasattr(nlp, "make_doc"):
+            t0 = time.perf_counter()
+            docs = [nlp(text) for text, _ in batch]
+            comps["pipeline"] = comps.get("pipeline", 0.0) + time.perf_counter() - t0
+        else:
+            t0 = time.perf_counter()
+            docs = [nlp.make_doc(text) for text, _ in batch]
+            comps["tokenizer"] = comps.get("tokenizer", 0.0) + time.perf_counter() - t0
+            for name, proc in nlp.pipeline:
+                t0 = time.perf_counter()
+                if hasattr(proc, "pipe"):
+                    docs = list(proc.pipe(docs, batch_size=batch_size))
+                else:
+                    docs = [proc(doc) for doc in docs]
+                comps[name] = comps.get(name, 0.0) + time.perf_counter() - t0
+        for doc, (_, ctx) in zip(docs, batch):
+            yield doc, ctx
+
+
+def _counted(texts, metrics):
+    for text, ctx in texts:
+        metrics["chars"] += len(text)
+        if ctx[2] == 0:  # first chunk of a document
+            metrics["docs_tagged"] += 1
+        yield text, ctx
+
+
+def _iter_texts(nlp, docs, chunk_chars):
+    for i, (doc_id, path) in enumerate(docs):
+        if chunk_chars:
+            for offset, chunk in iter_chunks(path, chunk_chars, nlp):
+                yield chunk, (i, doc_id, offset)
+        else:
+            yield path.read_text(encoding="utf-8"), (i, doc_id, 0)
+
+
+def _record_stream(nlp, docs, batch_size, chunk_chars, metrics=None):
+    """Yield (document index, sentence record) for every sentence, in document order."""
+    texts = _iter_texts(nlp, docs, chunk_chars)
+    if metrics is None:
+        tagged = _pipe(nlp, texts, batch_size)
+    else:
+        tagged = _pipe_timed(nlp, _counted(texts, metrics), batch_size, metrics)
+    token_offset = 0
+    for doc, (i, doc_id, char_offset) in tagged:  # main call to the pipeline
+        if char_offset == 0:
+            token_offset = 0
+        for rec in sentence_records(doc, doc_id, char_offset, token_offset):
+            yield i, rec
+        if chunk_chars:
+            token_offset += len(doc)
+
+
+def _tag_stream(nlp, docs, batch_size, chunk_chars, metrics=None):
+    """Yield (document index, JSONL line) for every sentence, in document order."""
+    for i, rec in _record_stream(nlp, docs, batch_size, chunk_chars, metrics):
+        yield i, json.dumps(rec, ensure_ascii=False) + "\n"
+
+
+def iter_sentences(nlp, docs, batch_size=8, chunk_chars=0, cache_dir=None):
+    """Yield sentence records (the dicts behind ``tag_documents`` lines) in memory.
+
+    Without a cache nothing is serialized; cache hits are replayed from disk
+    and decoded.
+    """
+    if cache_dir:
+        for line in tag_documents(nlp, docs, batch_size, chunk_chars, cache_dir):
+            yield json.loads(line)
+        return
+    for _, rec in _record_stream(nlp, docs, batch_size, chunk_chars):
+        yield rec
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def pipeline_fingerprint(nlp, chunk_chars=0):
+    """Hash everything besides the text that determines NER output."""
+    import spacy
+
+    meta = getattr(nlp, "meta", None) or {}
+    ruler = Path(RULER_PATTERNS)
+    parts = {
+        "model": f"{meta.get('lang', '')}_{meta.get('name', '')}",
+        "version": meta.get("version"),
+        "spacy": getattr(spacy, "__version__", None),
+        "pipes": list(getattr(nlp, "pipe_names", [])),
+        "ruler": _file_sha256(ruler) if ruler.is_file() else None,
+        "chunk_chars": chunk_chars,
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _cache_path(cache_dir, fingerprint, path):
+    key = hashlib.sha256((fingerprint + _file_sha256(path)).encode("ascii")).hexdigest()
+    return Path(cache_dir) / key[:2] / f"{key}.jsonl"
+
+
+def _line_prefix(doc_id):
+    # Records are serialized doc_id-first; the cache stores the rest of each line
+    # so a cache entry is reusable under any doc_id with byte-identical output.
+    return '{"doc_id": ' + json.dumps(doc_id, ensure_ascii=False) + ", "
+
+
+def tag_documents(nlp, docs, batch_size=8, chunk_chars=0, cache_dir=None, metrics=None):
+    """Yield serialized JSONL lines for every sentence of every document.
+
+    With ``chunk_chars`` each document is streamed as sentence-aligned chunks
+    and sentence offsets are remapped, so output matches an unchunked run.
+    With ``cache_dir`` documents whose text hash and pipeline fingerprint were
+    seen before are replayed from disk and only new or changed ones are tagged.
+    A ``metrics`` dict (see ``new_metrics``) is updated with counts and
+    per-component wall time.
+    """
+    if metrics is None:
+        metrics = {"docs": 0, "sentences": 0, "cache_hits": 0}
+        stream_metrics = None
+    else:
+        stream_metrics = metrics
+    if not cache_dir:
+        docs = list(docs)
+        metrics["docs"] += len(docs)
+        for _, line in _tag_stream(nlp, docs, batch_size, chunk_chars, stream_metrics):
+            metrics["sentences"] += 1
+            yield line
+        return
+
+    fingerprint = pipeline_fingerprint(nlp, chunk_chars)
+    plan = []
+    for doc_id, path in docs:
+        cached = _cache_path(cache_dir, fingerprint, path)
+        plan.append((doc_id, path, cached, cached.is_file()))
+    misses = [(doc_id, path) for doc_id, path, _, hit in plan if not hit]
+    metrics["docs"] += len(plan)
+    metrics["cache_hits"] += len(plan) - len(misses)
+
+    stream = _tag_stream(nlp, misses, batch_size, chunk_chars, stream_metrics)
+    pending = next(stream, None)
+    miss_idx = 0
+    for doc_id, path, cached, hit in plan:
+        prefix = _line_prefix(doc_id)
+        if hit:
+            with open(cached, "r", encoding="utf-8") as f:
+                for rest in f:
+                    metrics["sentences"] += 1
+                    yield prefix + rest
+            continue
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_name(f"{cached.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as w:
+            while pending is not None and pending[0] == miss_idx:
+                line = pending[1]
+                w.write(line[len(prefix):])
+                metrics["sentences"] += 1
+                yield line
+                pending = next(stream, None)
+        os.replace(tmp, cached)
+        miss_idx += 1
+
+
+def set_thread_limits(threads):
+    """Pin BLAS/OpenMP/torch thread pools so N workers don't oversubscribe cores."""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already set once parallel work has started
+
+
+def _init_worker(model, threads, profile="accurate", exclude=None, ruler_cache=RULER_CACHE_DIR):
+    global _worker_nlp
+    set_thread_limits(threads)
+    _worker_nlp = load_pipeline(model, profile=profile, exclude=exclude, ruler_cache=ruler_cache)
+
+
+def _tag_batch(batch, chunk_chars=0, cache_dir=None, with_metrics=False):
+    metrics = new_metrics() if with_metrics else None
+    text = "".join(
+        tag_documents(
+            _worker_nlp,
+            batch,
+            batch_size=len(batch),
+            chunk_chars=chunk_chars,
+            cache_dir=cache_dir,
+            metrics=metrics,
+        )
+    )
+    return text, metrics
+
+
+def _batched(items, size):
+    it = iter(items)
+    while True:
+        batch = list(itertools.islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def tag_documents_parallel(
+    model,
+    docs,
+    workers,
+    batch_size=8,
+    threads=None,
+    chunk_chars=0,
+    cache_dir=None,
+    profile="accurate",
+    exclude=None,
+    ruler_cache=RULER_CACHE_DIR,
+    metrics=None,
+):
+    """Tag documents over a process pool, yielding output in input order.
+
+    Each worker loads its own pipeline and receives consecutive batches of
+    ``batch_size`` documents, the same grouping ``nlp.pipe`` uses in a serial
+    run, so the merged output is byte-identical to ``tag_documents``.
+    Worker metrics are merged into ``metrics`` (component times are summed
+    over workers).
+    """
+    if threads is None:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+    initargs = (model, threads, profile, exclude, ruler_cache)
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        tag_batch = functools.partial(
+            _tag_batch, chunk_chars=chunk_chars, cache_dir=cache_dir, with_metrics=metrics is not None
+        )
+        for text, batch_metrics in pool.imap(tag_batch, _batched(docs, batch_size)):
+            if metrics is not None:
+                merge_metrics(metrics, batch_metrics)
+            yield text
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and its (finished) children."""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes vs KiB
+    peaks = [resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return round(max(peaks) / scale, 1)
+
+
+def metrics_record(metrics, wall, **context):
+    """Summary written to the --metrics sidecar."""
+    rate = (lambda n: round(n / wall, 3)) if wall else (lambda n: None)
+    return {
+        **context,
+        **{k: v for k, v in metrics.items() if k != "components"},
+        "wall_s": round(wall, 3),
+        "docs_per_s": rate(metrics["docs"]),
+        "chars_per_s": rate(metrics["chars"]),
+        "sents_per_s": rate(metrics["sentences"]),
+        "component_s": {name: round(secs, 3) for name, secs in metrics["components"].items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sentence-level NER over one or many documents.")
+    ap.add_argument("input", help="text file, corpus directory, glob, or docs.yaml / data/meta.jsonl manifest")
+    ap.add_argument("--doc-id", default=None, help="doc_id for a single input file (default: doc)")
+    ap.add_argument("--profile", choices=sorted(PROFILES), default="accurate", help="NER speed/quality profile")
+    ap.add_argument("--model", default=None, help="spaCy model (default: the profile's model; required for custom)")
+    ap.add_argument("--exclude", default="", help="comma-separated extra components to exclude")
+    ap.add_argument(
+        "--ruler-cache",
+        default=RULER_CACHE_DIR,
+        help="directory for the compiled entity_ruler artifact ('' to compile every start)",
+    )
+    ap.add_argument("--batch-size", type=int, default=8, help="documents per nlp.pipe batch")
+    ap.add_argument("--corpus-dir", default=CORPUS_DIR, help="where manifest doc_ids without a text_path are found (via ../meta.jsonl, else <slug>.txt)")
+    ap.add_argument("--out", default=None, help="write JSONL here instead of stdout")
+    ap.add_argument("--workers", type=int, default=1, help="worker processes, each with its own pipeline")
+    ap.add_argument("--threads", type=int, default=None, help="torch/BLAS threads per worker (default: cores // workers)")
+    ap.add_argument(
+        "--chunk-chars",
+        type=int,
+        default=0,
+        help="stream each document as sentence-aligned chunks of at most N chars (0 = whole document)",
+    )
+    ap.add_argument(
+        "--cache-dir",
+        default=None,
+        help="reuse sentence records for documents whose text and pipeline are unchanged",
+    )
+    ap.add_argument("--metrics", default=None, help="write a JSON timing/throughput record to this sidecar file")
+    args = ap.parse_args()
+    if args.profile == "custom" and not args.model:
+        ap.error("--profile custom requires --model")
+    exclude = [name for name in args.exclude.split(",") if name]
+
+    started = time.perf_counter()
+    metrics = new_metrics() if args.metrics else None
+    docs = iter_documents(args.input, doc_id=args.doc_id, corpus_dir=args.corpus_dir)
+    if args.workers > 1:
+        lines = tag_documents_parallel(
+            args.model,
+            docs,
+            args.workers,
+            batch_size=args.batch_size,
+            threads=args.threads,
+            chunk_chars=args.chunk_chars,
+            cache_dir=args.cache_dir,
+            profile=args.profile,
+            exclude=exclude,
+            ruler_cache=args.ruler_cache,
+            metrics=metrics,
+        )
+    else:
+        if args.threads:
+            set_thread_limits(args.threads)
+        lines = tag_documents(
+            load_pipeline(args.model, profile=args.profile, exclude=exclude, ruler_cache=args.ruler_cache),
+            docs,
+            batch_size=args.batch_size,
+            chunk_chars=args.chunk_chars,
+            cache_dir=args.cache_dir,
+            metrics=metrics,
+        )
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        for line in lines:
+            out.write(line)
+    finally:
+        if args.out:
+            out.close()
+    if args.metrics:
+        import spacy
+
+        rec = metrics_record(
+            metrics,
+            time.perf_counter() - started,
+            profile=args.profile,
+            model=args.model or PROFILES[args.profile]["model"],
+            spacy=getattr(spacy, "__version__", None),
+            workers=args.workers,
+            batch_size=args.batch_size,
+        )
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            json.dump(rec, f, indent=2)
 
 
 if __name__ == "__main__":
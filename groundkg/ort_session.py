@@ -0,0 +1,251 @@
+# groundkg/ort_session.py
+"""onnxruntime sessions with configurable options and cached optimized graphs.
+
+Thread counts and the graph optimization level are resolved in this order:
+1. explicit arguments (``--intra-op-threads``, ``--inter-op-threads``, ``--graph-opt``);
+2. the environment (``GK_ORT_INTRA_OP_THREADS``, ``GK_ORT_INTER_OP_THREADS``,
+   ``GK_ORT_GRAPH_OPT``);
+3. the settings ``autotune`` recorded for this machine next to the model
+   (``promoter_v1.ort.json``);
+4. onnxruntime's defaults, with graph optimization at ``extended``.
+
+An inter-op thread count switches to parallel execution.
+
+On first load the optimized graph is saved next to the model
+(``promoter_v1.opt-<level>.ort<version>.onnx``). Later loads reuse it for
+as long as it is newer than the model. The onnxruntime version is part of
+the name, and for ``all``, whose layout transforms are hardware specific, a
+tag of this CPU as well; an upgrade or another machine writes a fresh graph.
+
+    python -m groundkg.ort_session autotune models/promoter_v1.onnx
+
+onnxruntime (and numpy) are imported on first use, so importing this module
+and parsing arguments stay cheap.
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+OPT_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",  # adds layout transforms; saved graphs are hardware specific
+}
+DEFAULT_OPT_LEVEL = "extended"
+ENV = {"intra_op": "GK_ORT_INTRA_OP_THREADS", "inter_op": "GK_ORT_INTER_OP_THREADS", "opt_level": "GK_ORT_GRAPH_OPT"}
+PROVIDERS = ["CPUExecutionProvider"]
+
+
+def tuned_path(onnx_path):
+    return os.path.splitext(onnx_path)[0] + ".ort.json"
+
+
+@functools.lru_cache(maxsize=None)
+def cpu_tag():
+    """Short hash of the machine type and the first CPU's model and feature flags."""
+    info = {"machine": platform.machine()}
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                key = key.strip()
+                if key in ("vendor_id", "model name", "flags", "Features", "CPU part") and key not in info:
+                    info[key] = value.strip()
+    except OSError:  # not Linux
+        info["processor"] = platform.processor()
+    return hashlib.sha256(json.dumps(info, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def optimized_path(onnx_path, opt_level, ort_version=None):
+    """Where the graph optimized at ``opt_level`` is saved, keyed by onnxruntime version (and CPU for ``all``)."""
+    if ort_version is None:
+        import onnxruntime as ort
+
+        ort_version = getattr(ort, "__version__", "unknown")
+    tag = f".opt-{opt_level}.ort{ort_version}"
+    if opt_level == "all":
+        tag += f".cpu{cpu_tag()}"
+    return os.path.splitext(onnx_path)[0] + tag + ".onnx"
+
+
+def load_tuned(onnx_path):
+    """Settings recorded by ``autotune`` for this model, if they were measured on a machine like this one."""
+    path = tuned_path(onnx_path)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        tuned = json.load(f)
+    if tuned.get("cpu_count") != os.cpu_count():
+        return {}
+    return {k: tuned[k] for k in ENV if tuned.get(k) is not None}
+
+
+def resolve(onnx_path, intra_op=None, inter_op=None, opt_level=None):
+    """Effective {intra_op, inter_op, opt_level}: arguments, then environment, then tuned file."""
+    explicit = {"intra_op": intra_op, "inter_op": inter_op, "opt_level": opt_level}
+    tuned = load_tuned(onnx_path)
+    settings = {}
+    for key, env in ENV.items():
+        value = explicit[key] if explicit[key] is not None else os.environ.get(env) or tuned.get(key)
+        settings[key] = int(value) if value is not None and key != "opt_level" else value
+    settings["opt_level"] = settings["opt_level"] or DEFAULT_OPT_LEVEL
+    if settings["opt_level"] not in OPT_LEVELS:
+        raise ValueError(f"unknown graph optimization level {settings['opt_level']!r} (choose from {sorted(OPT_LEVELS)})")
+    return settings
+
+
+def session_options(intra_op=None, inter_op=None, opt_level=DEFAULT_OPT_LEVEL):
+    import onnxruntime as ort
+
+    so = ort.SessionOptions()
+    if intra_op:
+        so.intra_op_num_threads = intra_op
+    if inter_op:
+        so.inter_op_num_threads = inter_op
+        so.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+    so.graph_optimization_level = getattr(ort.GraphOptimizationLevel, OPT_LEVELS[opt_level])
+    return so
+
+
+def open_session(onnx_path, intra_op=None, inter_op=None, opt_level=None, persist=True):
+    """InferenceSession for ``onnx_path``, loading (or first saving) its optimized graph."""
+    import onnxruntime as ort
+
+    settings = resolve(onnx_path, intra_op, inter_op, opt_level)
+    so = session_options(**settings)
+    if not persist or settings["opt_level"] == "disable":
+        return ort.InferenceSession(onnx_path, sess_options=so, providers=PROVIDERS)
+    opt = optimized_path(onnx_path, settings["opt_level"], getattr(ort, "__version__", "unknown"))
+    if os.path.exists(opt) and os.path.getmtime(opt) >= os.path.getmtime(onnx_path):
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL  # already optimized
+        return ort.InferenceSession(opt, sess_options=so, providers=PROVIDERS)
+    if not os.access(os.path.dirname(os.path.abspath(opt)), os.W_OK):
+        return ort.InferenceSession(onnx_path, sess_options=so, providers=PROVIDERS)
+    tmp = f"{opt}.tmp{os.getpid()}"  # concurrent workers must not read a half-written graph
+    so.optimized_model_filepath = tmp
+    sess = ort.InferenceSession(onnx_path, sess_options=so, providers=PROVIDERS)
+    if os.path.exists(tmp):
+        os.replace(tmp, opt)
+    return sess
+
+
+def add_arguments(ap):
+    """Add --intra-op-threads / --inter-op-threads / --graph-opt to an argparse parser."""
+    ap.add_argument("--intra-op-threads", type=int, default=None, help=f"onnxruntime intra-op threads (env {ENV['intra_op']})")
+    ap.add_argument(
+        "--inter-op-threads",
+        type=int,
+        default=None,
+        help=f"onnxruntime inter-op threads; enables parallel execution (env {ENV['inter_op']})",
+    )
+    ap.add_argument(
+        "--graph-opt",
+        choices=list(OPT_LEVELS),
+        default=None,
+        help=f"graph optimization level (env {ENV['opt_level']}; default: tuned or {DEFAULT_OPT_LEVEL})",
+    )
+
+
+def options_from_args(args):
+    return {"intra_op": args.intra_op_threads, "inter_op": args.inter_op_threads, "opt_level": args.graph_opt}
+
+
+def _feeds(sess, batch_size, seq_len):
+    """Random inputs matching the session's signature (embeddings, or token ids for fused models)."""
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    feeds = {}
+    for inp in sess.get_inputs():
+        shape = [d if isinstance(d, int) and d > 0 else (batch_size if i == 0 else seq_len) for i, d in enumerate(inp.shape)]
+        if "int" in inp.type:
+            if inp.name == "attention_mask":
+                feeds[inp.name] = np.ones(shape, dtype=np.int64)
+            elif inp.name == "token_type_ids":
+                feeds[inp.name] = np.zeros(shape, dtype=np.int64)
+            else:
+                feeds[inp.name] = rng.integers(1000, 2000, size=shape, dtype=np.int64)
+        else:
+            feeds[inp.name] = rng.standard_normal(shape).astype(np.float32)
+    return feeds
+
+
+def bench(onnx_path, settings, batch_size=32, seq_len=64, repeats=20):
+    """Median seconds per batch for one setting."""
+    import onnxruntime as ort
+
+    sess = ort.InferenceSession(onnx_path, sess_options=session_options(**settings), providers=PROVIDERS)
+    feeds = _feeds(sess, batch_size, seq_len)
+    sess.run(None, feeds)  # warm-up
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        sess.run(None, feeds)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def autotune(onnx_path, batch_size=32, seq_len=64, repeats=20, levels=("basic", "extended", "all")):
+    """Benchmark thread counts x optimization levels; record the fastest next to the model."""
+    n = os.cpu_count() or 1
+    intra = sorted({t for t in (1, 2, 4, 8, 16, 32, 64) if t <= n} | {n})
+    inter = [None, 2] if n >= 4 else [None]
+    results = []
+    for level in levels:
+        for i in intra:
+            for j in inter:
+                settings = {"intra_op": i, "inter_op": j, "opt_level": level}
+                ms = bench(onnx_path, settings, batch_size, seq_len, repeats) * 1000
+                results.append({**settings, "ms_per_batch": round(ms, 3)})
+                print(f"  {level:>8} intra={i:<3} inter={j or '-':<3} {ms:9.3f} ms/batch", file=sys.stderr)
+    best = min(results, key=lambda r: r["ms_per_batch"])
+    record = {
+        **best,
+        "batch_size": batch_size,
+        "seq_len": seq_len,
+        "cpu_count": n,
+        "onnxruntime": getattr(sys.modules.get("onnxruntime"), "__version__", "unknown"),
+        "results": results,
+    }
+    with open(tuned_path(onnx_path), "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+    return record
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="command", required=True)
+    tune = sub.add_parser("autotune", help="benchmark thread settings on this machine and record the best")
+    tune.add_argument("onnx_path")
+    tune.add_argument("--batch-size", type=int, default=32)
+    tune.add_argument("--seq-len", type=int, default=64, help="token length for fused models")
+    tune.add_argument("--repeats", type=int, default=20)
+    tune.add_argument("--levels", default="basic,extended,all", help="comma-separated optimization levels to try")
+    opt = sub.add_parser("optimize", help="write the optimized graph next to the model now")
+    opt.add_argument("onnx_path")
+    add_arguments(opt)
+    args = ap.parse_args()
+    if not os.path.exists(args.onnx_path):
+        print(f"ERROR: {args.onnx_path} missing", file=sys.stderr)
+        return 2
+
+    if args.command == "autotune":
+        record = autotune(args.onnx_path, args.batch_size, args.seq_len, args.repeats, tuple(args.levels.split(",")))
+        best = {k: record[k] for k in ("intra_op", "inter_op", "opt_level", "ms_per_batch")}
+        print(f"Best: {json.dumps(best)} → {tuned_path(args.onnx_path)}")
+    else:
+        settings = resolve(args.onnx_path, **options_from_args(args))
+        open_session(args.onnx_path, **settings)
+        print(f"Wrote {optimized_path(args.onnx_path, settings['opt_level'])} ({json.dumps(settings)})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,94 @@
+# groundkg/pack_io.py
+"""Read and write pack.candidates / pack.scored in either layout.
+
+The flat layout has one self-contained record per pair, repeating the
+sentence text and both span dicts on every line. The normalized layout
+writes each sentence once as a row with doc_id, sent_idx, sent_start and
+text. That row is followed by compact pair rows that point back to it by
+(doc_id, sent_idx):
+
+    {"doc_id": "d1", "sent_idx": 4, "sent_start": 120, "text": "..."}
+    {"doc_id": "d1", "sent_idx": 4, "s": ["Acme", 0, 4, "ORG"], "o": [...], "pred": "uses", "prob": 0.93}
+
+Readers accept both layouts, even mixed in one file.
+"""
+import json
+
+SPAN_FIELDS = ("text", "start", "end", "label")
+PAIR_FIELDS = ("doc_id", "sent_idx", "sent_start", "text", "subject", "object")
+
+
+def _pack_span(span):
+    return [span.get(k) for k in SPAN_FIELDS]
+
+
+def _unpack_span(row):
+    return dict(zip(SPAN_FIELDS, row))
+
+
+def normalize(records):
+    """Yield normalized rows for flat pair records (grouped by sentence, as the pipeline writes them).
+
+    Every record needs its ``sent_idx``: pair rows point back to their
+    sentence by it, and there is no other field it could honestly be made of.
+    """
+    current = None
+    for rec in records:
+        if rec.get("sent_idx") is None:
+            raise ValueError(f"cannot normalize a record without sent_idx (doc_id {rec.get('doc_id')!r})")
+        key = (rec["doc_id"], rec["sent_idx"])
+        if key != current:
+            current = key
+            yield {"doc_id": key[0], "sent_idx": key[1], "sent_start": rec.get("sent_start"), "text": rec["text"]}
+        row = {"doc_id": key[0], "sent_idx": key[1], "s": _pack_span(rec["subject"]), "o": _pack_span(rec["object"])}
+        for k, v in rec.items():
+            if k not in PAIR_FIELDS:
+                row[k] = v  # pred, prob, ...
+        yield row
+
+
+def iter_records(rows, expand=True):
+    """Yield flat pair records from rows of either layout.
+
+    With ``expand=False`` compact rows are passed through without the sentence
+    text or span dicts; that is enough for readers that only need pred/prob.
+    Sentences are only remembered within the current document.
+    """
+    sents, doc = {}, None
+    for r in rows:
+        if "subject" in r:  # flat layout
+            yield r
+        elif "s" not in r:  # sentence row
+            if r["doc_id"] != doc:
+                sents, doc = {}, r["doc_id"]
+            sents[r["sent_idx"]] = r
+        elif not expand:
+            yield r
+        else:
+            sent = sents.get(r["sent_idx"]) if r["doc_id"] == doc else None
+            if sent is None:
+                raise ValueError(f"pair row references unknown sentence {(r['doc_id'], r['sent_idx'])}")
+            rec = {
+                "doc_id": r["doc_id"],
+                "sent_idx": r["sent_idx"],
+                "sent_start": sent["sent_start"],
+                "text": sent["text"],
+                "subject": _unpack_span(r["s"]),
+                "object": _unpack_span(r["o"]),
+            }
+            for k, v in r.items():
+                if k not in ("doc_id", "sent_idx", "s", "o"):
+                    rec[k] = v
+            yield rec
+
+
+def read_records(path, expand=True):
+    """Yield flat pair records from a candidates/scored JSONL file of either layout."""
+    with open(path, "r", encoding="utf-8") as f:
+        yield from iter_records((json.loads(line) for line in f if line.strip()), expand=expand)
+
+
+def record_lines(records, normalized=False):
+    """Yield JSONL lines for flat pair records, in the normalized layout if asked."""
+    for row in normalize(records) if normalized else records:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
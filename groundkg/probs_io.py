@@ -0,0 +1,111 @@
+# groundkg/probs_io.py
+"""Full probability matrices next to pack.scored.jsonl.
+
+``re_score --probs out/pack.scored.probs.npy`` writes the [N, C] class
+probabilities as a float32 .npy file. Row i belongs to the i-th scored
+pair record; sentence rows of the normalized layout are not counted.
+Column order is given by ``<stem>.classes.json``. The file is written in a
+stream: a fixed-size header is written first and patched with N at close.
+Threshold replays can then run vectorized over ``np.load(..., mmap_mode="r")``
+without parsing any JSON. At float32 the sidecar holds the very values the
+JSON ``pred``/``prob`` were taken from, so both paths make the same
+decisions; ``--probs-dtype float16`` halves the file but keeps only about
+3 significant digits, so near-threshold pairs and argmax ties can go the
+other way.
+"""
+import ast
+import json
+import os
+import struct
+
+import numpy as np
+
+HEADER_BYTES = 128  # magic + version + length + dict, padded; room for N up to 10**40
+CHUNK_ROWS = 1 << 20
+
+
+def classes_path(path):
+    return os.path.splitext(path)[0] + ".classes.json"
+
+
+def _header(n_rows, n_cols, dtype):
+    d = "{'descr': '%s', 'fortran_order': False, 'shape': (%d, %d), }" % (np.dtype(dtype).str, n_rows, n_cols)
+    body = d.encode("latin1")
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", HEADER_BYTES - 10) + body + b" " * (HEADER_BYTES - 11 - len(body)) + b"\n"
+
+
+class ProbsWriter:
+    """Append [B, C] probability blocks to a .npy file."""
+
+    def __init__(self, path, classes, dtype=np.float32):
+        self.path = path
+        self.classes = list(classes)
+        self.dtype = np.dtype(dtype)
+        self.rows = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.f = open(path, "wb")
+        self.f.write(_header(0, len(self.classes), self.dtype))
+
+    def append(self, probs):
+        block = np.ascontiguousarray(probs, dtype=self.dtype)
+        if block.ndim != 2 or block.shape[1] != len(self.classes):
+            raise ValueError(f"expected [B, {len(self.classes)}] probabilities, got {block.shape}")
+        self.f.write(block.tobytes())
+        self.rows += len(block)
+
+    def close(self):
+        self.f.seek(0)
+        self.f.write(_header(self.rows, len(self.classes), self.dtype))
+        self.f.close()
+        with open(classes_path(self.path), "w", encoding="utf-8") as f:
+            json.dump(self.classes, f, ensure_ascii=False)
+
+
+def load(path):
+    """(memory-mapped [N, C] matrix, classes) for a sidecar written by ``ProbsWriter``."""
+    with open(path, "rb") as f:
+        header = f.read(HEADER_BYTES)
+    if header[:6] != b"\x93NUMPY":
+        raise ValueError(f"{path} is not a .npy file")
+    meta = ast.literal_eval(header[10:].decode("latin1"))
+    shape = meta["shape"]
+    probs = np.load(path, mmap_mode="r") if shape[0] else np.zeros(shape, dtype=meta["descr"])
+    with open(classes_path(path), "r", encoding="utf-8") as f:
+        classes = json.load(f)
+    if probs.shape[1] != len(classes):
+        raise ValueError(f"{path}: {probs.shape[1]} columns but {len(classes)} classes")
+    return probs, classes
+
+
+def iter_top(probs, chunk_rows=CHUNK_ROWS):
+    """Yield (argmax index, top probability as float64) per chunk of rows, in order.
+
+    The argmax runs on the stored dtype, like re_score's; the top probability is
+    widened so threshold comparisons match ``float(prob) < thr`` on the JSON path.
+    """
+    for start in range(0, len(probs), chunk_rows):
+        block = np.asarray(probs[start : start + chunk_rows])
+        idx = block.argmax(axis=1)
+        yield idx, block[np.arange(len(idx)), idx].astype(np.float64)
+
+
+def threshold_vector(classes, thresholds, default=0.85):
+    """Per-column thresholds; 'none' never passes."""
+    return np.array([np.inf if c == "none" else float(thresholds.get(c, default)) for c in classes], dtype=np.float64)
+
+
+def passing_mask(probs, classes, thresholds, default=0.85):
+    """Boolean [N]: argmax class is not 'none' and its probability clears that class's threshold."""
+    thr = threshold_vector(classes, thresholds, default)
+    return np.concatenate(
+        [top >= thr[idx] for idx, top in iter_top(probs)] or [np.zeros(0, dtype=bool)]
+    )
+
+
+def probs_by_class(probs, classes):
+    """{class: float64 array of top probabilities of the rows predicted as that class}."""
+    parts = {c: [] for c in classes}
+    for idx, top in iter_top(probs):
+        for i, c in enumerate(classes):
+            parts[c].append(top[idx == i])
+    return {c: np.concatenate(v) for c, v in parts.items() if sum(len(a) for a in v)}
@@ -2,61 +2,14 @@
 import sys
 import json
 import os
-import onnxruntime as ort
 import numpy as np
 
-ALLOWED_TYPES = {
-    # predicate: (allowed_subject_labels, allowed_object_labels)
-    # Labels are spaCy NER labels plus our "NOUNPHRASE" heuristic from candidates
-    "headquartered_in": ({"ORG", "PERSON", "FAC", "NORP"}, {"GPE", "LOC", "FAC"}),
-    "operates_in": ({"ORG", "PRODUCT"}, {"GPE", "LOC", "NORP"}),
-    "subsidiary_of": ({"ORG"}, {"ORG"}),
-    "parent_of": ({"ORG"}, {"ORG"}),
-    "member_of": ({"ORG", "PERSON", "PRODUCT"}, {"ORG"}),
-    "part_of": (
-        {"ORG", "PRODUCT", "FAC", "WORK_OF_ART", "LOC", "GPE"},
-        {"ORG", "PRODUCT", "FAC", "WORK_OF_ART", "LOC", "GPE"},
-    ),
-    "uses": (
-        {"ORG", "PERSON", "PRODUCT"},
-        {"PRODUCT", "WORK_OF_ART", "LAW", "NOUNPHRASE"},
-    ),
-    "provides": ({"ORG", "PRODUCT"}, {"NOUNPHRASE", "PRODUCT", "WORK_OF_ART"}),
-    "requires": ({"LAW", "ORG"}, {"NOUNPHRASE", "WORK_OF_ART"}),
-    "prohibits": ({"LAW", "ORG"}, {"NOUNPHRASE", "WORK_OF_ART"}),
-    "covered_by": (
-        {
-            "ORG",
-            "PRODUCT",
-            "PERSON",
-            "FAC",
-            "GPE",
-            "EVENT",
-            "LAW",
-            "NORP",
-            "LOC",
-            "WORK_OF_ART",
-            "NOUNPHRASE",
-        },
-        {"LAW"},
-    ),
-    "type": (
-        {
-            "ORG",
-            "PRODUCT",
-            "PERSON",
-            "FAC",
-            "GPE",
-            "EVENT",
-            "LAW",
-            "NORP",
-            "LOC",
-            "WORK_OF_ART",
-            "NOUNPHRASE",
-        },
-        {"NOUNPHRASE", "ORG", "PRODUCT", "WORK_OF_ART"},
-    ),
-}
+try:
+    from groundkg import ort_session
+    from groundkg.re_types import ALLOWED_TYPES
+except ImportError:  # run as a script: python groundkg/re_infer.py
+    import ort_session
+    from re_types import ALLOWED_TYPES
 
 
 def type_compatible(pred, s_label, o_label):
@@ -95,7 +48,7 @@ def main():
 
     thresholds = json.load(open(thresh_path, "r", encoding="utf-8"))
     classes = json.load(open("models/classes.json", "r", encoding="utf-8"))
-    sess = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    sess = ort_session.open_session(onnx_path)  # thread/optimization settings from GK_ORT_* or autotune
     inp_name = sess.get_inputs()[0].name
 
     with open(cand_path, "r", encoding="utf-8") as f:
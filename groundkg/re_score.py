@@ -2,9 +2,20 @@
 import sys
 import json
 import os
-import onnxruntime as ort
+import argparse
+import collections
+import time
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+try:
+    from groundkg import embed_cache, ort_session, pack_io, probs_io, re_types, streams
+except ImportError:  # run as a script: python groundkg/re_score.py
+    import embed_cache
+    import ort_session
+    import pack_io
+    import probs_io
+    import re_types
+    import streams
 
 # Use same model as training
 MODEL_NAME = "all-MiniLM-L6-v2"
@@ -12,16 +23,55 @@ EMBEDDING_DIM = 384
 
 # Global cache for sentence transformer model
 _embedder_cache = None
+_torch_threads = None  # set by pin_threads in --workers processes
+
+THREAD_ENV = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
 
 
 def get_embedder():
     """Get or create sentence transformer model (cached)."""
     global _embedder_cache
     if _embedder_cache is None:
+        from sentence_transformers import SentenceTransformer  # pulls in torch; not needed for fused models
+
+        if _torch_threads:
+            import torch
+
+            torch.set_num_threads(_torch_threads)
         _embedder_cache = SentenceTransformer(MODEL_NAME)
     return _embedder_cache
 
 
+def pin_threads(n):
+    """Limit this process's torch/BLAS pools to ``n`` threads (before torch is imported)."""
+    global _torch_threads
+    _torch_threads = n
+    for var in THREAD_ENV:
+        os.environ[var] = str(n)
+
+
+def encoder_version():
+    """Version part of the embedding cache key (the encoder weights are pinned by name).
+
+    Read from the installed distribution, so it does not need the (lazily
+    imported) package to be loaded yet.
+    """
+    from importlib import metadata
+
+    try:
+        version = metadata.version("sentence-transformers")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+    return f"sentence-transformers {version}"
+
+
+class LazyEmbedder:
+    """Loads the encoder on first use, so runs served entirely from the embedding cache never load it."""
+
+    def encode(self, texts, **kwargs):
+        return get_embedder().encode(texts, **kwargs)
+
+
 def mark(text, s, o):
     s0, s1 = s["start"], s["end"]
     o0, o1 = o["start"], o["end"]
@@ -40,142 +90,537 @@ def mark(text, s, o):
     )
 
 
-def main():
-    cand_path, onnx_path, classes_path = sys.argv[1:4]
-    if not os.path.exists(onnx_path):
-        print("ERROR: models/promoter_v1.onnx missing", file=sys.stderr)
-        sys.exit(2)
-    
-    # Load sentence transformer model
-    embedder = get_embedder()
-    
-    # Load ONNX model and classes
-    classes = json.load(open(classes_path, "r", encoding="utf-8"))
-    sess = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
-    inp_name = sess.get_inputs()[0].name
-    
+def load_session(onnx_path, **ort_options):
+    """Open the ONNX head and sanity-check its input/output signature.
+
+    ``ort_options`` (intra_op, inter_op, opt_level) go to ``ort_session.open_session``.
+    """
+    sess = ort_session.open_session(onnx_path, **ort_options)
+    if is_fused(sess):
+        return sess
+
     # Check input shape to verify it expects embeddings
     input_shape = sess.get_inputs()[0].shape
     if len(input_shape) != 2 or input_shape[1] != EMBEDDING_DIM:
         print(f"WARNING: ONNX model expects shape {input_shape}, but embedding dim is {EMBEDDING_DIM}", file=sys.stderr)
-    
+
     # Debug: Check output structure
     output_info = []
     for i, out in enumerate(sess.get_outputs()):
         output_info.append(f"outputs[{i}]: name={out.name}, shape={out.shape}, type={out.type}")
     print(f"DEBUG: ONNX output info: {', '.join(output_info)}", file=sys.stderr)
-    
-    # Process candidates in batches for efficiency
-    batch_texts = []
-    batch_candidates = []
-    batch_size = 32
-    
-    with open(cand_path, "r", encoding="utf-8") as f:
-        for line in f:
-            c = json.loads(line)
-            text = c["text"]
-            s = c["subject"]
-            o = c["object"]
-            marked = mark(text, s, o)
-            
-            batch_texts.append(marked)
-            batch_candidates.append(c)
-            
-            # Process batch when full
-            if len(batch_texts) >= batch_size:
-                # Get embeddings
-                embeddings = embedder.encode(batch_texts, show_progress_bar=False, convert_to_numpy=True)
-                
-                # Run ONNX model on embeddings
-                for emb, c in zip(embeddings, batch_candidates):
-                    outputs = sess.run(None, {inp_name: emb.reshape(1, -1).astype(np.float32)})
-                    # ONNX LogisticRegression with zipmap=False outputs:
-                    # outputs[0] = label (string) - predicted class name
-                    # outputs[1] = probabilities [batch_size, num_classes] - probability array
-                    # Use outputs[1] for probabilities
-                    if len(outputs) >= 2:
-                        # Find the output with probabilities (2D float array)
-                        probs = None
-                        for out_idx, out in enumerate(outputs):
-                            if len(out.shape) == 2 and out.shape[1] == len(classes) and out.dtype in (np.float32, np.float64):
-                                probs = out[0]  # Get first batch item [num_classes]
-                                break
-                        if probs is None:
-                            # Fallback: use outputs[1] if it exists and is numeric
-                            if len(outputs) > 1 and not isinstance(outputs[1][0], str):
-                                probs = outputs[1][0] if len(outputs[1].shape) == 2 else outputs[1]
-                    else:
-                        probs = outputs[0][0]
-                    
-                    if probs is None:
-                        raise ValueError(f"Could not find probability output. Outputs: {[(i, o.shape, o.dtype) for i, o in enumerate(outputs)]}")
-                    
-                    # Ensure probs is numpy array of floats
-                    probs = np.asarray(probs, dtype=np.float32).flatten()
-                    if len(probs) != len(classes):
-                        raise ValueError(f"Probability array length {len(probs)} doesn't match classes {len(classes)}")
-                    
-                    i = int(np.argmax(probs))
-                    pred = classes[i]
-                    p = float(probs[i])
-                    rec = {
-                        "doc_id": c["doc_id"],
-                        "sent_start": c["sent_start"],
-                        "text": c["text"],
-                        "subject": c["subject"],
-                        "object": c["object"],
-                        "pred": pred,
-                        "prob": p,
-                    }
-                    sys.stdout.write(json.dumps(rec, ensure_ascii=False) + "\n")
-                
-                batch_texts = []
-                batch_candidates = []
-        
-        # Process remaining items
-        if batch_texts:
-            embeddings = embedder.encode(batch_texts, show_progress_bar=False, convert_to_numpy=True)
-            for emb, c in zip(embeddings, batch_candidates):
-                outputs = sess.run(None, {inp_name: emb.reshape(1, -1).astype(np.float32)})
-                # ONNX LogisticRegression with zipmap=False outputs:
-                # outputs[0] = label (string) - predicted class name
-                # outputs[1] = probabilities [batch_size, num_classes] - probability array
-                # Use outputs[1] for probabilities
-                if len(outputs) >= 2:
-                    # Find the output with probabilities (2D float array)
-                    probs = None
-                    for out_idx, out in enumerate(outputs):
-                        if len(out.shape) == 2 and out.shape[1] == len(classes) and out.dtype in (np.float32, np.float64):
-                            probs = out[0]  # Get first batch item [num_classes]
-                            break
-                    if probs is None:
-                        # Fallback: use outputs[1] if it exists and is numeric
-                        if len(outputs) > 1 and not isinstance(outputs[1][0], str):
-                            probs = outputs[1][0] if len(outputs[1].shape) == 2 else outputs[1]
-                else:
-                    probs = outputs[0][0]
-                
-                if probs is None:
-                    raise ValueError(f"Could not find probability output. Outputs: {[(i, o.shape, o.dtype) for i, o in enumerate(outputs)]}")
-                
-                # Ensure probs is numpy array of floats
-                probs = np.asarray(probs, dtype=np.float32).flatten()
-                if len(probs) != len(classes):
-                    raise ValueError(f"Probability array length {len(probs)} doesn't match classes {len(classes)}")
-                
-                i = int(np.argmax(probs))
-                pred = classes[i]
-                p = float(probs[i])
-                rec = {
-                    "doc_id": c["doc_id"],
-                    "sent_start": c["sent_start"],
-                    "text": c["text"],
-                    "subject": c["subject"],
-                    "object": c["object"],
-                    "pred": pred,
-                    "prob": p,
-                }
-                sys.stdout.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    return sess
+
+
+def is_fused(sess):
+    """True for a fused encoder+head graph (token ids in, probabilities out)."""
+    inputs = sess.get_inputs()
+    return bool(inputs) and inputs[0].name == "input_ids"
+
+
+def _top(probs):
+    idx = probs.argmax(axis=1)
+    return idx, probs[np.arange(len(idx)), idx]
+
+
+class Head:
+    """The ONNX classifier head, run once per batch on the whole [B, dim] matrix.
+
+    The probability output is picked from the session metadata when that is
+    unambiguous (one 2-D float output), otherwise from the first run's
+    arrays; either way it is resolved once and reused.
+    """
+
+    def __init__(self, sess, classes):
+        self.sess = sess
+        self.classes = list(classes)
+        inp = sess.get_inputs()[0]
+        self.inp_name = inp.name
+        self.row_at_a_time = bool(inp.shape) and inp.shape[0] == 1  # head exported with a fixed batch of 1
+        float_2d = [
+            i
+            for i, out in enumerate(sess.get_outputs())
+            if "float" in str(getattr(out, "type", "")) and len(getattr(out, "shape", None) or []) == 2
+        ]
+        self.prob_idx = float_2d[0] if len(float_2d) == 1 else None
+
+    def _find_prob_output(self, outputs):
+        # ONNX LogisticRegression with zipmap=False outputs:
+        # outputs[0] = label (string) - predicted class name
+        # outputs[1] = probabilities [batch_size, num_classes] - probability array
+        for i, out in enumerate(outputs):
+            out = np.asarray(out)
+            if out.ndim == 2 and out.shape[1] == len(self.classes) and out.dtype in (np.float32, np.float64):
+                return i
+        if len(outputs) == 1:
+            return 0
+        if len(outputs) > 1 and np.asarray(outputs[1]).dtype.kind == "f":
+            return 1  # Fallback: outputs[1] if it is numeric
+        raise ValueError(
+            f"Could not find probability output. Outputs: {[(i, np.shape(o), np.asarray(o).dtype) for i, o in enumerate(outputs)]}"
+        )
+
+    def _run(self, X):
+        outputs = self.sess.run(None, {self.inp_name: X})
+        if self.prob_idx is None:
+            self.prob_idx = self._find_prob_output(outputs)
+        return np.asarray(outputs[self.prob_idx], dtype=np.float32).reshape(len(X), -1)
+
+    def probs(self, X):
+        """[B, C] class probabilities for a [B, dim] embedding matrix."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if self.row_at_a_time:
+            probs = np.concatenate([self._run(X[i : i + 1]) for i in range(len(X))]) if len(X) else np.zeros((0, len(self.classes)), np.float32)
+        else:
+            probs = self._run(X)
+        if probs.shape[1] != len(self.classes):
+            raise ValueError(f"Probability array length {probs.shape[1]} doesn't match classes {len(self.classes)}")
+        return probs
+
+    def predict(self, X):
+        """Predicted class index and its probability per row (vectorized argmax)."""
+        return _top(self.probs(X))
+
+
+def load_tokenizer(meta):
+    """Fast (Rust) tokenizer stored in the fused model's metadata by train_re_transformers."""
+    from tokenizers import Tokenizer
+
+    tok = Tokenizer.from_str(meta["tokenizer"])
+    tok.enable_truncation(int(meta.get("max_length", 256)))
+    tok.enable_padding(pad_id=int(meta.get("pad_id", 0)), pad_token=meta.get("pad_token", "[PAD]"))
+    return tok
+
+
+class FusedHead:
+    """Fused tokenizer-output → transformer → pooling → LR graph; marked texts in, no torch needed."""
+
+    def __init__(self, sess, classes, tokenizer=None):
+        self.sess = sess
+        self.classes = list(classes)
+        self.inputs = [i.name for i in sess.get_inputs()]
+        self.tokenizer = tokenizer or load_tokenizer(sess.get_modelmeta().custom_metadata_map)
+
+    def probs(self, texts):
+        """[B, C] class probabilities for a batch of marked texts."""
+        if not texts:
+            return np.zeros((0, len(self.classes)), np.float32)
+        enc = self.tokenizer.encode_batch([t.strip() for t in texts])  # padded to the longest text
+        feeds = {"input_ids": np.array([e.ids for e in enc], dtype=np.int64)}
+        feeds["attention_mask"] = np.array([e.attention_mask for e in enc], dtype=np.int64)
+        if "token_type_ids" in self.inputs:
+            feeds["token_type_ids"] = np.zeros_like(feeds["input_ids"])
+        probs = np.asarray(self.sess.run(None, feeds)[0], dtype=np.float32)
+        if probs.shape[1] != len(self.classes):
+            raise ValueError(f"Probability array length {probs.shape[1]} doesn't match classes {len(self.classes)}")
+        return probs
+
+    def predict(self, texts):
+        return _top(self.probs(texts))
+
+
+def _encode(embedder, texts):
+    return embedder.encode(texts, show_progress_bar=False, convert_to_numpy=True)
+
+
+def iter_marked(candidates):
+    """Yield (candidate, marked text) pairs; the input of ``iter_scored(..., marked=True)``."""
+    for c in candidates:
+        yield c, mark(c["text"], c["subject"], c["object"])
+
+
+def _score_batch(batch, embedder, head, cache=None, sent_idx=False):
+    """Scored records and their [B, C] probabilities for (candidate, marked text) pairs.
+
+    With ``sent_idx`` the records keep the candidates' sentence key, which the
+    normalized layout needs; flat scored records do not carry it.
+    """
+    texts = [t for _, t in batch]
+    if isinstance(head, FusedHead):
+        probs = head.probs(texts)  # the fused graph embeds the texts itself
+    else:
+        if cache is None:
+            embeddings = _encode(embedder, texts)
+        else:
+            embeddings = cache.embed(texts, lambda missing: _encode(embedder, missing))
+        probs = head.probs(embeddings)
+    idx, top = _top(probs)
+    classes = head.classes
+    records = []
+    for (c, _), i, p in zip(batch, idx.tolist(), top.tolist()):
+        rec = {
+            "doc_id": c["doc_id"],
+            "sent_start": c["sent_start"],
+            "text": c["text"],
+            "subject": c["subject"],
+            "object": c["object"],
+            "pred": classes[i],
+            "prob": p,
+        }
+        if sent_idx and "sent_idx" in c:
+            rec["sent_idx"] = c["sent_idx"]
+        records.append(rec)
+    return records, probs
+
+
+def token_lengths(texts, embedder=None, head=None):
+    """Tokenized length of each marked text (character length when no tokenizer is at hand)."""
+    if isinstance(head, FusedHead):
+        return [sum(e.attention_mask) for e in head.tokenizer.encode_batch([t.strip() for t in texts])]
+    tok = getattr(embedder, "tokenizer", None)
+    if tok is None:  # e.g. LazyEmbedder: do not load the encoder just to measure
+        return [len(t) for t in texts]
+    max_length = getattr(embedder, "max_seq_length", None)
+    return [len(ids) for ids in tok(texts, truncation=max_length is not None, max_length=max_length)["input_ids"]]
+
+
+def _score_window(window, embedder, head, batch_size, cache=None, sent_idx=False):
+    """Score a window in batches of similar length; records and probabilities come back in window order."""
+    lengths = token_lengths([t for _, t in window], embedder, head)
+    order = sorted(range(len(window)), key=lengths.__getitem__)
+    out = [None] * len(window)
+    probs = np.empty((len(window), len(head.classes)), dtype=np.float32)
+    for i in range(0, len(order), batch_size):
+        idx = order[i : i + batch_size]
+        records, probs[idx] = _score_batch([window[j] for j in idx], embedder, head, cache, sent_idx)
+        for j, rec in zip(idx, records):
+            out[j] = rec
+    return out, probs
+
+
+DEFAULT_BATCH_SIZE = 32
+
+
+def make_head(sess, classes):
+    """``FusedHead`` for a fused model, else ``Head`` over the embeddings."""
+    return FusedHead(sess, classes) if is_fused(sess) else Head(sess, classes)
+
+
+def iter_scored(
+    candidates,
+    embedder,
+    sess,
+    classes,
+    batch_size=DEFAULT_BATCH_SIZE,
+    cache=None,
+    bucket_window=0,
+    marked=False,
+    head=None,
+    probs_sink=None,
+    sent_idx=False,
+):
+    """Yield scored records for an iterable of candidate records, in order.
+
+    With an ``embed_cache.EmbeddingCache`` only texts not embedded before go
+    through the encoder. A fused model (see ``is_fused``) needs no ``embedder``.
+    With ``bucket_window`` > ``batch_size``, that many candidates are read at a
+    time and batched by tokenized length, so short and long texts are not
+    padded to each other; the output order is unchanged. With ``marked`` the
+    input is already ``iter_marked`` pairs (e.g. marked in a reader thread).
+    A long-lived caller can pass a ``make_head`` result to reuse it.
+    ``probs_sink`` is called with each batch's [B, C] probabilities, in output
+    order (e.g. ``probs_io.ProbsWriter.append``). ``sent_idx`` keeps the
+    candidates' sentence key on the records, for ``pack_io.normalize``.
+    """
+    head = head or make_head(sess, classes)
+    pairs = candidates if marked else iter_marked(candidates)
+    if bucket_window > batch_size:
+        chunk, score = bucket_window, lambda b: _score_window(b, embedder, head, batch_size, cache, sent_idx)
+    else:
+        chunk, score = batch_size, lambda b: _score_batch(b, embedder, head, cache, sent_idx)
+    batch = []
+    for pair in pairs:
+        batch.append(pair)
+        # Process batch (or bucketing window) when full
+        if len(batch) >= chunk:
+            records, probs = score(batch)
+            if probs_sink is not None:
+                probs_sink(probs)
+            yield from records
+            batch = []
+    # Process remaining items
+    if batch:
+        records, probs = score(batch)
+        if probs_sink is not None:
+            probs_sink(probs)
+        yield from records
+
+
+WORKER_CHUNK = 512  # pairs per shard sent to a --workers process
+_worker = {}
+
+
+def _init_worker(onnx_path, classes, threads, ort_options, batch_size, bucket_window, cache_args, sent_idx=False):
+    pin_threads(threads)
+    sess = load_session(onnx_path, **{**ort_options, "intra_op": threads, "inter_op": None})
+    cache = embedder = None
+    if not is_fused(sess):
+        if cache_args:
+            cache = embed_cache.EmbeddingCache(*cache_args, readonly=True)
+            embedder = LazyEmbedder()
+        else:
+            embedder = get_embedder()
+    _worker.update(
+        sess=sess,
+        head=make_head(sess, classes),
+        classes=classes,
+        embedder=embedder,
+        cache=cache,
+        batch_size=batch_size,
+        bucket_window=bucket_window,
+        sent_idx=sent_idx,
+    )
+
+
+def _score_shard(pairs):
+    """Scored records, [N, C] probabilities and new cache rows for one shard (in a worker)."""
+    w, probs = _worker, []
+    records = list(
+        iter_scored(
+            pairs,
+            w["embedder"],
+            w["sess"],
+            w["classes"],
+            w["batch_size"],
+            w["cache"],
+            bucket_window=w["bucket_window"],
+            marked=True,
+            head=w["head"],
+            probs_sink=probs.append,
+            sent_idx=w["sent_idx"],
+        )
+    )
+    cache, counts = w["cache"], (0, 0)
+    pending = []
+    if cache is not None:
+        pending, counts = cache.take_pending(), (cache.hits, cache.misses)
+        cache.hits = cache.misses = 0
+    return records, np.concatenate(probs), pending, counts
+
+
+def _counted(records, stats):
+    for rec in records:
+        stats["pairs"] = stats.get("pairs", 0) + 1
+        yield rec
+
+
+def iter_scored_parallel(
+    pairs,
+    workers,
+    init_args,
+    chunk_size=WORKER_CHUNK,
+    cache=None,
+    probs_sink=None,
+    stats=None,
+    mp_context="spawn",
+):
+    """Score (candidate, marked text) pairs in ``workers`` processes; records come back in input order.
+
+    Shards of ``chunk_size`` pairs go to whichever worker is free, with at most
+    two per worker in flight. ``init_args`` are ``_init_worker``'s arguments.
+    Rows the workers encoded are appended to ``cache`` here; the workers only read it.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    ctx = multiprocessing.get_context(mp_context)  # spawn: no forking of the reader/writer threads
+    ex = ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=init_args)
+    inflight = collections.deque()
+
+    def collect(fut):
+        records, probs, pending, (hits, misses) = fut.result()
+        if cache is not None:
+            for digests, embeddings in pending:
+                cache.add_missing(digests, embeddings)
+            cache.hits += hits
+            cache.misses += misses
+        if probs_sink is not None:
+            probs_sink(probs)
+        if stats is not None:
+            stats["pairs"] = stats.get("pairs", 0) + len(records)
+        return records
+
+    try:
+        shard = []
+        for pair in pairs:
+            shard.append(pair)
+            if len(shard) >= chunk_size:
+                inflight.append(ex.submit(_score_shard, shard))
+                shard = []
+                if len(inflight) >= 2 * workers:
+                    yield from collect(inflight.popleft())
+        if shard:
+            inflight.append(ex.submit(_score_shard, shard))
+        while inflight:
+            yield from collect(inflight.popleft())
+    finally:
+        ex.shutdown(wait=True, cancel_futures=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Score candidate pairs with the sentence encoder + ONNX head.")
+    ap.add_argument("cand_path", help="candidates JSONL (flat or normalized layout)")
+    ap.add_argument("onnx_path", help="ONNX head, or a fused encoder+head model (train_re_transformers --export-fused)")
+    ap.add_argument("classes_path")
+    ap.add_argument("--normalized", action="store_true", help="write each sentence once plus compact score rows")
+    ap.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="texts per encoder call and per ONNX head run")
+    ap.add_argument(
+        "--bucket-window",
+        type=int,
+        default=0,
+        help="read this many candidates at a time and batch them by tokenized length (0: file order)",
+    )
+    ap.add_argument(
+        "--type-filter",
+        action="store_true",
+        help="skip pairs whose entity labels no predicate accepts (see re_types.ALLOWED_TYPES)",
+    )
+    ap.add_argument("--embed-cache", default=None, help="directory of the persistent embedding cache (reused across retrains)")
+    ap.add_argument("--embed-cache-dtype", choices=["float32", "float16"], default="float32")
+    ap.add_argument(
+        "--serial",
+        action="store_true",
+        help="parse, score and write on one thread (default: reader and writer threads around the compute stage)",
+    )
+    ap.add_argument("--queue-size", type=int, default=16, help="bound of the reader/writer queues (in chunks of 64)")
+    ap.add_argument(
+        "--server",
+        default=None,
+        metavar="ADDR",
+        help="score through a running groundkg.score_server (unix:PATH or HOST:PORT); falls back to in-process",
+    )
+    ap.add_argument(
+        "--probs",
+        default=None,
+        metavar="PATH",
+        help="also write the full [N, C] probabilities as a .npy (see groundkg.probs_io)",
+    )
+    ap.add_argument(
+        "--probs-dtype",
+        choices=["float32", "float16"],
+        default="float32",
+        help="dtype of the --probs sidecar; float16 halves it but can flip near-threshold decisions",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="score in this many processes, each pinned to --intra-op-threads (default: cores / workers) threads",
+    )
+    ap.add_argument("--worker-chunk", type=int, default=WORKER_CHUNK, help="pairs per shard sent to a worker")
+    ort_session.add_arguments(ap)
+    args = ap.parse_args()
+    if not os.path.exists(args.onnx_path):
+        print("ERROR: models/promoter_v1.onnx missing", file=sys.stderr)
+        sys.exit(2)
+
+    # Load ONNX model and classes (unless a warm scoring server is available)
+    classes = json.load(open(args.classes_path, "r", encoding="utf-8"))
+    client = None
+    if args.server and args.probs:
+        print("--probs: scoring in-process (the score server returns top classes only)", file=sys.stderr)
+    elif args.server:
+        try:
+            from groundkg import score_server
+        except ImportError:  # run as a script
+            import score_server
+        client = score_server.connect(args.server, classes, args.onnx_path)
+    if client and args.workers > 1:
+        print("--workers ignored: scoring through the server", file=sys.stderr)
+    parallel = client is None and args.workers > 1  # workers load the models themselves
+    sess = None if client or parallel else load_session(args.onnx_path, **ort_session.options_from_args(args))
+
+    # Load sentence transformer model (on first cache miss when caching)
+    cache = embedder = cache_args = None
+    if parallel:
+        if args.embed_cache:  # workers read it; rows they encode are appended here
+            cache_args = (args.embed_cache, MODEL_NAME, encoder_version(), EMBEDDING_DIM, args.embed_cache_dtype)
+            cache = embed_cache.EmbeddingCache(*cache_args)
+    elif client is None:
+        if is_fused(sess):
+            if args.embed_cache:
+                print("Fused model: --embed-cache ignored (no separate embeddings)", file=sys.stderr)
+        elif args.embed_cache:
+            cache = embed_cache.EmbeddingCache(
+                args.embed_cache, MODEL_NAME, encoder_version(), EMBEDDING_DIM, args.embed_cache_dtype
+            )
+            embedder = LazyEmbedder()
+        else:
+            embedder = get_embedder()
+
+    candidates = pack_io.read_records(args.cand_path)
+    if args.type_filter:
+        prune_stats = {}
+        candidates = re_types.prune_candidates(candidates, re_types.allowed_label_pairs(classes), prune_stats)
+    probs_writer = None
+    if client:
+        scored = client.iter_scored(
+            candidates if args.serial else streams.threaded(candidates, args.queue_size), sent_idx=args.normalized
+        )
+    else:
+        pairs = iter_marked(candidates)
+        if not args.serial:
+            pairs = streams.threaded(pairs, args.queue_size)  # reader: JSON decode, filter, mark
+        probs_writer = probs_io.ProbsWriter(args.probs, classes, args.probs_dtype) if args.probs else None
+        probs_sink = probs_writer.append if probs_writer else None
+        score_stats = {}
+        if parallel:
+            threads = args.intra_op_threads or max(1, (os.cpu_count() or 1) // args.workers)
+            init_args = (
+                args.onnx_path,
+                classes,
+                threads,
+                ort_session.options_from_args(args),
+                args.batch_size,
+                args.bucket_window,
+                cache_args,
+                args.normalized,
+            )
+            scored = iter_scored_parallel(
+                pairs,
+                args.workers,
+                init_args,
+                max(args.worker_chunk, args.bucket_window),
+                cache=cache,
+                probs_sink=probs_sink,
+                stats=score_stats,
+            )
+        else:
+            scored = iter_scored(
+                pairs,
+                embedder,
+                sess,
+                classes,
+                args.batch_size,
+                cache,
+                bucket_window=args.bucket_window,
+                marked=True,
+                probs_sink=probs_sink,
+                sent_idx=args.normalized,
+            )
+            scored = _counted(scored, score_stats)
+    out = sys.stdout
+    t0 = time.perf_counter()
+
+    def write(records):
+        out.writelines(pack_io.record_lines(records, args.normalized))
+
+    if args.serial:
+        write(scored)
+    else:
+        streams.consume_threaded(scored, write, args.queue_size)  # writer: json.dumps + write
+    if client is None:
+        elapsed = time.perf_counter() - t0
+        n = score_stats.get("pairs", 0)
+        where = f"{args.workers} workers x {threads} threads" if parallel else "in-process"
+        print(f"Scored {n} pairs ({where}) in {elapsed:.1f}s: {n / elapsed if elapsed else 0:.1f} pairs/s", file=sys.stderr)
+    if probs_writer is not None:
+        probs_writer.close()
+        print(f"Probabilities: {probs_writer.rows} x {len(classes)} → {args.probs}", file=sys.stderr)
+    if cache is not None:
+        print(f"Embedding cache: {cache.hits} hits, {cache.misses} encoded ({cache.rows} rows in {cache.dir})", file=sys.stderr)
+    if args.type_filter:
+        re_types.report_pruning(prune_stats)
 
 
 if __name__ == "__main__":
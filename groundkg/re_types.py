@@ -0,0 +1,104 @@
+# groundkg/re_types.py
+"""Entity-type constraints per predicate, shared by inference, scoring and seeding."""
+import sys
+
+ALLOWED_TYPES = {
+    # predicate: (allowed_subject_labels, allowed_object_labels)
+    # Labels are spaCy NER labels plus our "NOUNPHRASE" heuristic from candidates
+    "headquartered_in": ({"ORG", "PERSON", "FAC", "NORP"}, {"GPE", "LOC", "FAC"}),
+    "operates_in": ({"ORG", "PRODUCT"}, {"GPE", "LOC", "NORP"}),
+    "subsidiary_of": ({"ORG"}, {"ORG"}),
+    "parent_of": ({"ORG"}, {"ORG"}),
+    "member_of": ({"ORG", "PERSON", "PRODUCT"}, {"ORG"}),
+    "part_of": (
+        {"ORG", "PRODUCT", "FAC", "WORK_OF_ART", "LOC", "GPE"},
+        {"ORG", "PRODUCT", "FAC", "WORK_OF_ART", "LOC", "GPE"},
+    ),
+    "uses": (
+        {"ORG", "PERSON", "PRODUCT"},
+        {"PRODUCT", "WORK_OF_ART", "LAW", "NOUNPHRASE"},
+    ),
+    "provides": ({"ORG", "PRODUCT"}, {"NOUNPHRASE", "PRODUCT", "WORK_OF_ART"}),
+    "requires": ({"LAW", "ORG"}, {"NOUNPHRASE", "WORK_OF_ART"}),
+    "prohibits": ({"LAW", "ORG"}, {"NOUNPHRASE", "WORK_OF_ART"}),
+    "covered_by": (
+        {
+            "ORG",
+            "PRODUCT",
+            "PERSON",
+            "FAC",
+            "GPE",
+            "EVENT",
+            "LAW",
+            "NORP",
+            "LOC",
+            "WORK_OF_ART",
+            "NOUNPHRASE",
+        },
+        {"LAW"},
+    ),
+    "type": (
+        {
+            "ORG",
+            "PRODUCT",
+            "PERSON",
+            "FAC",
+            "GPE",
+            "EVENT",
+            "LAW",
+            "NORP",
+            "LOC",
+            "WORK_OF_ART",
+            "NOUNPHRASE",
+        },
+        {"NOUNPHRASE", "ORG", "PRODUCT", "WORK_OF_ART"},
+    ),
+}
+
+
+def allowed_label_pairs(predicates=None, table=None):
+    """Union of (subject_label, object_label) combinations any predicate accepts.
+
+    ``predicates`` (e.g. the model's classes) limits the union to those
+    predicates; "none" is ignored. Returns None when some predicate has no
+    entry in the table, since then any pair is acceptable.
+    """
+    table = ALLOWED_TYPES if table is None else table
+    if predicates is None:
+        predicates = table.keys()
+    pairs = set()
+    for pred in predicates:
+        if pred == "none":
+            continue
+        if pred not in table:
+            return None
+        subj_allowed, obj_allowed = table[pred]
+        pairs.update((s, o) for s in subj_allowed for o in obj_allowed)
+    return pairs
+
+
+def prune_candidates(candidates, allowed, stats=None):
+    """Yield only candidates whose (subject, object) labels are in ``allowed``.
+
+    ``stats`` (a dict) gets "kept"/"pruned" counts; every pruned candidate is
+    one encoder + head call the scorer does not make.
+    """
+    stats = {} if stats is None else stats
+    stats.setdefault("kept", 0)
+    stats.setdefault("pruned", 0)
+    for c in candidates:
+        if allowed is None or (c["subject"].get("label", ""), c["object"].get("label", "")) in allowed:
+            stats["kept"] += 1
+            yield c
+        else:
+            stats["pruned"] += 1
+
+
+def report_pruning(stats, out=None):
+    total = stats["kept"] + stats["pruned"]
+    share = stats["pruned"] / total if total else 0.0
+    print(
+        f"Type filter: pruned {stats['pruned']} of {total} candidates ({share:.1%}); "
+        f"{stats['pruned']} encoder calls saved",
+        file=out or sys.stderr,
+    )
@@ -0,0 +1,353 @@
+# groundkg/score_server.py
+"""Long-lived scoring daemon: keeps the encoder and ONNX head warm.
+
+Listens on a Unix socket (``unix:PATH``) or localhost HTTP (``HOST:PORT``).
+The endpoints are:
+
+    POST /score    candidate records as JSONL → scored records as JSONL (same as re_score)
+    GET  /health   model path and mtime, and classes
+    GET  /stats    request/pair/batch counts and p50/p99 request latency
+
+Requests from concurrent clients are merged into micro-batches of up to
+``--batch-size`` pairs. A batch is closed after ``--max-wait-ms`` even if it
+is not full. ``re_score --server ADDR`` uses the daemon when it is running.
+"""
+import argparse
+import collections
+import http.client
+import http.server
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    from groundkg import embed_cache, ort_session, re_score
+except ImportError:  # run as a script: python groundkg/score_server.py
+    import embed_cache
+    import ort_session
+    import re_score
+
+DEFAULT_ADDRESS = "unix:.cache/score.sock"
+
+
+def parse_address(address):
+    """("unix", path) for ``unix:PATH``, else ("tcp", (host, port)) for ``[http://]HOST:PORT``."""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:") :]
+    host, _, port = address.removeprefix("http://").rstrip("/").rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+class LatencyStats:
+    """Request latencies over a sliding window, plus running totals."""
+
+    def __init__(self, window=10000):
+        self.latencies = collections.deque(maxlen=window)
+        self.lock = threading.Lock()
+        self.requests = self.pairs = self.batches = self.batched_pairs = 0
+
+    def record(self, seconds, n_pairs):
+        with self.lock:
+            self.latencies.append(seconds)
+            self.requests += 1
+            self.pairs += n_pairs
+
+    def record_batch(self, n_pairs):
+        with self.lock:
+            self.batches += 1
+            self.batched_pairs += n_pairs
+
+    def snapshot(self):
+        with self.lock:
+            lat = sorted(self.latencies)
+            pct = lambda q: round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000, 2) if lat else None  # noqa: E731
+            return {
+                "requests": self.requests,
+                "pairs": self.pairs,
+                "batches": self.batches,
+                "mean_batch_pairs": round(self.batched_pairs / self.batches, 1) if self.batches else None,
+                "p50_ms": pct(0.50),
+                "p99_ms": pct(0.99),
+            }
+
+
+class MicroBatcher:
+    """Merges concurrent ``submit`` calls into one ``score`` call per micro-batch.
+
+    ``score`` maps a list of (candidate, marked text) pairs to scored records
+    and only ever runs on the batcher thread, so the models need no locking.
+    """
+
+    def __init__(self, score, batch_size=re_score.DEFAULT_BATCH_SIZE, max_wait=0.005, stats=None):
+        self.score = score
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.stats = stats
+        self.jobs = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, pairs):
+        fut = Future()
+        self.jobs.put((pairs, fut))
+        return fut.result()
+
+    def _gather(self):
+        jobs = [self.jobs.get()]
+        n = len(jobs[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while n < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                jobs.append(self.jobs.get(timeout=timeout))
+            except queue.Empty:
+                break
+            n += len(jobs[-1][0])
+        return jobs
+
+    def _run(self):
+        while True:
+            jobs = self._gather()
+            pairs = [p for job, _ in jobs for p in job]
+            try:
+                recs = self.score(pairs)
+            except Exception as exc:  # hand the error to every waiting request
+                for _, fut in jobs:
+                    fut.set_exception(exc)
+                continue
+            if self.stats is not None:
+                self.stats.record_batch(len(pairs))
+            start = 0
+            for job, fut in jobs:
+                fut.set_result(recs[start : start + len(job)])
+                start += len(job)
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients reuse one connection
+
+    def _reply(self, body, content_type="application/json", status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(json.dumps(self.server.info).encode("utf-8"))
+        elif self.path == "/stats":
+            self._reply(json.dumps(self.server.stats.snapshot()).encode("utf-8"))
+        else:
+            self._reply(b'{"error": "not found"}', status=404)
+
+    def do_POST(self):
+        t0 = time.perf_counter()
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != "/score":
+            self._reply(b'{"error": "not found"}', status=404)
+            return
+        try:
+            cands = [json.loads(line) for line in body.decode("utf-8").splitlines() if line.strip()]
+            recs = self.server.batcher.submit(list(re_score.iter_marked(cands))) if cands else []
+        except Exception as exc:
+            self._reply(json.dumps({"error": f"{type(exc).__name__}: {exc}"}).encode("utf-8"), status=400)
+            return
+        out = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in recs).encode("utf-8")
+        self.server.stats.record(time.perf_counter() - t0, len(recs))
+        self._reply(out, content_type="application/x-ndjson")
+
+    def log_message(self, fmt, *args):  # no per-request access log
+        pass
+
+
+class TCPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)  # BaseHTTPRequestHandler expects a (host, port) address
+
+
+def make_server(address, batcher, stats, info):
+    kind, where = parse_address(address)
+    if kind == "unix":
+        os.makedirs(os.path.dirname(os.path.abspath(where)), exist_ok=True)
+        if os.path.exists(where):
+            os.unlink(where)  # stale socket from an earlier run
+        server = UnixServer(where, Handler)
+    else:
+        server = TCPServer(where, Handler)
+    server.batcher, server.stats, server.info = batcher, stats, info
+    return server
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class ScoreClient:
+    """Client for a running daemon; one keep-alive connection per client."""
+
+    def __init__(self, address, timeout=300):
+        kind, where = parse_address(address)
+        if kind == "unix":
+            self.conn = _UnixConnection(where, timeout)
+        else:
+            self.conn = http.client.HTTPConnection(*where, timeout=timeout)
+
+    def _request(self, method, path, body=None):
+        self.conn.request(method, path, body=body)
+        resp = self.conn.getresponse()
+        data = resp.read()
+        if resp.status != 200:
+            raise RuntimeError(f"score server {method} {path}: {resp.status} {data[:200]!r}")
+        return data
+
+    def info(self):
+        return json.loads(self._request("GET", "/health"))
+
+    def stats(self):
+        return json.loads(self._request("GET", "/stats"))
+
+    def score(self, candidates, sent_idx=False):
+        body = "".join(json.dumps(c, ensure_ascii=False) + "\n" for c in candidates).encode("utf-8")
+        recs = [json.loads(line) for line in self._request("POST", "/score", body).splitlines() if line.strip()]
+        if sent_idx:  # the daemon writes flat records; the normalized layout needs the sentence key back
+            for c, rec in zip(candidates, recs):
+                if "sent_idx" in c:
+                    rec["sent_idx"] = c["sent_idx"]
+        return recs
+
+    def iter_scored(self, candidates, chunk=512, sent_idx=False):
+        """Like ``re_score.iter_scored``: scored records in input order, ``chunk`` candidates per request."""
+        batch = []
+        for c in candidates:
+            batch.append(c)
+            if len(batch) >= chunk:
+                yield from self.score(batch, sent_idx)
+                batch = []
+        if batch:
+            yield from self.score(batch, sent_idx)
+
+
+def model_info(onnx_path, classes):
+    """What /health reports about the served model; ``connect`` compares it with the caller's."""
+    return {
+        "model": os.path.realpath(onnx_path),
+        "mtime_ns": os.stat(onnx_path).st_mtime_ns,
+        "classes": list(classes),
+    }
+
+
+def connect(address, classes, onnx_path=None):
+    """A ``ScoreClient`` if a daemon is listening on ``address`` and serves ``classes``, else None.
+
+    With ``onnx_path`` the daemon must also serve that model file, unchanged
+    since it was loaded; a retrained or different model means scoring in-process.
+    """
+    client = ScoreClient(address, timeout=300)
+    try:
+        info = client.info()
+    except (OSError, http.client.HTTPException, ValueError, RuntimeError):  # RuntimeError: not a score server
+        print(f"Score server at {address} not reachable; scoring in-process", file=sys.stderr)
+        return None
+    if info.get("classes") != list(classes):
+        print(f"Score server at {address} serves other classes {info.get('classes')}; scoring in-process", file=sys.stderr)
+        return None
+    if onnx_path is not None:
+        want = model_info(onnx_path, classes)
+        if info.get("model") != want["model"]:
+            served = f"serves {info.get('model')}, not {want['model']}"
+        elif info.get("mtime_ns") != want["mtime_ns"]:
+            served = f"loaded {want['model']} before it last changed"
+        else:
+            served = None
+        if served:
+            print(f"Score server at {address} {served}; scoring in-process", file=sys.stderr)
+            return None
+    return client
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("onnx_path", help="ONNX head or fused model")
+    ap.add_argument("classes_path")
+    ap.add_argument("--listen", default=DEFAULT_ADDRESS, help="unix:PATH or HOST:PORT (default: %(default)s)")
+    ap.add_argument("--batch-size", type=int, default=re_score.DEFAULT_BATCH_SIZE, help="max pairs per micro-batch")
+    ap.add_argument("--max-wait-ms", type=float, default=5.0, help="how long a micro-batch waits to fill up")
+    ap.add_argument("--embed-cache", default=None, help="persistent embedding cache directory (see re_score)")
+    ap.add_argument("--embed-cache-dtype", choices=["float32", "float16"], default="float32")
+    ort_session.add_arguments(ap)
+    ap.add_argument("--stats-every", type=float, default=60.0, help="seconds between latency reports on stderr (0: off)")
+    args = ap.parse_args()
+    if not os.path.exists(args.onnx_path):
+        print(f"ERROR: {args.onnx_path} missing", file=sys.stderr)
+        return 2
+
+    classes = json.load(open(args.classes_path, "r", encoding="utf-8"))
+    sess = re_score.load_session(args.onnx_path, **ort_session.options_from_args(args))
+    head = re_score.make_head(sess, classes)
+    cache = embedder = None
+    if not re_score.is_fused(sess):
+        embedder = re_score.get_embedder()  # load now, not on the first request
+        if args.embed_cache:
+            cache = embed_cache.EmbeddingCache(
+                args.embed_cache,
+                re_score.MODEL_NAME,
+                re_score.encoder_version(),
+                re_score.EMBEDDING_DIM,
+                args.embed_cache_dtype,
+            )
+
+    def score(pairs):
+        return list(
+            re_score.iter_scored(pairs, embedder, sess, classes, args.batch_size, cache=cache, marked=True, head=head)
+        )
+
+    stats = LatencyStats()
+    batcher = MicroBatcher(score, args.batch_size, args.max_wait_ms / 1000, stats)
+    server = make_server(args.listen, batcher, stats, model_info(args.onnx_path, classes))
+    if args.stats_every > 0:
+
+        def report():
+            while True:
+                time.sleep(args.stats_every)
+                print(f"score_server stats: {json.dumps(stats.snapshot())}", file=sys.stderr)
+
+        threading.Thread(target=report, daemon=True).start()
+    print(f"Scoring server listening on {args.listen}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        kind, where = parse_address(args.listen)
+        if kind == "unix" and os.path.exists(where):
+            os.unlink(where)
+        print(f"score_server stats: {json.dumps(stats.snapshot())}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,88 @@
+# groundkg/streams.py
+"""Bounded-queue threads for overlapping pipeline stages.
+
+``threaded`` moves a producer (e.g. reading and parsing JSONL) to a thread;
+``consume_threaded`` moves a consumer (e.g. serializing and writing) to one.
+Records cross the queue in chunks to keep locking off the per-record path,
+and the bounded queue gives backpressure, so memory stays flat however large
+the input. An exception in the thread is re-raised in the caller.
+"""
+import queue
+import threading
+
+CHUNK = 64  # records per queue item
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+def _chunked(records, size=CHUNK):
+    chunk = []
+    for rec in records:
+        chunk.append(rec)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def threaded(records, maxsize=16):
+    """Consume ``records`` in a daemon thread; yield them through a bounded queue."""
+    q = queue.Queue(maxsize)
+
+    def run():
+        try:
+            for chunk in _chunked(records):
+                q.put(chunk)
+        except BaseException as exc:  # re-raised in the consumer
+            q.put(_Failed(exc))
+            return
+        q.put(_DONE)
+
+    threading.Thread(target=run, daemon=True).start()
+    while True:
+        item = q.get()
+        if item is _DONE:
+            return
+        if isinstance(item, _Failed):
+            raise item.exc
+        yield from item
+
+
+def consume_threaded(records, consume, maxsize=16):
+    """Run ``consume(iterable)`` in a thread, feeding it ``records`` iterated here."""
+    q = queue.Queue(maxsize)
+    errors, drained = [], []
+
+    def feed():
+        while True:
+            item = q.get()
+            if item is _DONE:
+                drained.append(True)
+                return
+            yield from item
+
+    def run():
+        try:
+            consume(feed())
+        except BaseException as exc:  # re-raised in the producer
+            errors.append(exc)
+            while not drained and q.get() is not _DONE:  # unblock the producer
+                pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        for chunk in _chunked(records):
+            if errors:
+                break
+            q.put(chunk)
+    finally:
+        q.put(_DONE)
+        thread.join()
+    if errors:
+        raise errors[0]
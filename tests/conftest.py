@@ -1,7 +1,10 @@
+import json
 import sys
 import types
 from pathlib import Path
 
+import pytest
+
 # Ensure the repository root is importable as a package during tests
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
@@ -15,7 +18,14 @@ if "onnxruntime" not in sys.modules:
                 "onnxruntime is stubbed in tests. Monkeypatch InferenceSession in individual tests."
             )
 
-    sys.modules["onnxruntime"] = types.SimpleNamespace(InferenceSession=_StubSession)
+    sys.modules["onnxruntime"] = types.SimpleNamespace(
+        InferenceSession=_StubSession,
+        SessionOptions=types.SimpleNamespace,
+        GraphOptimizationLevel=types.SimpleNamespace(
+            ORT_DISABLE_ALL=0, ORT_ENABLE_BASIC=1, ORT_ENABLE_EXTENDED=2, ORT_ENABLE_ALL=99
+        ),
+        ExecutionMode=types.SimpleNamespace(ORT_SEQUENTIAL=0, ORT_PARALLEL=1),
+    )
 
 if "spacy" not in sys.modules:
     def _stub_load(*_args, **_kwargs):
@@ -41,3 +51,95 @@ if "sentence_transformers" not in sys.modules:
     sys.modules["sentence_transformers"] = types.SimpleNamespace(
         SentenceTransformer=_StubSentenceTransformer
     )
+
+
+# Shared re_score fakes: a deterministic encoder and a binary ONNX head
+SCORE_CLASSES = ["none", "uses"]
+
+
+class FakeEmbedder:
+    """Encoder stand-in: feature 0 is len(text) % 7 / 7, the rest zero."""
+
+    def encode(self, texts, show_progress_bar=False, convert_to_numpy=True):
+        import numpy as np
+        from groundkg import re_score
+
+        X = np.zeros((len(texts), re_score.EMBEDDING_DIM), dtype=np.float32)
+        X[:, 0] = [len(t) % 7 / 7 for t in texts]
+        return X
+
+
+class FakeSession:
+    """Head stand-in: returns [1 - p, p] for p = feature 0."""
+
+    def get_inputs(self):
+        from groundkg import re_score
+
+        return [types.SimpleNamespace(name="x", shape=[None, re_score.EMBEDDING_DIM])]
+
+    def get_outputs(self):
+        return [types.SimpleNamespace(name="probabilities", shape=[None, 2], type="tensor(float)")]
+
+    def run(self, _outputs, feeds):
+        import numpy as np
+
+        p = feeds["x"][:, :1]
+        return [np.hstack([1 - p, p])]
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """Route re_score's encoder and every onnxruntime session to the fakes."""
+    import onnxruntime
+    from groundkg import re_score
+
+    models = types.SimpleNamespace(embedder=FakeEmbedder(), session=FakeSession(), classes=SCORE_CLASSES)
+    monkeypatch.setattr(re_score, "get_embedder", lambda: models.embedder)
+    monkeypatch.setattr(onnxruntime, "InferenceSession", lambda *a, **k: models.session)
+    return models
+
+
+@pytest.fixture
+def make_candidate():
+    """Build a flat candidate pair whose sentence is padded with ``n`` "!"."""
+
+    def make(n, doc_id="d1", sent_idx=0, sent_start=0):
+        return {
+            "doc_id": doc_id,
+            "sent_idx": sent_idx,
+            "sent_start": sent_start,
+            "text": "Alice uses the gadget" + "!" * n,
+            "subject": {"text": "Alice", "start": 0, "end": 5, "label": "PERSON"},
+            "object": {"text": "gadget", "start": 15, "end": 21, "label": "PRODUCT"},
+        }
+
+    return make
+
+
+@pytest.fixture
+def score_inputs(tmp_path):
+    """Write candidates, classes.json and (unless it exists) an empty model file; return the three paths."""
+
+    def write(cands, classes=SCORE_CLASSES):
+        cand_path = tmp_path / "cands.jsonl"
+        onnx_path = tmp_path / "model.onnx"
+        classes_path = tmp_path / "classes.json"
+        cand_path.write_text("".join(json.dumps(c) + "\n" for c in cands), encoding="utf-8")
+        if not onnx_path.exists():
+            onnx_path.write_text("", encoding="utf-8")
+        classes_path.write_text(json.dumps(classes), encoding="utf-8")
+        return str(cand_path), str(onnx_path), str(classes_path)
+
+    return write
+
+
+@pytest.fixture
+def real_spacy(monkeypatch):
+    """The installed spaCy instead of the stub above (restored afterwards)."""
+    import importlib
+
+    monkeypatch.delitem(sys.modules, "spacy")
+    try:
+        return importlib.import_module("spacy")
+    except ImportError:
+        pytest.skip("spaCy is not installed")
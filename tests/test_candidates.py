@@ -132,3 +132,103 @@ def test_main_falls_back_to_chunks_without_entities(tmp_path, monkeypatch):
     for rec in lines:
         assert rec["subject"]["label"] == "NOUNPHRASE"
         assert rec["object"]["label"] == "NOUNPHRASE"
+
+
+def test_select_pairs_matches_full_product_sort():
+    import itertools
+    import random
+
+    rng = random.Random(3)
+    for _ in range(50):
+        ents, pos = [], 0
+        for _ in range(rng.randint(0, 60)):
+            text = f"E{rng.randrange(8)}"
+            ents.append({"text": text, "start": pos, "end": pos + len(text) + rng.randrange(20), "label": "ORG"})
+            pos += rng.randint(0, 15)
+        rng.shuffle(ents)
+
+        pairs, seen = [], set()
+        for s, o in itertools.product(ents, ents):
+            width = max(s["end"], o["end"]) - s["start"]
+            key = (s["text"].lower(), o["text"].lower())
+            if s["start"] >= o["start"] or width > candidates.MAX_CHAR_DIST or key in seen:
+                continue
+            seen.add(key)
+            pairs.append((width, s, o))
+        pairs.sort(key=lambda x: x[0])
+        expected = [(s, o) for _, s, o in pairs[: candidates.MAX_PAIRS_PER_SENT]]
+
+        got = candidates.select_pairs(ents, ents)
+        assert [(id(s), id(o)) for s, o in got] == [(id(s), id(o)) for s, o in expected]
+
+
+def test_span_index_overlap_matches_linear_scan():
+    import random
+
+    rng = random.Random(5)
+    for _ in range(200):
+        spans = []
+        for _ in range(rng.randint(0, 12)):
+            start = rng.randrange(100)
+            spans.append({"start": start, "end": start + rng.randrange(30)})  # nested and empty spans too
+        index = candidates.span_index(spans)
+        start = rng.randrange(110)
+        end = start + rng.randint(1, 20)
+        expected = any(not (end <= e["start"] or start >= e["end"]) for e in spans)
+        assert candidates.overlaps(index, start, end) == expected
+
+
+def test_shard_ranges_cover_file_on_line_boundaries(tmp_path):
+    path = tmp_path / "ner.jsonl"
+    path.write_bytes(b"".join(b'{"n": %d, "t": "%s"}\n' % (i, b"x" * (i % 7)) for i in range(40)))
+
+    for n_shards in (1, 3, 7, 100):
+        ranges = candidates.shard_ranges(str(path), n_shards)
+        assert ranges[0][0] == 0 and ranges[-1][1] == path.stat().st_size
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        data = path.read_bytes()
+        assert all(start == 0 or data[start - 1 : start] == b"\n" for start, _ in ranges)
+
+
+def test_workers_output_matches_serial(tmp_path, monkeypatch):
+    records = []
+    for i in range(30):
+        text = f"Acme{i} Corp sells Widget{i} to Beta Holdings in Paris."
+        records.append(
+            {
+                "doc_id": f"d{i // 4}",
+                "sent_idx": i % 4,
+                "sent_start": 0,
+                "text": text,
+                "entities": [{"text": f"Acme{i} Corp", "start": 0, "end": len(f"Acme{i} Corp"), "label": "ORG"}],
+            }
+        )
+    ner_path = tmp_path / "ner.jsonl"
+    ner_path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+
+    def run(*extra):
+        monkeypatch.setattr("sys.argv", ["candidates.py", str(ner_path), *extra])
+        buf = io.StringIO()
+        monkeypatch.setattr("sys.stdout", buf)
+        candidates.main()
+        return buf.getvalue()
+
+    serial = run()
+    assert serial
+    assert run("--workers", "2") == serial
+    assert "".join(candidates.parallel_candidate_chunks(str(ner_path), 2, shard_bytes=200)) == serial
+
+
+def test_iter_candidates_matches_jsonl_lines():
+    sents = [
+        {
+            "doc_id": "d1",
+            "sent_idx": i,
+            "sent_start": 0,
+            "text": "Acme Corp sells Widget Pro to Beta Holdings",
+            "entities": [{"text": "Acme Corp", "start": 0, "end": 9, "label": "ORG"}],
+        }
+        for i in range(3)
+    ]
+    lines = list(candidates.candidate_lines(json.dumps(s) for s in sents))
+    assert list(candidates.iter_candidates(sents)) == [json.loads(line) for line in lines]
@@ -67,3 +67,11 @@ def test_main_dedupes_whitespace_only_quotes(tmp_path, monkeypatch):
     lines = [json.loads(line) for line in buf.getvalue().splitlines() if line]
     assert len(lines) == 1
     assert lines[0]["subject"].strip().lower() == "alice"
+
+
+def test_iter_unique_keeps_first_of_each_key():
+    a = {"subject": "Alice", "predicate": "uses", "object": "Gadget", "evidence": {"quote": "q", "doc_id": "d1"}}
+    b = {"subject": " alice", "predicate": "uses", "object": "gadget ", "evidence": {"quote": "q", "doc_id": "d2"}}
+    c = {"subject": "Bob", "predicate": "uses", "object": "Gadget", "evidence": {"quote": "q"}}
+
+    assert list(dedupe_edges.iter_unique([a, b, c])) == [a, c]
@@ -0,0 +1,110 @@
+import fcntl
+import os
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from groundkg import embed_cache, re_score
+
+
+class CountingEncoder:
+    def __init__(self, dim=4):
+        self.dim = dim
+        self.seen = []
+
+    def __call__(self, texts):
+        self.seen.extend(texts)
+        return np.array([[len(t) + k / 10 for k in range(self.dim)] for t in texts], dtype=np.float32)
+
+
+def test_cache_encodes_each_text_once_and_persists(tmp_path):
+    enc = CountingEncoder()
+    cache = embed_cache.EmbeddingCache(str(tmp_path), "enc", "v1", 4)
+    first = cache.embed(["a", "bb", "a"], enc)
+    assert enc.seen == ["a", "bb"]
+    assert first.shape == (3, 4) and np.array_equal(first[0], first[2])
+
+    reopened = embed_cache.EmbeddingCache(str(tmp_path), "enc", "v1", 4)
+    again = reopened.embed(["bb", "ccc"], enc)
+    assert enc.seen == ["a", "bb", "ccc"]
+    assert np.array_equal(again[0], first[1])
+    assert (reopened.hits, reopened.misses, reopened.rows) == (1, 1, 3)
+
+    other = embed_cache.EmbeddingCache(str(tmp_path), "enc", "v2", 4)  # new encoder version, new store
+    assert other.rows == 0
+
+
+def test_cache_ignores_torn_append(tmp_path):
+    enc = CountingEncoder()
+    cache = embed_cache.EmbeddingCache(str(tmp_path), "enc", "v1", 4, dtype="float16")
+    cache.embed(["a", "bb"], enc)
+    with open(os.path.join(cache.dir, "embeddings.bin"), "ab") as f:
+        f.write(b"\0\0\0")  # crash halfway through the next row
+
+    reopened = embed_cache.EmbeddingCache(str(tmp_path), "enc", "v1", 4, dtype="float16")
+    assert reopened.rows == 2
+    out = reopened.embed(["bb", "dddd"], enc)
+    assert out.dtype == np.float32
+    assert np.allclose(out[1], [4.0, 4.1, 4.2, 4.3], atol=1e-2)
+
+
+def test_re_score_rescore_skips_encoder_with_cache(
+    fake_models, make_candidate, score_inputs, tmp_path, monkeypatch, capsys
+):
+    paths = score_inputs([make_candidate(n) for n in range(5)])
+    monkeypatch.setattr("sys.argv", ["re_score.py", *paths, "--embed-cache", str(tmp_path / "emb")])
+    re_score.main()
+    first = capsys.readouterr().out
+
+    def no_encoder():
+        raise AssertionError("encoder loaded on a fully cached rescore")
+
+    monkeypatch.setattr(re_score, "get_embedder", no_encoder)
+    re_score.main()
+    captured = capsys.readouterr()
+    assert captured.out == first
+    assert "5 hits, 0 encoded" in captured.err
+
+
+def test_readonly_cache_hands_new_rows_to_the_writer(tmp_path):
+    enc = CountingEncoder()
+    writer = embed_cache.EmbeddingCache(str(tmp_path), "enc", "v1", 4)
+    writer.embed(["a"], enc)
+    worker = embed_cache.EmbeddingCache(str(tmp_path), "enc", "v1", 4, readonly=True)
+    out = worker.embed(["bb", "a", "bb"], enc)
+    assert enc.seen == ["a", "bb"] and worker.rows == 1  # nothing written by the worker
+    assert np.array_equal(out[1], writer.embed(["a"], enc)[0]) and np.array_equal(out[0], out[2])
+
+    for digests, embeddings in worker.take_pending():
+        writer.add_missing(digests, embeddings)
+        writer.add_missing(digests, embeddings)  # a second worker encoding the same text
+    assert worker.take_pending() == [] and writer.rows == 2
+    assert np.array_equal(embed_cache.EmbeddingCache(str(tmp_path), "enc", "v1", 4).embed(["bb"], enc)[0], out[0])
+
+
+def test_two_writers_share_the_cache_under_the_lock(tmp_path):
+    enc = CountingEncoder()
+    daemon = embed_cache.EmbeddingCache(str(tmp_path), "enc", "v1", 4)
+    in_process = embed_cache.EmbeddingCache(str(tmp_path), "enc", "v1", 4)  # opened before either appends
+    a = daemon.embed(["a"], enc)
+    b = in_process.embed(["bb"], enc)
+    assert in_process.rows == 2  # picked up the daemon's row before appending its own
+    assert np.array_equal(in_process.embed(["a"], enc), a) and in_process.hits == 1
+    daemon.embed(["bb", "ccc"], enc)  # "bb" was encoded again but is not appended twice
+    assert daemon.rows == 3
+
+    reopened = embed_cache.EmbeddingCache(str(tmp_path), "enc", "v1", 4)
+    assert reopened.rows == 3 and np.array_equal(reopened.embed(["bb", "a"], enc), np.vstack([b, a]))
+    assert reopened.misses == 0
+
+    appended = threading.Event()
+    with open(os.path.join(daemon.dir, "index.bin"), "ab") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)  # another writer mid-append
+        t = threading.Thread(target=lambda: (daemon.embed(["dddd"], enc), appended.set()))
+        t.start()
+        assert not appended.wait(0.2)
+        fcntl.flock(f, fcntl.LOCK_UN)
+    t.join()
+    assert appended.is_set() and daemon.rows == 4
@@ -1,6 +1,7 @@
 import json
 import sys
 
+import onnxruntime
 import pytest
 
 np = pytest.importorskip("numpy")
@@ -153,8 +154,9 @@ def test_re_score_main_batches(tmp_path, monkeypatch, capsys):
             self.type = "tensor(float)"
 
     class DummySession:
-        def __init__(self, path, providers):
+        def __init__(self, path, sess_options=None, providers=None):
             self.path = path
+            self.sess_options = sess_options
             self.providers = providers
             self.calls = 0
 
@@ -166,13 +168,17 @@ def test_re_score_main_batches(tmp_path, monkeypatch, capsys):
 
         def run(self, _, feeds):
             self.calls += 1
-            probs = np.zeros((1, 2), dtype=np.float32)
-            probs[0, self.calls % 2] = 0.8
-            return [np.array(["label"]), probs]
+            rows = feeds["input"].shape[0]
+            probs = np.zeros((rows, 2), dtype=np.float32)
+            probs[np.arange(rows), np.arange(rows) % 2] = 0.8
+            return [np.array(["label"] * rows), probs]
 
     dummy_embedder = DummyEmbedder()
+    sessions = []
     monkeypatch.setattr(re_score, "get_embedder", lambda: dummy_embedder)
-    monkeypatch.setattr(re_score.ort, "InferenceSession", DummySession)
+    monkeypatch.setattr(
+        onnxruntime, "InferenceSession", lambda *a, **k: sessions.append(DummySession(*a, **k)) or sessions[-1]
+    )
 
     monkeypatch.setattr(
         sys,
@@ -192,3 +198,5 @@ def test_re_score_main_batches(tmp_path, monkeypatch, capsys):
     assert len(lines) == num_candidates
     assert {rec["pred"] for rec in lines} <= {"NEG", "POS"}
     assert dummy_embedder.calls  # ensure embeddings were requested
+    assert sessions[0].calls == 2  # one head run per batch (32 + 1), not per row
+    assert [rec["pred"] for rec in lines[:4]] == ["NEG", "POS", "NEG", "POS"]
@@ -1,7 +1,9 @@
 import io
 import json
+import re
 
 import pytest
+import spacy
 
 from groundkg import ner_tag
 
@@ -62,7 +64,7 @@ def test_main_streams_sentence_entities(tmp_path, monkeypatch, fake_doc):
         assert "textcat" in disable
         return fake_nlp
 
-    monkeypatch.setattr(ner_tag.spacy, "load", fake_load)
+    monkeypatch.setattr(spacy, "load", fake_load)
     monkeypatch.setattr(
         "sys.argv",
         [
@@ -114,7 +116,7 @@ def test_main_defaults_doc_id_and_handles_multiple_sentences(tmp_path, monkeypat
         assert model == "en_core_web_trf"
         return fake_nlp
 
-    monkeypatch.setattr(ner_tag.spacy, "load", fake_load)
+    monkeypatch.setattr(spacy, "load", fake_load)
     monkeypatch.setattr("sys.argv", ["ner_tag.py", str(text_path)])
 
     buf = io.StringIO()
@@ -129,3 +131,396 @@ def test_main_defaults_doc_id_and_handles_multiple_sentences(tmp_path, monkeypat
     second_entities = lines[1]["entities"]
     assert any(ent == {"text": "Charlie", "start": 0, "end": 7, "label": "PERSON"} for ent in second_entities)
     assert any(ent == {"text": "Rome", "start": 15, "end": 19, "label": "GPE"} for ent in second_entities)
+
+
+class PipingNLP:
+    """Fake pipeline that builds one FakeDoc per text and records batching."""
+
+    def __init__(self):
+        self.pipe_calls = []
+
+    def make(self, text):
+        first = text.split()[0]
+        return FakeDoc(
+            [FakeSentence(text, start=0, start_char=0)],
+            [FakeEntity(first, 0, len(first), "ORG")],
+        )
+
+    def __call__(self, text):
+        return self.make(text)
+
+    def pipe(self, texts, as_tuples=False, batch_size=1):
+        self.pipe_calls.append(batch_size)
+        for text, ctx in texts:
+            yield self.make(text), ctx
+
+
+def test_iter_documents_sorts_directory_and_uses_stems(tmp_path):
+    (tmp_path / "b.txt").write_text("Beta", encoding="utf-8")
+    (tmp_path / "a.txt").write_text("Alpha", encoding="utf-8")
+    (tmp_path / "notes.md").write_text("ignored", encoding="utf-8")
+
+    docs = list(ner_tag.iter_documents(str(tmp_path)))
+
+    assert [d for d, _ in docs] == ["a", "b"]
+    assert list(ner_tag.iter_documents(str(tmp_path / "*.txt"))) == docs
+
+
+def test_iter_documents_reads_meta_manifest_and_skips_missing(tmp_path, capsys):
+    (tmp_path / "one.txt").write_text("One", encoding="utf-8")
+    meta = tmp_path / "meta.jsonl"
+    rows = [
+        {"doc_id": "first", "text_path": str(tmp_path / "one.txt")},
+        {"doc_id": "first", "text_path": str(tmp_path / "one.txt")},
+        {"doc_id": "gone", "text_path": str(tmp_path / "gone.txt")},
+    ]
+    meta.write_text("\n".join(json.dumps(r) for r in rows) + "\n", encoding="utf-8")
+
+    docs = list(ner_tag.iter_documents(str(meta)))
+
+    assert [d for d, _ in docs] == ["first"]
+    assert "gone" in capsys.readouterr().err
+
+
+def test_docs_yaml_resolves_crawled_file_names(tmp_path, capsys):
+    corpus = tmp_path / "data" / "corpus"
+    corpus.mkdir(parents=True)
+    (corpus / "eu-ai-act-2024.txt").write_text("The AI Act.", encoding="utf-8")
+    (corpus / "plain.txt").write_text("Plain.", encoding="utf-8")
+    meta = {"doc_id": "EU AI Act (2024)", "text_path": str(corpus / "eu-ai-act-2024.txt")}
+    (tmp_path / "data" / "meta.jsonl").write_text(json.dumps(meta) + "\n", encoding="utf-8")
+    manifest = tmp_path / "docs.yaml"
+    manifest.write_text(
+        "- doc_id: EU AI Act (2024)\n- doc_id: plain\n- doc_id: Never Crawled\n", encoding="utf-8"
+    )
+
+    docs = list(ner_tag.iter_documents(str(manifest), corpus_dir=str(corpus)))
+
+    assert docs == [("EU AI Act (2024)", corpus / "eu-ai-act-2024.txt"), ("plain", corpus / "plain.txt")]
+    assert "[SKIP missing] Never Crawled" in capsys.readouterr().err
+
+
+def test_docs_yaml_falls_back_to_slugified_name(tmp_path):
+    slugify = pytest.importorskip("slugify").slugify
+    (tmp_path / f"{slugify('EU AI Act (2024)')}.txt").write_text("The AI Act.", encoding="utf-8")
+    manifest = tmp_path / "docs.yaml"
+    manifest.write_text("- doc_id: EU AI Act (2024)\n", encoding="utf-8")
+    assert [d for d, _ in ner_tag.iter_documents(str(manifest), corpus_dir=str(tmp_path))] == ["EU AI Act (2024)"]
+
+
+def test_main_tags_directory_with_single_model_load(tmp_path, monkeypatch):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "zeta.txt").write_text("Zeta Corp grows.", encoding="utf-8")
+    (corpus / "acme.txt").write_text("Acme Inc hires.", encoding="utf-8")
+
+    fake_nlp = PipingNLP()
+    loads = []
+
+    def fake_load(model, disable):
+        loads.append(model)
+        return fake_nlp
+
+    monkeypatch.setattr(spacy, "load", fake_load)
+    monkeypatch.setattr("sys.argv", ["ner_tag.py", str(corpus), "--batch-size", "4"])
+    buf = io.StringIO()
+    monkeypatch.setattr("sys.stdout", buf)
+
+    ner_tag.main()
+
+    lines = [json.loads(line) for line in buf.getvalue().splitlines() if line]
+    assert loads == ["en_core_web_trf"]
+    assert fake_nlp.pipe_calls == [4]
+    assert [rec["doc_id"] for rec in lines] == ["acme", "zeta"]
+    assert lines[0]["entities"] == [{"text": "Acme", "start": 0, "end": 4, "label": "ORG"}]
+
+
+def test_workers_output_matches_serial_run(tmp_path, monkeypatch):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for i in range(5):
+        (corpus / f"d{i}.txt").write_text(f"Org{i} builds things.", encoding="utf-8")
+
+    monkeypatch.setattr(spacy, "load", lambda model, disable: PipingNLP())
+    monkeypatch.setattr(ner_tag, "set_thread_limits", lambda threads: None)
+
+    def run(*extra):
+        monkeypatch.setattr("sys.argv", ["ner_tag.py", str(corpus), "--batch-size", "2", *extra])
+        buf = io.StringIO()
+        monkeypatch.setattr("sys.stdout", buf)
+        ner_tag.main()
+        return buf.getvalue()
+
+    serial = run()
+    parallel = run("--workers", "2", "--threads", "1")
+
+    assert parallel == serial
+    assert [json.loads(line)["doc_id"] for line in serial.splitlines()] == [f"d{i}" for i in range(5)]
+
+
+class StagedNLP(PipingNLP):
+    """PipingNLP that also exposes make_doc and named components, like Language."""
+
+    class Component:
+        def __init__(self):
+            self.seen = 0
+
+        def pipe(self, docs, batch_size=1):
+            for doc in docs:
+                self.seen += 1
+                yield doc
+
+    def __init__(self):
+        super().__init__()
+        self.pipeline = [("sentencizer", lambda doc: doc), ("ner", self.Component())]
+
+    def make_doc(self, text):
+        return self.make(text)
+
+
+def test_metrics_sidecar_keeps_stdout_clean(tmp_path, monkeypatch):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for i in range(3):
+        (corpus / f"d{i}.txt").write_text(f"Org{i} builds things.", encoding="utf-8")
+    nlp = StagedNLP()
+    monkeypatch.setattr(spacy, "load", lambda model, disable: nlp)
+
+    def run(*extra):
+        monkeypatch.setattr("sys.argv", ["ner_tag.py", str(corpus), "--batch-size", "2", *extra])
+        buf = io.StringIO()
+        monkeypatch.setattr("sys.stdout", buf)
+        ner_tag.main()
+        return buf.getvalue()
+
+    plain = run()
+    metrics_path = tmp_path / "ner.metrics.json"
+    assert run("--metrics", str(metrics_path)) == plain
+
+    rec = json.loads(metrics_path.read_text(encoding="utf-8"))
+    assert nlp.pipeline[1][1].seen == 3
+    assert rec["docs"] == 3 and rec["sentences"] == 3
+    assert rec["chars"] == sum(len(f"Org{i} builds things.") for i in range(3))
+    assert set(rec["component_s"]) == {"tokenizer", "sentencizer", "ner"}
+    assert rec["docs_per_s"] > 0 and rec["peak_rss_mb"] > 0
+
+
+def test_assign_entities_matches_quadratic_scan():
+    sents = [
+        FakeSentence("Alpha Beta.", start=0, start_char=0),
+        FakeSentence("Gamma Delta.", start=3, start_char=12),
+        FakeSentence("Eps.", start=6, start_char=25),
+    ]
+    ents = [
+        FakeEntity("Alpha", 0, 5, "ORG"),
+        FakeEntity("Beta. Gamma", 6, 17, "ORG"),  # crosses a boundary
+        FakeEntity("Delta", 18, 23, "GPE"),
+        FakeEntity("Eps", 25, 28, "LOC"),
+    ]
+
+    got = [(s.start, [e.text for e in inside]) for s, inside in ner_tag.assign_entities(sents, ents)]
+
+    expected = [
+        (s.start, [e.text for e in ents if e.start_char >= s.start_char and e.end_char <= s.end_char])
+        for s in sents
+    ]
+    assert got == expected == [(0, ["Alpha"]), (3, ["Delta"]), (6, ["Eps"])]
+
+
+class WordNLP:
+    """Whitespace-token fake: sentences end after '.', capitalised words are ORG."""
+
+    def __call__(self, text):
+        tokens = list(re.finditer(r"\S+", text))
+        sents, ents, first = [], [], 0
+        for i, tok in enumerate(tokens):
+            if tok.group()[:1].isupper():
+                word = tok.group().rstrip(".")
+                ents.append(FakeEntity(word, tok.start(), tok.start() + len(word), "ORG"))
+            if tok.group().endswith(".") or i == len(tokens) - 1:
+                start = tokens[first].start()
+                sents.append(FakeSentence(text[start:tok.end()], start=first, start_char=start))
+                first = i + 1
+        return FakeDocWithLen(sents, ents, len(tokens))
+
+    def pipe(self, texts, as_tuples=False, batch_size=1):
+        for text, ctx in texts:
+            yield self(text), ctx
+
+
+class FakeDocWithLen(FakeDoc):
+    def __init__(self, sents, ents, n_tokens):
+        super().__init__(sents, ents)
+        self._n = n_tokens
+
+    def __len__(self):
+        return self._n
+
+
+def test_iter_chunks_cuts_at_sentence_ends(tmp_path):
+    text = "Acme builds rockets. Beta sells them.\n\nGamma buys. " * 20
+    path = tmp_path / "big.txt"
+    path.write_text(text, encoding="utf-8")
+
+    chunks = list(ner_tag.iter_chunks(path, 60))
+
+    assert "".join(c for _, c in chunks) == text
+    assert all(len(c) <= 60 for _, c in chunks)
+    assert [off for off, _ in chunks] == [sum(len(c) for _, c in chunks[:i]) for i in range(len(chunks))]
+    assert all(c.rstrip(" ").endswith(".") for _, c in chunks[:-1])
+
+
+def test_chunked_tagging_matches_unchunked(tmp_path):
+    text = "Acme builds rockets in Texas. Beta sells them.\n\nGamma buys  Delta parts. " * 30
+    path = tmp_path / "big.txt"
+    path.write_text(text, encoding="utf-8")
+    docs = [("big", path)]
+
+    whole = list(ner_tag.tag_documents(WordNLP(), docs))
+    chunked = list(ner_tag.tag_documents(WordNLP(), docs, chunk_chars=100))
+
+    assert chunked == whole
+    assert json.loads(whole[-1])["sent_start"] > 100
+
+
+def test_iter_sentences_yields_tag_documents_records(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("Acme builds rockets. Beta sells them.", encoding="utf-8")
+    docs = [("a", path)]
+
+    lines = list(ner_tag.tag_documents(WordNLP(), docs))
+    assert list(ner_tag.iter_sentences(WordNLP(), docs)) == [json.loads(line) for line in lines]
+
+
+class CountingNLP(WordNLP):
+    def __init__(self):
+        self.tagged = []
+
+    def __call__(self, text):
+        self.tagged.append(text)
+        return super().__call__(text)
+
+
+def test_cache_replays_unchanged_documents(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "a.txt").write_text("Acme builds rockets.", encoding="utf-8")
+    (corpus / "b.txt").write_text("Beta sells Gamma parts.", encoding="utf-8")
+    cache = tmp_path / "cache"
+    docs = list(ner_tag.iter_documents(str(corpus)))
+
+    first_nlp = CountingNLP()
+    first = list(ner_tag.tag_documents(first_nlp, docs, cache_dir=cache))
+    assert first == list(ner_tag.tag_documents(WordNLP(), docs))
+    assert len(first_nlp.tagged) == 2
+
+    (corpus / "b.txt").write_text("Beta sells Delta parts.", encoding="utf-8")
+    second_nlp = CountingNLP()
+    second = list(ner_tag.tag_documents(second_nlp, docs, cache_dir=cache))
+
+    assert second_nlp.tagged == ["Beta sells Delta parts."]
+    assert second[0] == first[0]
+    assert json.loads(second[1])["entities"][1]["text"] == "Delta"
+
+    # same text under another doc_id replays the cached records
+    renamed = list(ner_tag.tag_documents(CountingNLP(), [("other", corpus / "a.txt")], cache_dir=cache))
+    assert json.loads(renamed[0]) == dict(json.loads(first[0]), doc_id="other")
+
+
+def test_fast_profile_excludes_unused_components(monkeypatch):
+    calls = []
+
+    def fake_load(model, **kwargs):
+        calls.append((model, kwargs))
+        return PipingNLP()
+
+    monkeypatch.setattr(spacy, "load", fake_load)
+
+    ner_tag.load_pipeline(profile="fast")
+    ner_tag.load_pipeline("en_core_web_md", profile="custom", exclude=["lemmatizer"])
+
+    (fast_model, fast_kwargs), (custom_model, custom_kwargs) = calls
+    assert fast_model == "en_core_web_sm"
+    assert {"parser", "tagger", "lemmatizer", "attribute_ruler"} <= set(fast_kwargs["exclude"])
+    assert "ner" not in fast_kwargs["exclude"]
+    assert custom_model == "en_core_web_md"
+    assert custom_kwargs == {"disable": ["textcat"], "exclude": ["lemmatizer"]}
+    with pytest.raises(ValueError):
+        ner_tag.load_pipeline(profile="custom")
+
+
+def test_phrase_words_routes_only_exact_orth_patterns():
+    assert ner_tag._phrase_words([{"ORTH": "AI"}, {"TEXT": "Act"}]) == ["AI", "Act"]
+    assert ner_tag._phrase_words([{"LOWER": "gdpr"}]) is None
+    assert ner_tag._phrase_words([{"ORTH": "New", "OP": "?"}]) is None
+    assert ner_tag._phrase_words([]) is None
+
+
+def test_compiled_ruler_artifact_matches_from_disk(real_spacy, tmp_path, monkeypatch, capsys):
+    patterns = [
+        {"label": "ORG", "pattern": "Acme Corp", "id": "acme"},
+        {"label": "PRODUCT", "pattern": [{"ORTH": "Widget"}, {"ORTH": "Pro"}], "id": "widget"},
+        {"label": "PRODUCT", "pattern": "Gadget"},
+        {"label": "GPE", "pattern": [{"LOWER": "paris"}], "id": "paris"},  # stays a token pattern
+    ]
+    path = tmp_path / "patterns.jsonl"
+    path.write_text("".join(json.dumps(p) + "\n" for p in patterns), encoding="utf-8")
+    text = "Acme Corp ships Widget Pro and a Gadget to PARIS, says Alice."
+    cache = tmp_path / "ruler"
+
+    def entities(load):
+        nlp = real_spacy.blank("en")
+        ruler = nlp.add_pipe("entity_ruler")
+        load(nlp, ruler)
+        return [(e.text, e.label_, e.ent_id_) for e in nlp(text).ents]
+
+    from_disk = lambda nlp, ruler: ruler.from_disk(path)  # noqa: E731
+    cached = lambda nlp, ruler: ner_tag.load_ruler_patterns(nlp, ruler, path, cache)  # noqa: E731
+    expected = entities(from_disk)
+    assert [e[2] for e in expected] == ["acme", "widget", "", "paris"]
+    assert entities(cached) == expected
+    artifacts = sorted(cache.iterdir())
+    assert len(artifacts) == 1
+
+    compile_patterns = ner_tag.compile_ruler_patterns
+
+    def no_compile(*_a):
+        raise AssertionError("patterns recompiled on a cache hit")
+
+    monkeypatch.setattr(ner_tag, "compile_ruler_patterns", no_compile)
+    assert entities(cached) == expected
+    assert sorted(cache.iterdir()) == artifacts
+
+    monkeypatch.setattr(ner_tag, "compile_ruler_patterns", compile_patterns)
+    with path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"label": "PERSON", "pattern": "Alice", "id": "alice"}) + "\n")
+    expected = entities(from_disk)
+    assert expected[-1] == ("Alice", "PERSON", "alice")
+    assert entities(cached) == expected
+    assert len(list(cache.iterdir())) == 2  # rebuilt for the changed file
+
+    monkeypatch.setattr(real_spacy, "__version__", "3.99.0")  # upgraded spaCy
+    assert entities(cached) == expected
+    assert len(list(cache.iterdir())) == 3
+
+    monkeypatch.setattr(real_spacy, "__version__", "4.0.0")  # internals not checked: public add_patterns
+    nlp = real_spacy.blank("en")
+    ruler = nlp.add_pipe("entity_ruler")
+    assert ner_tag.load_ruler_patterns(nlp, ruler, path, cache) == len(ruler) == 5
+    assert [(e.text, e.label_, e.ent_id_) for e in nlp(text).ents] == expected
+    assert len(list(cache.iterdir())) == 3 and "not supported" in capsys.readouterr().err
+
+
+def test_compiled_ruler_relies_on_these_spacy_internals(real_spacy):
+    # Fails when a spaCy upgrade renames the private API _add_phrases and
+    # compile_ruler_patterns use; check COMPILED_RULER_SPACY before bumping spaCy.
+    from spacy.matcher import Matcher, PhraseMatcher
+    from spacy.pipeline import EntityRuler
+
+    ruler = real_spacy.blank("en").add_pipe("entity_ruler")
+    assert isinstance(ruler, EntityRuler)
+    assert callable(PhraseMatcher._convert_to_array) and callable(Matcher._normalize_key)
+    assert callable(EntityRuler._create_label) and ruler._ent_ids == {}
+    assert ner_tag.compiled_ruler_supported(ruler)
+    key = ruler._create_label("ORG", "acme")
+    assert key == "ORG||acme" and isinstance(ruler.matcher._normalize_key(key), int)
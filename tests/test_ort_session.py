@@ -0,0 +1,175 @@
+import json
+import os
+import types
+
+import onnxruntime
+import pytest
+
+from groundkg import ort_session
+
+
+def test_resolve_prefers_args_then_env_then_tuned(tmp_path, monkeypatch):
+    model = tmp_path / "m.onnx"
+    model.write_bytes(b"")
+    for env in ort_session.ENV.values():
+        monkeypatch.delenv(env, raising=False)
+    assert ort_session.resolve(str(model)) == {"intra_op": None, "inter_op": None, "opt_level": "extended"}
+
+    tuned = {"intra_op": 4, "inter_op": None, "opt_level": "all", "cpu_count": os.cpu_count()}
+    (tmp_path / "m.ort.json").write_text(json.dumps(tuned), encoding="utf-8")
+    assert ort_session.resolve(str(model)) == {"intra_op": 4, "inter_op": None, "opt_level": "all"}
+
+    monkeypatch.setenv("GK_ORT_INTRA_OP_THREADS", "2")
+    assert ort_session.resolve(str(model))["intra_op"] == 2
+    assert ort_session.resolve(str(model), intra_op=1, opt_level="basic") == {
+        "intra_op": 1,
+        "inter_op": None,
+        "opt_level": "basic",
+    }
+
+    tuned["cpu_count"] = -1  # measured on another machine
+    (tmp_path / "m.ort.json").write_text(json.dumps(tuned), encoding="utf-8")
+    monkeypatch.delenv("GK_ORT_INTRA_OP_THREADS")
+    assert ort_session.resolve(str(model))["opt_level"] == "extended"
+
+
+class RecordingSession:
+    """InferenceSession stand-in that records what was opened and writes the optimized graph if asked."""
+
+    opened = []
+
+    def __init__(self, path, sess_options=None, providers=None):
+        self.opened.append((os.path.basename(path), sess_options.graph_optimization_level))
+        out = getattr(sess_options, "optimized_model_filepath", None)
+        if out:
+            with open(out, "wb") as f:
+                f.write(b"optimized")
+
+
+@pytest.fixture
+def recording_session(monkeypatch):
+    monkeypatch.setattr(RecordingSession, "opened", [])
+    monkeypatch.setattr(onnxruntime, "InferenceSession", RecordingSession)
+    monkeypatch.setattr(onnxruntime, "__version__", "1.16.3", raising=False)
+    monkeypatch.setattr(ort_session, "cpu_tag", lambda: "cpuA")
+    return RecordingSession.opened
+
+
+def test_open_session_persists_and_reuses_optimized_graph(tmp_path, monkeypatch, recording_session):
+    model = tmp_path / "m.onnx"
+    model.write_bytes(b"model")
+    opened = recording_session
+    ort_session.open_session(str(model), intra_op=2, opt_level="all")
+    ort_session.open_session(str(model), intra_op=2, opt_level="all")
+    disable = onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+    enable_all = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    cached = "m.opt-all.ort1.16.3.cpucpuA.onnx"
+    assert opened == [("m.onnx", enable_all), (cached, disable)]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["m.onnx", cached]
+
+    os.utime(model, (os.path.getmtime(model) + 10,) * 2)  # retrained: cached graph is stale
+    ort_session.open_session(str(model), intra_op=2, opt_level="all")
+    assert opened[-1] == ("m.onnx", enable_all)
+
+
+def test_optimized_graph_is_keyed_by_ort_version_and_cpu(tmp_path, monkeypatch, recording_session):
+    model = tmp_path / "m.onnx"
+    model.write_bytes(b"model")
+    opened = recording_session
+    enable_all = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    enable_ext = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    ort_session.open_session(str(model), opt_level="all")
+    ort_session.open_session(str(model), opt_level="extended")
+
+    monkeypatch.setattr(ort_session, "cpu_tag", lambda: "cpuB")  # models/ copied to another machine
+    ort_session.open_session(str(model), opt_level="all")
+    ort_session.open_session(str(model), opt_level="extended")  # not hardware specific: reused
+    disable = onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+    assert opened[2:] == [("m.onnx", enable_all), ("m.opt-extended.ort1.16.3.onnx", disable)]
+
+    monkeypatch.setattr(onnxruntime, "__version__", "1.17.0")  # upgraded
+    ort_session.open_session(str(model), opt_level="extended")
+    assert opened[-1] == ("m.onnx", enable_ext)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "m.onnx",
+        "m.opt-all.ort1.16.3.cpucpuA.onnx",
+        "m.opt-all.ort1.16.3.cpucpuB.onnx",
+        "m.opt-extended.ort1.16.3.onnx",
+        "m.opt-extended.ort1.17.0.onnx",
+    ]
+
+
+class BenchSession:
+    """Fused-model-shaped session that counts runs and checks its feeds."""
+
+    runs = 0
+
+    def __init__(self, path, sess_options=None, providers=None):
+        pass
+
+    def get_inputs(self):
+        return [
+            types.SimpleNamespace(name="input_ids", shape=["batch", "seq"], type="tensor(int64)"),
+            types.SimpleNamespace(name="attention_mask", shape=["batch", "seq"], type="tensor(int64)"),
+            types.SimpleNamespace(name="token_type_ids", shape=["batch", "seq"], type="tensor(int64)"),
+            types.SimpleNamespace(name="x", shape=[None, 8], type="tensor(float)"),
+        ]
+
+    def run(self, _outputs, feeds):
+        BenchSession.runs += 1
+        assert feeds["input_ids"].shape == (4, 16) and feeds["attention_mask"].all()
+        assert not feeds["token_type_ids"].any() and feeds["x"].shape == (4, 8)
+        return []
+
+
+def test_bench_runs_warm_up_then_repeats(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(onnxruntime, "InferenceSession", BenchSession)
+    monkeypatch.setattr(BenchSession, "runs", 0)
+    settings = {"intra_op": 1, "inter_op": 2, "opt_level": "basic"}
+    assert ort_session.bench("m.onnx", settings, batch_size=4, seq_len=16, repeats=3) >= 0
+    assert BenchSession.runs == 4
+    assert ort_session.session_options(**settings).execution_mode == onnxruntime.ExecutionMode.ORT_PARALLEL
+
+
+def fake_bench(onnx_path, settings, batch_size, seq_len, repeats):
+    # fastest: 2 intra-op threads, no inter-op pool, extended
+    return (abs(settings["intra_op"] - 2) + (settings["inter_op"] or 0) + (settings["opt_level"] != "extended")) / 1000
+
+
+def test_autotune_records_the_fastest_setting(tmp_path, monkeypatch, capsys):
+    model = tmp_path / "m.onnx"
+    model.write_bytes(b"model")
+    monkeypatch.setattr(ort_session, "bench", fake_bench)
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    for env in ort_session.ENV.values():
+        monkeypatch.delenv(env, raising=False)
+
+    monkeypatch.setattr("sys.argv", ["ort_session.py", "autotune", str(model), "--levels", "basic,extended"])
+    assert ort_session.main() == 0
+    record = json.loads((tmp_path / "m.ort.json").read_text(encoding="utf-8"))
+    assert len(record["results"]) == 2 * 3 * 2  # levels x intra (1, 2, 4) x inter (-, 2)
+    assert {k: record[k] for k in ("intra_op", "inter_op", "opt_level", "cpu_count")} == {
+        "intra_op": 2,
+        "inter_op": None,
+        "opt_level": "extended",
+        "cpu_count": 4,
+    }
+    assert "Best:" in capsys.readouterr().out
+    assert ort_session.resolve(str(model)) == {"intra_op": 2, "inter_op": None, "opt_level": "extended"}
+
+
+def test_main_optimize_writes_graph_and_checks_model(tmp_path, monkeypatch, recording_session, capsys):
+    model = tmp_path / "m.onnx"
+    model.write_bytes(b"model")
+    monkeypatch.setattr("sys.argv", ["ort_session.py", "optimize", str(model), "--graph-opt", "basic"])
+    assert ort_session.main() == 0
+    assert (tmp_path / "m.opt-basic.ort1.16.3.onnx").read_bytes() == b"optimized"
+    assert "m.opt-basic.ort1.16.3.onnx" in capsys.readouterr().out
+
+    monkeypatch.setattr("sys.argv", ["ort_session.py", "optimize", str(tmp_path / "missing.onnx")])
+    assert ort_session.main() == 2
+
+
+def test_cpu_tag_is_stable():
+    assert ort_session.cpu_tag() == ort_session.cpu_tag() and len(ort_session.cpu_tag()) == 12
@@ -0,0 +1,76 @@
+import io
+import json
+
+import pytest
+
+from groundkg import pack_io
+
+
+def _pair(doc_id, sent_idx, s, o, **extra):
+    text = "Acme Corp uses Widget Pro in Paris."
+    rec = {
+        "doc_id": doc_id,
+        "sent_idx": sent_idx,
+        "sent_start": 40 * sent_idx,
+        "text": text,
+        "subject": {"text": text[s[0]:s[1]], "start": s[0], "end": s[1], "label": "ORG"},
+        "object": {"text": text[o[0]:o[1]], "start": o[0], "end": o[1], "label": "PRODUCT"},
+    }
+    rec.update(extra)
+    return rec
+
+
+def test_normalized_rows_expand_back_to_flat_records():
+    flat = [
+        _pair("d1", 0, (0, 9), (15, 25), pred="uses", prob=0.9),
+        _pair("d1", 0, (0, 9), (29, 34), pred="none", prob=0.7),
+        _pair("d1", 1, (0, 4), (15, 21), pred="uses", prob=0.6),
+        _pair("d2", 0, (0, 9), (15, 25), pred="none", prob=0.8),
+    ]
+    rows = list(pack_io.normalize(flat))
+
+    sentence_rows = [r for r in rows if "s" not in r]
+    assert [(r["doc_id"], r["sent_idx"]) for r in sentence_rows] == [("d1", 0), ("d1", 1), ("d2", 0)]
+    assert all("text" not in r for r in rows if "s" in r)
+    assert list(pack_io.iter_records(rows)) == flat
+    assert [(r["pred"], r["prob"]) for r in pack_io.iter_records(rows, expand=False)] == [
+        (r["pred"], r["prob"]) for r in flat
+    ]
+
+    no_idx = {k: v for k, v in flat[0].items() if k != "sent_idx"}
+    with pytest.raises(ValueError, match="sent_idx"):
+        list(pack_io.normalize([no_idx]))  # sent_start is not a sentence index
+
+
+def test_read_records_accepts_both_layouts(tmp_path):
+    flat = [_pair("d1", 0, (0, 9), (15, 25)), _pair("d1", 2, (0, 9), (29, 34))]
+    for normalized in (False, True):
+        path = tmp_path / f"cands_{normalized}.jsonl"
+        path.write_text("".join(pack_io.record_lines(flat, normalized)), encoding="utf-8")
+        assert list(pack_io.read_records(str(path))) == flat
+
+
+def test_candidates_main_writes_normalized_layout(tmp_path, monkeypatch):
+    from groundkg import candidates
+
+    record = {
+        "doc_id": "d1",
+        "sent_idx": 3,
+        "sent_start": 10,
+        "text": "Acme Corp sells Widget Pro to Beta Holdings",
+        "entities": [{"text": "Acme Corp", "start": 0, "end": 9, "label": "ORG"}],
+    }
+    ner_path = tmp_path / "ner.jsonl"
+    ner_path.write_text(json.dumps(record) + "\n", encoding="utf-8")
+
+    def run(*extra):
+        monkeypatch.setattr("sys.argv", ["candidates.py", str(ner_path), *extra])
+        buf = io.StringIO()
+        monkeypatch.setattr("sys.stdout", buf)
+        candidates.main()
+        return [json.loads(line) for line in buf.getvalue().splitlines()]
+
+    flat = run()
+    rows = run("--normalized")
+    assert sum("s" not in r for r in rows) == 1
+    assert list(pack_io.iter_records(rows)) == flat
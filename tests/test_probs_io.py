@@ -0,0 +1,96 @@
+import runpy
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from groundkg import probs_io, re_score
+
+TOOLS = Path(__file__).resolve().parents[1] / "tools"
+
+
+def test_probs_writer_streams_a_loadable_npy(tmp_path):
+    path = str(tmp_path / "scored.probs.npy")
+    w = probs_io.ProbsWriter(path, ["none", "uses", "owns"])
+    blocks = [np.random.default_rng(i).dirichlet(np.ones(3), size=n).astype(np.float32) for i, n in enumerate([4, 0, 7])]
+    for b in blocks:
+        w.append(b)
+    w.close()
+
+    probs, classes = probs_io.load(path)
+    assert classes == ["none", "uses", "owns"]
+    assert probs.dtype == np.float32 and probs.shape == (11, 3)
+    np.testing.assert_array_equal(probs, np.vstack(blocks))
+    assert np.load(path).shape == (11, 3)  # plain numpy reads it too
+
+    with pytest.raises(ValueError):
+        probs_io.ProbsWriter(str(tmp_path / "x.npy"), ["none"]).append(np.zeros((2, 3)))
+    empty = str(tmp_path / "empty.npy")
+    probs_io.ProbsWriter(empty, ["none", "uses"], np.float16).close()
+    assert probs_io.load(empty)[0].shape == (0, 2) and probs_io.load(empty)[0].dtype == np.float16
+
+
+def test_passing_mask_applies_per_class_thresholds_and_never_none():
+    probs = np.array([[0.1, 0.9, 0.0], [0.2, 0.1, 0.7], [0.95, 0.05, 0.0], [0.3, 0.0, 0.7]], dtype=np.float16)
+    classes = ["none", "uses", "owns"]
+    mask = probs_io.passing_mask(probs, classes, {"uses": 0.85, "owns": 0.6})
+    assert mask.tolist() == [True, True, False, True]
+    assert probs_io.passing_mask(probs, classes, {"owns": 0.8}).tolist() == [True, False, False, False]
+    by_class = probs_io.probs_by_class(probs, classes)
+    assert sorted(by_class) == sorted(classes) and len(by_class["owns"]) == 2
+
+
+def test_near_threshold_pairs_follow_the_json_path_at_float32(tmp_path):
+    classes = ["none", "uses"]
+    probs = np.array([[0.05004, 0.94996], [0.05, 0.95], [0.50005, 0.49995]], dtype=np.float32)
+    records = [{"pred": classes[int(row.argmax())], "prob": float(row.max())} for row in probs]  # as re_score writes them
+    thresholds = {"uses": 0.95}
+    promote = runpy.run_path(str(TOOLS / "promote_from_scored.py"))
+    from_json = [r["pred"] != "none" and r["prob"] >= thresholds["uses"] for r in records]
+    assert len(list(promote["iter_edges"](records, thresholds))) == sum(from_json)
+
+    sidecars = {}
+    for dtype in ("float32", "float16"):
+        sidecars[dtype] = str(tmp_path / f"{dtype}.npy")
+        w = probs_io.ProbsWriter(sidecars[dtype], classes, dtype)
+        w.append(probs)
+        w.close()
+    f32, _ = probs_io.load(sidecars["float32"])
+    assert probs_io.passing_mask(f32, classes, thresholds).tolist() == from_json
+    assert [classes[i] for idx, _ in probs_io.iter_top(f32) for i in idx] == [r["pred"] for r in records]
+
+    # float16 rounds 0.94996 up to 0.95 and 0.50005/0.49995 to a tie: the paths disagree
+    f16, _ = probs_io.load(sidecars["float16"])
+    assert probs_io.passing_mask(f16, classes, thresholds).tolist() != from_json
+    assert [classes[i] for idx, _ in probs_io.iter_top(f16) for i in idx] == ["uses", "uses", "none"]
+
+
+def test_re_score_probs_sidecar_follows_pair_rows(
+    fake_models, make_candidate, score_inputs, tmp_path, monkeypatch, capsys
+):
+    paths = score_inputs([make_candidate(n * 7 % 11, doc_id=f"d{n // 6}", sent_idx=n // 3) for n in range(40)])
+
+    promote = runpy.run_path(str(TOOLS / "promote_from_scored.py"))
+    thresholds = {"uses": 0.5}
+    for layout in ([], ["--normalized"]):
+        scored_path = tmp_path / "scored.jsonl"
+        probs_path = str(tmp_path / "scored.probs.npy")
+        monkeypatch.setattr(
+            "sys.argv",
+            ["re_score.py", *paths, "--batch-size", "4"]
+            + ["--bucket-window", "16", "--probs", probs_path, *layout],
+        )
+        re_score.main()
+        scored_path.write_text(capsys.readouterr().out, encoding="utf-8")
+
+        records = list(re_score.pack_io.read_records(str(scored_path)))
+        probs, classes = probs_io.load(probs_path)
+        assert len(probs) == len(records) == 40
+        for r, row in zip(records, probs):
+            assert classes[int(row.argmax())] == r["pred"]
+            assert float(row.max()) == r["prob"]
+
+        from_json = list(promote["iter_edges"](records, thresholds))
+        from_probs = list(promote["iter_edges_from_probs"](str(scored_path), probs_path, thresholds))
+        assert from_probs == from_json and from_json
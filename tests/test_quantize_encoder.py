@@ -0,0 +1,62 @@
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+SCRIPT = Path(__file__).resolve().parents[1] / "training" / "quantize_encoder.py"
+CLASSES = ["none", "uses", "owns"]
+REF = np.array([[0.8, 0.1, 0.1], [0.1, 0.7, 0.2], [0.2, 0.2, 0.6], [0.6, 0.3, 0.1]])
+
+
+@pytest.fixture
+def gate(tmp_path, monkeypatch):
+    """Run quantize_encoder.main() with the INT8 model scoring ``got`` on the dev set."""
+    spec = importlib.util.spec_from_file_location("quantize_encoder", SCRIPT)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    fp32, int8 = tmp_path / "fused.onnx", tmp_path / "fused.int8.onnx"
+    fp32.write_bytes(b"fp32" * 100)
+    dev, classes = tmp_path / "dev.jsonl", tmp_path / "classes.json"
+    dev.write_text("".join(json.dumps({"text": f"t{i}"}) + "\n" for i in range(len(REF))), encoding="utf-8")
+    classes.write_text(json.dumps(CLASSES), encoding="utf-8")
+    monkeypatch.setattr(mod, "quantize", lambda src, dst: Path(dst).write_bytes(b"int8"))
+
+    def run(got, *extra):
+        probs = {str(fp32): REF, str(int8): np.asarray(got, dtype=np.float32)}
+        monkeypatch.setattr(mod, "dev_probs", lambda path, cls, texts: probs[path])
+        report = tmp_path / "report.json"
+        argv = ["quantize_encoder.py", str(fp32), str(int8), "--dev", str(dev), "--classes", str(classes)]
+        monkeypatch.setattr("sys.argv", argv + ["--report", str(report), *extra])
+        return mod.main(), int8.exists(), json.loads(report.read_text(encoding="utf-8"))
+
+    return run
+
+
+def test_int8_model_kept_when_close_to_fp32(gate):
+    status, kept, report = gate(REF + 0.01)
+    assert status == 0 and kept
+    assert report["label_agreement"] == 1.0
+    assert report["per_class"]["uses"]["mean_abs_diff"] == pytest.approx(0.01, abs=1e-6)
+
+
+def test_int8_model_removed_when_labels_disagree(gate, capsys):
+    got = REF.copy()
+    got[3] = [0.3, 0.6, 0.1]  # one of four predictions flips; |Δp| stays under 0.2
+    status, kept, report = gate(got, "--max-prob-diff", "0.2")
+    assert status == 1 and not kept
+    assert report["label_agreement"] == 0.75
+    assert "INT8 model rejected" in capsys.readouterr().err
+    assert gate(got, "--max-prob-diff", "0.2", "--min-agreement", "0.75")[:2] == (0, True)
+
+
+def test_int8_model_removed_when_one_class_drifts(gate, capsys):
+    got = REF.copy()
+    got[:, 2] += 0.03  # labels unchanged, but "owns" is off by 0.03 on average
+    status, kept, report = gate(got)
+    assert status == 1 and not kept
+    assert report["label_agreement"] == 1.0
+    assert report["per_class"]["owns"]["mean_abs_diff"] == pytest.approx(0.03, abs=1e-6)
+    assert "FAIL" in capsys.readouterr().out.splitlines()[-1]
@@ -1,13 +1,15 @@
 import io
 import json
+import os
 import sys
 import types
 
+import onnxruntime
 import pytest
 
 np = pytest.importorskip("numpy")
 
-from groundkg import re_infer, re_score
+from groundkg import re_infer, re_score, re_types
 
 
 def test_re_score_mark_orders_entities():
@@ -68,7 +70,7 @@ def test_re_score_main_streams_predictions(tmp_path, monkeypatch):
             return np.array([[0.1] * 384 for _ in texts], dtype=float)
 
     monkeypatch.setattr(re_score, "get_embedder", lambda: FakeEmbedder())
-    monkeypatch.setattr(re_score.ort, "InferenceSession", lambda *a, **k: FakeSession())
+    monkeypatch.setattr(onnxruntime, "InferenceSession", lambda *a, **k: FakeSession())
     buf = io.StringIO()
     monkeypatch.setattr("sys.stdout", buf)
     monkeypatch.setattr(
@@ -117,6 +119,175 @@ def test_type_compatible_enforces_allowed_pairs():
     assert not re_infer.type_compatible("uses", "PERSON", "GPE")
 
 
+def test_allowed_label_pairs_is_union_over_predicates():
+    pairs = re_types.allowed_label_pairs(["none", "uses", "subsidiary_of"])
+    assert ("PERSON", "PRODUCT") in pairs and ("ORG", "ORG") in pairs
+    assert ("PERSON", "GPE") not in pairs
+    assert ("DATE", "DATE") not in re_types.allowed_label_pairs()
+    assert re_types.allowed_label_pairs(["uses", "not_in_table"]) is None  # unconstrained predicate
+
+
+def test_re_score_type_filter_skips_impossible_pairs(tmp_path, monkeypatch, capsys):
+    def cand(s_label, o_label):
+        return {
+            "doc_id": "d1",
+            "sent_start": 0,
+            "text": "Alice uses the gadget",
+            "subject": {"text": "Alice", "start": 0, "end": 5, "label": s_label},
+            "object": {"text": "gadget", "start": 15, "end": 21, "label": o_label},
+        }
+
+    cand_path = tmp_path / "cands.jsonl"
+    rows = [cand("PERSON", "PRODUCT"), cand("DATE", "DATE"), cand("NOUNPHRASE", "NOUNPHRASE")]
+    cand_path.write_text("".join(json.dumps(c) + "\n" for c in rows), encoding="utf-8")
+    onnx_path = tmp_path / "model.onnx"
+    onnx_path.write_text("", encoding="utf-8")
+    classes_path = tmp_path / "classes.json"
+    classes_path.write_text(json.dumps(["none", "uses"]), encoding="utf-8")
+
+    encoded = []
+
+    class FakeEmbedder:
+        def encode(self, texts, show_progress_bar=False, convert_to_numpy=True):
+            encoded.extend(texts)
+            return np.zeros((len(texts), re_score.EMBEDDING_DIM), dtype=np.float32)
+
+    class FakeSession:
+        def get_inputs(self):
+            return [types.SimpleNamespace(name="x", shape=[None, re_score.EMBEDDING_DIM])]
+
+        def get_outputs(self):
+            return []
+
+        def run(self, _outputs, feeds):
+            return [np.array(["uses"]), np.array([[0.1, 0.9]], dtype=np.float32)]
+
+    monkeypatch.setattr(re_score, "get_embedder", lambda: FakeEmbedder())
+    monkeypatch.setattr(onnxruntime, "InferenceSession", lambda *a, **k: FakeSession())
+    monkeypatch.setattr(
+        "sys.argv",
+        ["re_score.py", str(cand_path), str(onnx_path), str(classes_path), "--type-filter"],
+    )
+
+    re_score.main()
+
+    captured = capsys.readouterr()
+    lines = [json.loads(line) for line in captured.out.splitlines()]
+    assert [(r["subject"]["label"], r["object"]["label"]) for r in lines] == [("PERSON", "PRODUCT")]
+    assert len(encoded) == 1
+    assert "pruned 2 of 3 candidates" in captured.err
+
+
+def test_head_runs_whole_batch_and_resolves_output_at_load():
+    weights = np.arange(4 * 3, dtype=np.float32).reshape(4, 3) % 5
+
+    class LinearSession:
+        def __init__(self, batch_dim=None):
+            self.batch_dim = batch_dim
+            self.runs = []
+
+        def get_inputs(self):
+            return [types.SimpleNamespace(name="input", shape=[self.batch_dim, 4])]
+
+        def get_outputs(self):
+            return [
+                types.SimpleNamespace(name="label", shape=[None], type="tensor(int64)"),
+                types.SimpleNamespace(name="probabilities", shape=[None, 3], type="tensor(float)"),
+            ]
+
+        def run(self, _outputs, feeds):
+            X = feeds["input"]
+            self.runs.append(len(X))
+            scores = X @ weights
+            return [scores.argmax(axis=1), scores / scores.sum(axis=1, keepdims=True)]
+
+    X = np.random.default_rng(0).random((7, 4), dtype=np.float32)
+    expected = (X @ weights).argmax(axis=1)
+
+    sess = LinearSession()
+    head = re_score.Head(sess, ["a", "b", "c"])
+    assert head.prob_idx == 1  # picked from metadata, before any run
+    idx, top = head.predict(X)
+    assert sess.runs == [7]
+    assert idx.tolist() == expected.tolist()
+    assert np.allclose(top, head.probs(X).max(axis=1))
+
+    fixed = LinearSession(batch_dim=1)  # head exported with batch size 1
+    idx_fixed, _ = re_score.Head(fixed, ["a", "b", "c"]).predict(X)
+    assert fixed.runs == [1] * 7
+    assert idx_fixed.tolist() == expected.tolist()
+
+
+def test_re_score_fused_model_needs_no_embedder(tmp_path, monkeypatch, capsys):
+    text = "Alice uses the gadget"
+    cands = [
+        {
+            "doc_id": "d1",
+            "sent_start": 0,
+            "text": text,
+            "subject": {"text": "Alice", "start": 0, "end": 5, "label": "PERSON"},
+            "object": {"text": "gadget", "start": 15, "end": 21, "label": "PRODUCT"},
+        },
+        {
+            "doc_id": "d1",
+            "sent_start": 0,
+            "text": text,
+            "subject": {"text": "Alice", "start": 0, "end": 5, "label": "PERSON"},
+            "object": {"text": "the", "start": 11, "end": 14, "label": "NOUNPHRASE"},
+        },
+    ]
+    cand_path = tmp_path / "cands.jsonl"
+    cand_path.write_text("".join(json.dumps(c) + "\n" for c in cands), encoding="utf-8")
+    onnx_path = tmp_path / "fused.onnx"
+    onnx_path.write_text("", encoding="utf-8")
+    classes_path = tmp_path / "classes.json"
+    classes_path.write_text(json.dumps(["none", "uses"]), encoding="utf-8")
+
+    class FakeTokenizer:
+        def encode_batch(self, texts):
+            width = max(len(t) for t in texts)
+            return [
+                types.SimpleNamespace(
+                    ids=[ord(ch) for ch in t] + [0] * (width - len(t)),
+                    attention_mask=[1] * len(t) + [0] * (width - len(t)),
+                )
+                for t in texts
+            ]
+
+    class FusedSession:
+        feeds = []
+
+        def get_inputs(self):
+            return [types.SimpleNamespace(name="input_ids"), types.SimpleNamespace(name="attention_mask")]
+
+        def get_modelmeta(self):
+            return types.SimpleNamespace(custom_metadata_map={"tokenizer": "{}"})
+
+        def run(self, _outputs, feeds):
+            self.feeds.append(feeds)
+            n_tokens = feeds["attention_mask"].sum(axis=1)
+            p = (n_tokens % 2).astype(np.float32) * 0.5 + 0.25
+            return [np.stack([1 - p, p], axis=1)]
+
+    def no_embedder():
+        raise AssertionError("fused scoring must not load the sentence encoder")
+
+    monkeypatch.setattr(re_score, "get_embedder", no_embedder)
+    monkeypatch.setattr(re_score, "load_tokenizer", lambda meta: FakeTokenizer())
+    monkeypatch.setattr(onnxruntime, "InferenceSession", lambda *a, **k: FusedSession())
+    monkeypatch.setattr("sys.argv", ["re_score.py", str(cand_path), str(onnx_path), str(classes_path)])
+
+    re_score.main()
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    marked = [re_score.mark(c["text"], c["subject"], c["object"]) for c in cands]
+    expected = ["uses" if len(m) % 2 else "none" for m in marked]
+    assert [r["pred"] for r in lines] == expected
+    assert [r["prob"] for r in lines] == [0.75, 0.75]
+    assert len(FusedSession.feeds) == 1  # one run for the whole batch
+    assert FusedSession.feeds[0]["input_ids"].dtype == np.int64
+
+
 def test_mark_indicates_swapped_subject_object():
     text = "Paris is home to Alice"
     subject = {"start": 17, "end": 22}
@@ -179,7 +350,7 @@ def test_main_filters_by_threshold_and_types(tmp_path, monkeypatch):
             return original_open(classes_path, *args, **kwargs)
         return original_open(path, *args, **kwargs)
     monkeypatch.setattr("builtins.open", mock_open)
-    monkeypatch.setattr(re_infer.ort, "InferenceSession", lambda *a, **k: FakeSession())
+    monkeypatch.setattr(onnxruntime, "InferenceSession", lambda *a, **k: FakeSession())
     buf = io.StringIO()
     monkeypatch.setattr(
         "sys.argv",
@@ -262,7 +433,7 @@ def test_main_skips_low_prob_and_allows_unknown_predicate(tmp_path, monkeypatch)
             return original_open(classes_path, *args, **kwargs)
         return original_open(path, *args, **kwargs)
     monkeypatch.setattr("builtins.open", mock_open)
-    monkeypatch.setattr(re_infer.ort, "InferenceSession", lambda *a, **k: FakeSession())
+    monkeypatch.setattr(onnxruntime, "InferenceSession", lambda *a, **k: FakeSession())
     monkeypatch.setattr(re_infer, "ALLOWED_TYPES", {k: v for k, v in re_infer.ALLOWED_TYPES.items() if k != "provides"})
     buf = io.StringIO()
     monkeypatch.setattr(
@@ -285,3 +456,134 @@ def test_main_skips_low_prob_and_allows_unknown_predicate(tmp_path, monkeypatch)
     assert edge["predicate"] == "provides"
     assert edge["subject"] == "Bob"
     assert edge["object"] == "Rome"
+
+
+def test_bucketed_scoring_keeps_order_and_groups_lengths():
+    cands = [
+        {
+            "doc_id": "d1",
+            "sent_start": 0,
+            "text": "A uses B" + " pad" * n,
+            "subject": {"text": "A", "start": 0, "end": 1, "label": "ORG"},
+            "object": {"text": "B", "start": 7, "end": 8, "label": "PRODUCT"},
+        }
+        for n in [9, 0, 5, 1, 8, 0, 7, 2]
+    ]
+    batches = []
+
+    class LengthEmbedder:
+        def encode(self, texts, show_progress_bar=False, convert_to_numpy=True):
+            batches.append([len(t) for t in texts])
+            X = np.zeros((len(texts), re_score.EMBEDDING_DIM), dtype=np.float32)
+            X[:, 0] = [len(t) % 3 for t in texts]
+            return X
+
+    class ArgmaxSession:
+        def get_inputs(self):
+            return [types.SimpleNamespace(name="x", shape=[None, re_score.EMBEDDING_DIM])]
+
+        def get_outputs(self):
+            return [types.SimpleNamespace(name="probabilities", shape=[None, 3], type="tensor(float)")]
+
+        def run(self, _outputs, feeds):
+            X = feeds["x"]
+            return [np.eye(3, dtype=np.float32)[X[:, 0].astype(int)]]
+
+    def score(**kwargs):
+        batches.clear()
+        return list(re_score.iter_scored(cands, LengthEmbedder(), ArgmaxSession(), ["a", "b", "c"], batch_size=2, **kwargs))
+
+    plain = score()
+    plain_batches = list(batches)
+    bucketed = score(bucket_window=8)
+    assert bucketed == plain
+    assert batches == sorted(batches)  # shortest texts first, each batch of similar length
+    padded = lambda bs: sum(len(b) * max(b) for b in bs)  # noqa: E731
+    assert padded(batches) < padded(plain_batches)
+
+
+def test_re_score_pipelined_matches_serial(fake_models, make_candidate, score_inputs, monkeypatch, capsys):
+    paths = score_inputs([make_candidate(n, doc_id=f"d{n // 10}", sent_idx=n // 5) for n in range(300)])
+
+    def run(*extra):
+        monkeypatch.setattr("sys.argv", ["re_score.py", *paths, *extra])
+        re_score.main()
+        return capsys.readouterr().out
+
+    serial = run("--serial", "--normalized")
+    assert run("--normalized", "--queue-size", "1") == serial
+    assert len(serial.splitlines()) == 300 + 60  # pair rows + sentence rows
+
+
+def test_flat_scored_records_keep_the_baseline_fields(fake_models, make_candidate, score_inputs, monkeypatch, capsys):
+    paths = score_inputs([make_candidate(n, sent_idx=n // 2) for n in range(6)])
+    monkeypatch.setattr("sys.argv", ["re_score.py", *paths])
+    re_score.main()
+    flat = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    baseline = sorted(["doc_id", "sent_start", "text", "subject", "object", "pred", "prob"])
+    assert [sorted(r) for r in flat] == [baseline] * 6
+
+    monkeypatch.setattr("sys.argv", ["re_score.py", *paths, "--normalized"])
+    re_score.main()
+    normalized = re_score.pack_io.iter_records(json.loads(line) for line in capsys.readouterr().out.splitlines())
+    assert [(r["sent_idx"], r["pred"], r["prob"]) for r in normalized] == [
+        (n // 2, r["pred"], r["prob"]) for n, r in enumerate(flat)
+    ]
+
+
+def test_parallel_scoring_matches_in_process_order_and_cache(fake_models, make_candidate, tmp_path, monkeypatch):
+    cands = [make_candidate(n % 17) for n in range(90)]
+    monkeypatch.setattr(re_score, "load_session", lambda *a, **k: fake_models.session)
+    classes = fake_models.classes
+    serial = list(re_score.iter_scored(cands, fake_models.embedder, fake_models.session, classes, batch_size=4))
+
+    cache_args = (str(tmp_path), re_score.MODEL_NAME, "test", re_score.EMBEDDING_DIM, "float32")
+    cache = re_score.embed_cache.EmbeddingCache(*cache_args)
+    init_args = ("model.onnx", classes, 1, {}, 4, 0, cache_args)
+    probs, stats = [], {}
+    parallel = list(
+        re_score.iter_scored_parallel(
+            re_score.iter_marked(cands), 2, init_args, 8, cache, probs.append, stats, mp_context="fork"
+        )
+    )
+    assert parallel == serial
+    assert stats["pairs"] == 90 and len(np.concatenate(probs)) == 90
+    assert cache.rows == 17 and cache.misses >= 17 and cache.hits + cache.misses == 90
+
+
+def test_encoder_version_reads_installed_distribution(monkeypatch):
+    from importlib import metadata
+
+    monkeypatch.delitem(sys.modules, "sentence_transformers", raising=False)  # not imported yet
+    monkeypatch.setattr(metadata, "version", lambda name: {"sentence-transformers": "9.1.0"}[name])
+    assert re_score.encoder_version() == "sentence-transformers 9.1.0"
+
+    def missing(name):
+        raise metadata.PackageNotFoundError(name)
+
+    monkeypatch.setattr(metadata, "version", missing)
+    assert re_score.encoder_version() == "sentence-transformers unknown"
+
+
+def test_worker_shard_scores_like_in_process_and_hands_back_cache_rows(
+    fake_models, make_candidate, tmp_path, monkeypatch
+):
+    for var in re_score.THREAD_ENV:
+        monkeypatch.setenv(var, "0")  # restored after pin_threads
+    monkeypatch.setattr(re_score, "_torch_threads", None)
+    monkeypatch.setattr(re_score, "_worker", {})
+    monkeypatch.setattr(re_score, "load_session", lambda *a, **k: fake_models.session)
+    cands = [make_candidate(n % 5) for n in range(12)]
+    serial = list(re_score.iter_scored(cands, fake_models.embedder, fake_models.session, fake_models.classes))
+
+    cache_args = (str(tmp_path), re_score.MODEL_NAME, "test", re_score.EMBEDDING_DIM, "float32")
+    re_score._init_worker("model.onnx", fake_models.classes, 2, {}, 4, 0, cache_args)
+    assert all(os.environ[var] == "2" for var in re_score.THREAD_ENV)
+    records, probs, pending, counts = re_score._score_shard(list(re_score.iter_marked(cands)))
+    assert records == serial and probs.shape == (12, 2)
+    new_rows = {d for digests, _ in pending for d in digests}  # readonly: new rows go back to the parent
+    assert len(new_rows) == 5 and sum(counts) == 12
+
+    re_score._init_worker("model.onnx", fake_models.classes, 1, {}, 4, 0, None)
+    records, _, pending, counts = re_score._score_shard(list(re_score.iter_marked(cands)))
+    assert records == serial and pending == [] and counts == (0, 0)
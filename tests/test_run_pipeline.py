@@ -0,0 +1,81 @@
+import io
+import json
+import runpy
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from groundkg import candidates, dedupe_edges, ner_tag, re_score
+
+TOOLS = Path(__file__).resolve().parents[1] / "tools"
+
+PATTERNS = [
+    {"label": "ORG", "pattern": "Acme Corp"},
+    {"label": "ORG", "pattern": "Beta Labs"},
+    {"label": "PRODUCT", "pattern": "Widget Pro"},
+    {"label": "PRODUCT", "pattern": "Gadget"},
+    {"label": "GPE", "pattern": "Paris"},
+]
+TEXTS = {
+    "a": "Acme Corp uses Widget Pro in Paris. Beta Labs sells the Gadget to Acme Corp!",
+    "b": "Nothing here. Beta Labs builds Widget Pro and Gadget in Paris with Acme Corp.",
+}
+
+
+def run_main(main, argv, monkeypatch):
+    """stdout of ``main()`` run with ``argv``."""
+    buf = io.StringIO()
+    monkeypatch.setattr("sys.argv", argv)
+    monkeypatch.setattr("sys.stdout", buf)
+    main()
+    return buf.getvalue()
+
+
+def test_fused_runner_matches_the_per_script_chain(real_spacy, fake_models, tmp_path, monkeypatch):
+    nlp = real_spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    nlp.add_pipe("entity_ruler").add_patterns(PATTERNS)
+    monkeypatch.setattr(ner_tag, "load_pipeline", lambda *a, **k: nlp)
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for doc_id, text in TEXTS.items():
+        (corpus / f"{doc_id}.txt").write_text(text, encoding="utf-8")
+    onnx_path, classes_path, thr_path = tmp_path / "model.onnx", tmp_path / "classes.json", tmp_path / "thr.json"
+    onnx_path.write_text("", encoding="utf-8")
+    classes_path.write_text(json.dumps(fake_models.classes), encoding="utf-8")
+    thr_path.write_text(json.dumps({"uses": 0.4}), encoding="utf-8")
+
+    # the per-script chain, as pack_corpus + edges_from_pack run it
+    chain = tmp_path / "chain"
+    chain.mkdir()
+    ner = chain / "ner.jsonl"
+    run_main(ner_tag.main, ["ner_tag.py", str(corpus), "--out", str(ner)], monkeypatch)
+    (chain / "cands.jsonl").write_text(
+        run_main(candidates.main, ["candidates.py", str(ner)], monkeypatch), encoding="utf-8"
+    )
+    score_argv = ["re_score.py", str(chain / "cands.jsonl"), str(onnx_path), str(classes_path)]
+    (chain / "scored.jsonl").write_text(run_main(re_score.main, score_argv, monkeypatch), encoding="utf-8")
+    promote = runpy.run_path(str(TOOLS / "promote_from_scored.py"))
+    (chain / "edges.all.jsonl").write_text(
+        run_main(promote["main"], ["promote_from_scored.py", str(chain / "scored.jsonl"), str(thr_path)], monkeypatch),
+        encoding="utf-8",
+    )
+    edges = run_main(dedupe_edges.main, ["dedupe_edges.py", str(chain / "edges.all.jsonl")], monkeypatch)
+
+    fused = tmp_path / "fused"
+    fused.mkdir()
+    monkeypatch.syspath_prepend(str(TOOLS))  # run_pipeline imports promote_from_scored
+    runner = runpy.run_path(str(TOOLS / "run_pipeline.py"))
+    argv = ["run_pipeline.py", str(corpus), "--onnx", str(onnx_path), "--classes", str(classes_path)]
+    argv += ["--thresholds", str(thr_path), "--queue-size", "1", "--out", str(fused / "edges.jsonl")]
+    argv += ["--ner-out", str(fused / "ner.jsonl"), "--cand-out", str(fused / "cands.jsonl")]
+    argv += ["--scored-out", str(fused / "scored.jsonl")]
+    monkeypatch.setattr("sys.argv", argv)
+    assert runner["main"]() == 0
+
+    for name in ("ner.jsonl", "cands.jsonl", "scored.jsonl"):
+        assert (fused / name).read_bytes() == (chain / name).read_bytes(), name
+    assert (fused / "edges.jsonl").read_text(encoding="utf-8") == edges
+    assert len(edges.splitlines()) >= 2 and len((chain / "cands.jsonl").read_text().splitlines()) >= 6
@@ -0,0 +1,270 @@
+import functools
+import http.server
+import json
+import os
+import threading
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from groundkg import re_score, score_server
+
+CLASSES = ["none", "uses"]
+
+
+@pytest.fixture
+def server(fake_models, score_inputs, tmp_path):
+    batch_sizes = []
+
+    def score(pairs):
+        batch_sizes.append(len(pairs))
+        return list(
+            re_score.iter_scored(pairs, fake_models.embedder, fake_models.session, CLASSES, batch_size=8, marked=True)
+        )
+
+    stats = score_server.LatencyStats()
+    batcher = score_server.MicroBatcher(score, batch_size=64, max_wait=0.05, stats=stats)
+    address = f"unix:{tmp_path / 's.sock'}"
+    _, model, _ = score_inputs([])
+    srv = score_server.make_server(address, batcher, stats, score_server.model_info(model, CLASSES))
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield types.SimpleNamespace(address=address, model=model, batch_sizes=batch_sizes, models=fake_models)
+    srv.shutdown()
+    srv.server_close()
+
+
+def expected(server, cands):
+    return list(re_score.iter_scored(cands, server.models.embedder, server.models.session, CLASSES))
+
+
+def test_concurrent_requests_are_micro_batched(server, make_candidate):
+    cands = [make_candidate(n, sent_start=n) for n in range(40)]
+    results = {}
+    barrier = threading.Barrier(4)
+
+    def client(k):
+        c = score_server.ScoreClient(server.address)
+        barrier.wait()
+        results[k] = c.score(cands[k * 10 : (k + 1) * 10])
+
+    threads = [threading.Thread(target=client, args=(k,)) for k in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert [r for k in range(4) for r in results[k]] == expected(server, cands)
+    assert len(server.batch_sizes) < 4  # requests were merged
+    stats = score_server.ScoreClient(server.address).stats()
+    assert stats["requests"] == 4 and stats["pairs"] == 40
+    assert stats["p50_ms"] is not None and stats["p99_ms"] >= stats["p50_ms"]
+
+
+def test_re_score_uses_running_server(server, make_candidate, score_inputs, monkeypatch, capsys):
+    cands = [make_candidate(n, sent_start=n) for n in range(30)]
+    paths = score_inputs(cands)  # the served model file is left as it is
+
+    def no_models(*_a, **_k):
+        raise AssertionError("models must not be loaded when the server is used")
+
+    monkeypatch.setattr(re_score, "get_embedder", no_models)
+    monkeypatch.setattr(re_score, "load_session", no_models)
+    monkeypatch.setattr("sys.argv", ["re_score.py", *paths, "--server", server.address])
+    re_score.main()
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert lines == expected(server, cands)
+
+    monkeypatch.setattr("sys.argv", ["re_score.py", *paths, "--server", server.address, "--normalized"])
+    re_score.main()  # the client puts back the sentence keys the flat records leave out
+    normalized = list(re_score.pack_io.iter_records(json.loads(line) for line in capsys.readouterr().out.splitlines()))
+    assert [r["sent_idx"] for r in normalized] == [c["sent_idx"] for c in cands]
+
+
+def test_connect_falls_back_when_no_server(tmp_path, capsys):
+    assert score_server.connect(f"unix:{tmp_path / 'none.sock'}", CLASSES) is None
+    assert "scoring in-process" in capsys.readouterr().err
+
+
+def test_connect_falls_back_when_the_served_model_differs(server, tmp_path, capsys):
+    model = Path(server.model)
+    assert score_server.connect(server.address, CLASSES, str(model)) is not None
+
+    other = tmp_path / "other.onnx"
+    other.write_text("", encoding="utf-8")
+    assert score_server.connect(server.address, CLASSES, str(other)) is None
+    assert "not " + os.path.realpath(other) in capsys.readouterr().err
+
+    st = model.stat()
+    os.utime(model, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))  # retrained after the daemon loaded it
+    assert score_server.connect(server.address, CLASSES, str(model)) is None
+    assert "before it last changed" in capsys.readouterr().err
+    assert score_server.connect(server.address, ["none", "owns"]) is None
+
+
+def test_main_serves_with_the_re_score_embedding_cache(
+    fake_models, make_candidate, score_inputs, tmp_path, monkeypatch, capsys
+):
+    cands = [make_candidate(n) for n in range(6)]
+    paths = score_inputs(cands)
+    cache_dir = str(tmp_path / "emb")
+    argv = ["re_score.py", *paths, "--embed-cache", cache_dir, "--embed-cache-dtype", "float16"]
+    monkeypatch.setattr("sys.argv", argv)
+    re_score.main()  # fills the cache
+    capsys.readouterr()
+    re_score.main()  # scores from the float16 rows, as the server should
+    want = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    def no_encoder(*_a, **_k):
+        raise AssertionError("cached texts must not be encoded")
+
+    address = f"unix:{tmp_path / 'main.sock'}"
+    make_server, seen = score_server.make_server, {}
+
+    def make_and_query(*args):
+        srv = make_server(*args)
+
+        def serve_forever():
+            threading.Thread(target=type(srv).serve_forever, args=(srv,), daemon=True).start()
+            client = score_server.ScoreClient(address)
+            seen["info"], seen["scored"] = client.info(), client.score(cands)
+            srv.shutdown()
+            raise KeyboardInterrupt
+
+        srv.serve_forever = serve_forever
+        return srv
+
+    monkeypatch.setattr(score_server, "make_server", make_and_query)
+    monkeypatch.setattr(fake_models.embedder, "encode", no_encoder)
+    argv = ["score_server.py", *paths[1:], "--listen", address, "--embed-cache", cache_dir]
+    monkeypatch.setattr("sys.argv", argv + ["--embed-cache-dtype", "float16", "--stats-every", "0"])
+    assert score_server.main() == 0
+
+    assert seen["info"] == score_server.model_info(paths[1], CLASSES)
+    assert seen["scored"] == want
+    assert not os.path.exists(tmp_path / "main.sock")  # removed on shutdown
+
+    monkeypatch.setattr("sys.argv", ["score_server.py", str(tmp_path / "missing.onnx"), paths[2]])
+    assert score_server.main() == 2
+
+
+def test_parse_address_and_empty_stats():
+    assert score_server.parse_address("unix:.cache/s.sock") == ("unix", ".cache/s.sock")
+    assert score_server.parse_address("http://localhost:8011/") == ("tcp", ("localhost", 8011))
+    assert score_server.parse_address(":8011") == ("tcp", ("127.0.0.1", 8011))
+    snap = score_server.LatencyStats().snapshot()
+    assert snap["requests"] == 0 and snap["p50_ms"] is None and snap["mean_batch_pairs"] is None
+
+
+def blocked_batcher(batch_size, max_wait, fail_on=None):
+    """A MicroBatcher whose first batch blocks until ``release`` is set, so later jobs queue up."""
+    started, release, sizes = threading.Event(), threading.Event(), []
+
+    def score(pairs):
+        if not sizes:
+            started.set()
+            release.wait(5)
+        sizes.append(len(pairs))
+        if fail_on in pairs:
+            raise ValueError(f"cannot score {fail_on}")
+        return [p * 10 for p in pairs]
+
+    batcher = score_server.MicroBatcher(score, batch_size=batch_size, max_wait=max_wait)
+    return batcher, started, release, sizes
+
+
+def submit_all(batcher, jobs):
+    """Submit each job from its own thread; returns {job index: result or exception} once all are done."""
+    results = {}
+
+    def run(k):
+        try:
+            results[k] = batcher.submit(jobs[k])
+        except Exception as exc:
+            results[k] = exc
+
+    threads = [threading.Thread(target=run, args=(k,)) for k in range(len(jobs))]
+    for t in threads:
+        t.start()
+    return threads, results
+
+
+def test_micro_batches_close_when_full_or_at_the_deadline():
+    batcher, started, release, sizes = blocked_batcher(batch_size=7, max_wait=0.05)
+    first, results = submit_all(batcher, [[0]])
+    assert started.wait(5)  # the first batch is being scored (and blocks)
+    queued, later = submit_all(batcher, [[k, k, k] for k in range(1, 6)])
+    while batcher.jobs.qsize() < 5:
+        time.sleep(0.005)
+    release.set()
+    for t in first + queued:
+        t.join(5)
+
+    # full after three 3-pair jobs; the last two are sent when max_wait runs out
+    assert sizes == [1, 9, 6]
+    assert results[0] == [0] and sorted(map(tuple, later.values())) == [(k * 10,) * 3 for k in range(1, 6)]
+
+
+def test_micro_batch_errors_reach_every_request_in_the_batch():
+    batcher, started, release, sizes = blocked_batcher(batch_size=100, max_wait=0.05, fail_on=-1)
+    first, _ = submit_all(batcher, [[0]])
+    assert started.wait(5)
+    queued, results = submit_all(batcher, [[1, 2], [-1], [3]])
+    while batcher.jobs.qsize() < 3:
+        time.sleep(0.005)
+    release.set()
+    for t in first + queued:
+        t.join(5)
+
+    assert sizes == [1, 4]
+    assert all(isinstance(r, ValueError) for r in results.values())
+    assert batcher.submit([4]) == [40]  # the batcher thread survives
+
+
+def test_tcp_server_scores_and_reports_errors(fake_models, make_candidate):
+    def score(pairs):
+        return list(re_score.iter_scored(pairs, fake_models.embedder, fake_models.session, CLASSES, marked=True))
+
+    stats = score_server.LatencyStats()
+    batcher = score_server.MicroBatcher(score, batch_size=16, max_wait=0.001, stats=stats)
+    srv = score_server.make_server("127.0.0.1:0", batcher, stats, {"classes": CLASSES})
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        client = score_server.ScoreClient(f"http://127.0.0.1:{srv.server_address[1]}/")
+        cands = [make_candidate(n) for n in range(7)]
+        want = list(re_score.iter_scored(cands, fake_models.embedder, fake_models.session, CLASSES))
+        assert list(client.iter_scored(cands, chunk=3)) == want
+        assert client.score([]) == []
+        assert client.stats()["pairs"] == 7
+
+        with pytest.raises(RuntimeError, match="404"):
+            client._request("GET", "/nope")
+        with pytest.raises(RuntimeError, match="404"):
+            client._request("POST", "/nope", b"{}")
+        with pytest.raises(RuntimeError, match="400.*JSONDecodeError"):
+            client._request("POST", "/score", b"not json\n")
+        with pytest.raises(RuntimeError, match="400.*KeyError"):
+            client.score([{"doc_id": "d1", "text": "no spans"}])
+        assert client.score(cands[:1]) == want[:1]  # the connection is still usable
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_connect_falls_back_when_something_else_listens(tmp_path, capsys):
+    class Quiet(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+    srv = http.server.HTTPServer(("127.0.0.1", 0), functools.partial(Quiet, directory=str(tmp_path)))
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        assert score_server.connect(f"127.0.0.1:{srv.server_address[1]}", CLASSES) is None  # /health is a 404
+        assert "not reachable" in capsys.readouterr().err
+    finally:
+        srv.shutdown()
+        srv.server_close()
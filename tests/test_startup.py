@@ -0,0 +1,37 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ("torch", "sentence_transformers", "transformers", "tokenizers", "onnxruntime", "spacy", "sklearn", "requests", "bs4")
+
+CHILD = """
+import importlib, importlib.util, json, sys
+from pathlib import Path
+heavy, found = sys.argv[1].split(","), {}
+for path in sys.argv[2:]:
+    p = Path(path)
+    if p.parent.name == "groundkg":
+        importlib.import_module("groundkg" if p.stem == "__init__" else "groundkg." + p.stem)
+    else:
+        sys.path.insert(0, str(p.parent))
+        spec = importlib.util.spec_from_file_location("startup_" + p.stem, p)
+        spec.loader.exec_module(importlib.util.module_from_spec(spec))
+    new = [m for m in heavy if m in sys.modules and m not in found.values()]
+    for m in new:
+        found[path] = m
+print(json.dumps(found))
+"""
+
+
+def test_modules_import_no_heavy_dependencies():
+    # a fresh interpreter: the conftest stubs would hide real imports here
+    paths = sorted(str(p) for p in (ROOT / "groundkg").glob("*.py")) + [
+        str(ROOT / "tools" / name)
+        for name in ("run_pipeline.py", "promote_from_scored.py", "quality_report.py", "crawl.py", "bench_ner_profiles.py")
+    ]
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD, ",".join(HEAVY), *paths], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    assert json.loads(proc.stdout) == {}
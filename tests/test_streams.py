@@ -0,0 +1,42 @@
+import pytest
+
+from groundkg import streams
+
+
+def test_threaded_preserves_order_and_reraises():
+    assert list(streams.threaded(iter(range(1000)), maxsize=2)) == list(range(1000))
+
+    def broken():
+        yield 1
+        raise ValueError("bad line")
+
+    with pytest.raises(ValueError, match="bad line"):
+        list(streams.threaded(broken()))
+
+
+def test_consume_threaded_applies_backpressure():
+    produced, seen = [], []
+
+    def records():
+        for i in range(5000):
+            produced.append(i)
+            yield i
+
+    def consume(recs):
+        for r in recs:
+            # producer can be at most queue + one chunk in flight ahead of the writer
+            assert len(produced) - len(seen) <= (2 + 2) * streams.CHUNK
+            seen.append(r)
+
+    streams.consume_threaded(records(), consume, maxsize=2)
+    assert seen == list(range(5000))
+
+
+def test_consume_threaded_reraises_writer_error_without_hanging():
+    def consume(recs):
+        for r in recs:
+            if r == 100:
+                raise BrokenPipeError("stdout closed")
+
+    with pytest.raises(BrokenPipeError):
+        streams.consume_threaded(iter(range(100000)), consume, maxsize=1)
@@ -1,30 +1,47 @@
 #!/usr/bin/env python3
 """Automatically adjust thresholds if no edges are emitted."""
+import argparse
 import json
 import sys
 import os
 from collections import defaultdict
+from pathlib import Path
 
-def analyze_predictions(scored_path):
-    """Analyze prediction distribution."""
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from groundkg import probs_io  # noqa: E402
+from groundkg.pack_io import iter_records  # noqa: E402
+
+def load_pred_probs(scored_path, probs_path=None):
+    """{pred: float64 array of top probabilities} of non-'none' predictions, from the sidecar if given."""
+    if probs_path:
+        probs, classes = probs_io.load(probs_path)
+        by_class = probs_io.probs_by_class(probs, classes)
+        return {pred: p.astype(np.float64) for pred, p in by_class.items() if pred != 'none'}
     pred_probs = defaultdict(list)
     with open(scored_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            if not line.strip():
-                continue
-            r = json.loads(line)
+        # pred/prob only, so normalized rows are not expanded
+        for r in iter_records((json.loads(line) for line in f if line.strip()), expand=False):
             pred = r.get('pred', 'none')
             prob = float(r.get('prob', 0.0))
             if pred != 'none':
                 pred_probs[pred].append(prob)
+    return {pred: np.asarray(probs, dtype=np.float64) for pred, probs in pred_probs.items()}
+
+def analyze_predictions(scored_path, probs_path=None, pred_probs=None):
+    """Analyze prediction distribution."""
+    if pred_probs is None:
+        pred_probs = load_pred_probs(scored_path, probs_path)
     
     stats = {}
     for pred, probs in pred_probs.items():
-        if not probs:
+        if not len(probs):
             continue
-        probs_sorted = sorted(probs, reverse=True)
+        probs_sorted = np.sort(probs)[::-1].tolist()
         stats[pred] = {
-            'mean': sum(probs) / len(probs),
+            'mean': float(probs.mean()),
             'median': probs_sorted[len(probs_sorted) // 2],
             'p75': probs_sorted[len(probs_sorted) * 3 // 4] if len(probs_sorted) > 3 else probs_sorted[-1],
             'p90': probs_sorted[len(probs_sorted) * 9 // 10] if len(probs_sorted) > 9 else probs_sorted[-1],
@@ -33,7 +50,7 @@ def analyze_predictions(scored_path):
         }
     return stats
 
-def adjust_thresholds(thresholds_path, scored_path, min_edges=10, min_threshold=0.60):
+def adjust_thresholds(thresholds_path, scored_path, min_edges=10, min_threshold=0.60, probs_path=None):
     """Adjust thresholds to ensure at least min_edges are emitted.
     
     Args:
@@ -41,6 +58,7 @@ def adjust_thresholds(thresholds_path, scored_path, min_edges=10, min_threshold=
         scored_path: Path to scored predictions
         min_edges: Minimum number of edges to emit
         min_threshold: Minimum threshold floor (default 0.60)
+        probs_path: Probability sidecar (re_score --probs); read instead of parsing scored_path
     """
     # Load current thresholds
     if os.path.exists(thresholds_path):
@@ -49,22 +67,16 @@ def adjust_thresholds(thresholds_path, scored_path, min_edges=10, min_threshold=
         thresholds = {}
     
     # Count edges that would be emitted with current thresholds
+    pred_probs = load_pred_probs(scored_path, probs_path)
     edges_count = defaultdict(int)
-    with open(scored_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            if not line.strip():
-                continue
-            r = json.loads(line)
-            pred = r.get('pred', 'none')
-            prob = float(r.get('prob', 0.0))
-            thr = float(thresholds.get(pred, 0.85))
-            if pred != 'none' and prob >= thr:
-                edges_count[pred] += 1
+    for pred, probs in pred_probs.items():
+        thr = float(thresholds.get(pred, 0.85))
+        edges_count[pred] = int(np.count_nonzero(probs >= thr))
     
     total_edges = sum(edges_count.values())
     
     # Analyze prediction distribution
-    stats = analyze_predictions(scored_path)
+    stats = analyze_predictions(scored_path, pred_probs=pred_probs)
     
     # Adjust thresholds to ensure we get some edges AND enforce minimum floor
     adjusted = thresholds.copy()
@@ -106,16 +118,23 @@ def adjust_thresholds(thresholds_path, scored_path, min_edges=10, min_threshold=
     return adjusted, adjusted_any
 
 def main():
-    scored_path = sys.argv[1] if len(sys.argv) > 1 else "out/pack.scored.jsonl"
-    thresholds_path = sys.argv[2] if len(sys.argv) > 2 else "models/thresholds.json"
-    min_edges = int(sys.argv[3]) if len(sys.argv) > 3 else 10
-    min_threshold = float(sys.argv[4]) if len(sys.argv) > 4 else 0.60
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("scored_path", nargs="?", default="out/pack.scored.jsonl")
+    ap.add_argument("thresholds_path", nargs="?", default="models/thresholds.json")
+    ap.add_argument("min_edges", nargs="?", type=int, default=10)
+    ap.add_argument("min_threshold", nargs="?", type=float, default=0.60)
+    ap.add_argument("--probs", default=None, help="probability sidecar written by re_score --probs")
+    args = ap.parse_args()
+    scored_path, thresholds_path = args.scored_path, args.thresholds_path
+    min_edges, min_threshold = args.min_edges, args.min_threshold
     
     if not os.path.exists(scored_path):
         print(f"Error: {scored_path} not found", file=sys.stderr)
         sys.exit(1)
     
-    adjusted_thresholds, was_adjusted = adjust_thresholds(thresholds_path, scored_path, min_edges, min_threshold)
+    adjusted_thresholds, was_adjusted = adjust_thresholds(
+        thresholds_path, scored_path, min_edges, min_threshold, args.probs
+    )
     
     if was_adjusted:
         os.makedirs(os.path.dirname(thresholds_path) or ".", exist_ok=True)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Micro-benchmark entity-to-sentence assignment in groundkg.ner_tag.
+
+Builds synthetic documents (sentence/entity spans only, no spaCy model) of
+growing size and times the merge-pass ``assign_entities`` against the old
+per-sentence scan over ``doc.ents``. The legacy scan is quadratic, so it is
+only run up to ``--legacy-max-mb``.
+"""
+import argparse
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from groundkg.ner_tag import assign_entities  # noqa: E402
+
+Span = namedtuple("Span", "start_char end_char")
+
+SENT_CHARS = 100  # ~100 chars per sentence, 2 entities each
+
+
+def synthetic_doc(n_bytes):
+    sents, ents = [], []
+    for pos in range(0, n_bytes, SENT_CHARS):
+        sents.append(Span(pos, pos + SENT_CHARS - 1))
+        ents.append(Span(pos + 5, pos + 15))
+        ents.append(Span(pos + 40, pos + 60))
+    return sents, ents
+
+
+def legacy_assign(sents, ents):
+    for sent in sents:
+        yield sent, [e for e in ents if e.start_char >= sent.start_char and e.end_char <= sent.end_char]
+
+
+def timed(fn, sents, ents):
+    t0 = time.perf_counter()
+    out = [(s, len(inside)) for s, inside in fn(sents, ents)]
+    return time.perf_counter() - t0, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sizes-mb", default="0.25,0.5,1,2,5", help="comma-separated document sizes in MB")
+    ap.add_argument("--legacy-max-mb", type=float, default=0.5, help="largest size to run the quadratic scan on")
+    args = ap.parse_args()
+
+    print(f"{'size_mb':>8} {'sents':>8} {'ents':>8} {'merge_s':>9} {'us/sent':>8} {'legacy_s':>9} {'speedup':>8}")
+    for size in (float(x) for x in args.sizes_mb.split(",")):
+        sents, ents = synthetic_doc(int(size * 1_000_000))
+        t_new, out_new = timed(assign_entities, sents, ents)
+        legacy, speedup = "-", "-"
+        if size <= args.legacy_max_mb:
+            t_old, out_old = timed(legacy_assign, sents, ents)
+            if out_old != out_new:
+                print("ERROR: merge pass disagrees with legacy scan", file=sys.stderr)
+                return 1
+            legacy, speedup = f"{t_old:.3f}", f"{t_old / t_new:.0f}x"
+        print(
+            f"{size:>8.2f} {len(sents):>8d} {len(ents):>8d} {t_new:>9.4f} "
+            f"{1e6 * t_new / len(sents):>8.2f} {legacy:>9} {speedup:>8}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Compare NER speed profiles: throughput and entity agreement with `accurate`.
+
+Runs each profile of groundkg.ner_tag over the same documents and reports
+docs/sec, sentences/sec and precision/recall/F1 of its entities
+(doc_id, document offsets, label) against the accurate profile.
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from groundkg import ner_tag  # noqa: E402
+
+
+def run_profile(profile, docs, batch_size, model=None, exclude=None):
+    nlp = ner_tag.load_pipeline(model, profile=profile, exclude=exclude)
+    ents, n_sents = set(), 0
+    t0 = time.perf_counter()
+    for line in ner_tag.tag_documents(nlp, docs, batch_size=batch_size):
+        rec = json.loads(line)
+        n_sents += 1
+        base = rec["sent_start"]
+        for e in rec["entities"]:
+            ents.add((rec["doc_id"], base + e["start"], base + e["end"], e["label"]))
+    return time.perf_counter() - t0, n_sents, ents
+
+
+def agreement(pred, gold):
+    tp = len(pred & gold)
+    p = tp / len(pred) if pred else 1.0
+    r = tp / len(gold) if gold else 1.0
+    f1 = 2 * p * r / (p + r) if p + r else 0.0
+    return p, r, f1
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("input", nargs="?", default=ner_tag.CORPUS_DIR, help="file, directory, glob or manifest")
+    ap.add_argument("--profiles", default="accurate,fast", help="comma-separated profiles to compare")
+    ap.add_argument("--custom-model", default=None, help="model for the custom profile")
+    ap.add_argument("--exclude", default="", help="comma-separated components to exclude in the custom profile")
+    ap.add_argument("--limit", type=int, default=50, help="number of documents to sample")
+    ap.add_argument("--batch-size", type=int, default=8)
+    ap.add_argument("--json", action="store_true", help="emit one JSON record per profile")
+    args = ap.parse_args()
+
+    docs = list(itertools.islice(ner_tag.iter_documents(args.input), args.limit))
+    if not docs:
+        print(f"No documents found in {args.input}", file=sys.stderr)
+        return 2
+    profiles = [p for p in args.profiles.split(",") if p]
+    if "accurate" not in profiles:
+        profiles.insert(0, "accurate")  # reference for agreement
+
+    results = {}
+    for profile in profiles:
+        custom = profile == "custom"
+        wall, n_sents, ents = run_profile(
+            profile,
+            docs,
+            args.batch_size,
+            model=args.custom_model if custom else None,
+            exclude=[c for c in args.exclude.split(",") if c] if custom else None,
+        )
+        results[profile] = (wall, n_sents, ents)
+
+    gold = results["accurate"][2]
+    if not args.json:
+        print(f"{'profile':10s} {'docs/s':>8} {'sents/s':>9} {'ents':>7} {'P':>6} {'R':>6} {'F1':>6}")
+    for profile, (wall, n_sents, ents) in results.items():
+        p, r, f1 = agreement(ents, gold)
+        row = {
+            "profile": profile,
+            "docs": len(docs),
+            "docs_per_s": round(len(docs) / wall, 3) if wall else None,
+            "sents_per_s": round(n_sents / wall, 1) if wall else None,
+            "entities": len(ents),
+            "precision_vs_accurate": round(p, 4),
+            "recall_vs_accurate": round(r, 4),
+            "f1_vs_accurate": round(f1, 4),
+        }
+        if args.json:
+            print(json.dumps(row))
+        else:
+            print(
+                f"{profile:10s} {row['docs_per_s']:>8} {row['sents_per_s']:>9} {len(ents):>7d} "
+                f"{p:>6.3f} {r:>6.3f} {f1:>6.3f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
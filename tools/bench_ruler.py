@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Startup time and memory of the entity_ruler as gazetteers grow.
+
+For each pattern count, writes a synthetic gazetteer (organisation names as
+phrase patterns plus exact-ORTH token patterns) and measures, each in a fresh
+process: plain ``ruler.from_disk`` (the old path), a cold
+``load_ruler_patterns`` that compiles and writes the artifact, and a warm one
+that reuses it. Memory is the RSS growth while the ruler is built.
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_gazetteer(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            if i % 4 == 3:
+                pattern = [{"ORTH": f"Agency{i}"}, {"ORTH": "Act"}]
+                f.write(json.dumps({"label": "LAW", "pattern": pattern}) + "\n")
+            else:
+                f.write(json.dumps({"label": "ORG", "pattern": f"Org{i} Holdings Ltd"}) + "\n")
+
+
+def measure(mode, patterns_path, cache_dir, model, queue):
+    import spacy
+
+    from groundkg import ner_tag
+
+    nlp = spacy.load(model) if model else spacy.blank("en")
+    nlp.add_pipe("sentencizer", first=True)
+    ruler = nlp.add_pipe("entity_ruler")
+    before = rss_mb()
+    t0 = time.perf_counter()
+    if mode == "from_disk":
+        ruler.from_disk(patterns_path)
+        n_loaded = len(ruler)
+    else:
+        n_loaded = ner_tag.load_ruler_patterns(nlp, ruler, patterns_path, cache_dir)
+    queue.put((time.perf_counter() - t0, rss_mb() - before, n_loaded))
+
+
+def run(mode, patterns_path, cache_dir, model):
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=measure, args=(mode, patterns_path, cache_dir, model, queue))
+    proc.start()
+    proc.join()
+    if proc.exitcode:
+        raise SystemExit(f"{mode} measurement failed (exit code {proc.exitcode})")
+    return queue.get()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sizes", default="1000,10000,100000", help="comma-separated pattern counts")
+    ap.add_argument("--model", default=None, help="spaCy model whose tokenizer to use (default: blank English)")
+    args = ap.parse_args()
+
+    print(f"{'patterns':>9} {'mode':>10} {'seconds':>9} {'rss_mb':>8} {'artifact_mb':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (int(x) for x in args.sizes.split(",")):
+            patterns_path = Path(tmp) / f"patterns_{n}.jsonl"
+            cache_dir = Path(tmp) / f"cache_{n}"
+            write_gazetteer(patterns_path, n)
+            for mode in ("from_disk", "cold", "warm"):
+                seconds, rss, n_loaded = run(mode, str(patterns_path), str(cache_dir), args.model)
+                if n_loaded != n:
+                    print(f"ERROR: {mode} loaded {n_loaded} of {n} patterns", file=sys.stderr)
+                    return 1
+                size = sum(p.stat().st_size for p in cache_dir.glob("*")) / 1e6 if mode != "from_disk" else 0.0
+                print(f"{n:>9d} {mode:>10} {seconds:>9.3f} {rss:>8.1f} {size:>12.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Startup time and throughput of re_score: encoder + ONNX head vs fused model(s).
+
+Each mode runs in a freshly spawned process, so startup includes importing the scoring
+stack (torch + sentence-transformers for the encoder path, only onnxruntime +
+tokenizers for the fused one) and loading the models. Throughput is measured
+after a warm-up batch, over the same candidates for both modes; the fused
+model's predictions are also compared with the encoder path's. The INT8 fused
+model (training/quantize_encoder.py) is included when it exists.
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import queue as queue_mod
+import resource
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def measure(onnx_path, classes_path, cands, batch_size, queue):
+    t0 = time.perf_counter()
+    from groundkg import re_score
+
+    classes = json.load(open(classes_path, "r", encoding="utf-8"))
+    sess = re_score.load_session(onnx_path)
+    embedder = None if re_score.is_fused(sess) else re_score.get_embedder()
+    list(re_score.iter_scored(cands[:batch_size], embedder, sess, classes, batch_size=batch_size))
+    startup = time.perf_counter() - t0
+    t1 = time.perf_counter()
+    scored = list(re_score.iter_scored(cands, embedder, sess, classes, batch_size=batch_size))
+    wall = time.perf_counter() - t1
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put((startup, wall, rss, [r["pred"] for r in scored]))
+
+
+def run(mode, onnx_path, classes_path, cands, batch_size):
+    ctx = multiprocessing.get_context("spawn")  # fork would inherit this process's imports
+    queue = ctx.Queue()
+    proc = ctx.Process(target=measure, args=(onnx_path, classes_path, cands, batch_size, queue))
+    proc.start()
+    while True:  # drain before join: the predictions can exceed the pipe buffer
+        try:
+            result = queue.get(timeout=1)
+            break
+        except queue_mod.Empty:
+            if not proc.is_alive():
+                raise SystemExit(f"{mode} measurement failed (exit code {proc.exitcode})")
+    proc.join()
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("candidates", help="candidates JSONL (flat or normalized layout)")
+    ap.add_argument("--onnx", default="models/promoter_v1.onnx", help="ONNX head for the encoder path")
+    ap.add_argument("--fused", default="models/promoter_v1.fused.onnx", help="fused encoder + head model")
+    ap.add_argument("--int8", default="models/promoter_v1.fused.int8.onnx", help="quantized fused model (if present)")
+    ap.add_argument("--classes", default="models/classes.json")
+    ap.add_argument("--limit", type=int, default=2000, help="number of candidates to score")
+    ap.add_argument("--batch-size", type=int, default=32)
+    args = ap.parse_args()
+
+    from groundkg import pack_io
+
+    cands = list(itertools.islice(pack_io.read_records(args.candidates), args.limit))
+    if not cands:
+        print(f"No candidates in {args.candidates}", file=sys.stderr)
+        return 2
+
+    print(f"{'mode':>8} {'startup_s':>10} {'pairs/s':>9} {'peak_rss_mb':>12}")
+    preds = {}
+    modes = [("encoder", args.onnx), ("fused", args.fused)]
+    if os.path.exists(args.int8):
+        modes.append(("int8", args.int8))
+    for mode, path in modes:
+        startup, wall, rss, preds[mode] = run(mode, path, args.classes, cands, args.batch_size)
+        print(f"{mode:>8} {startup:>10.2f} {len(cands) / wall:>9.1f} {rss:>12.0f}")
+    for mode, _ in modes[1:]:
+        agree = sum(a == b for a, b in zip(preds["encoder"], preds[mode])) / len(cands)
+        print(f"prediction agreement ({mode} vs encoder): {agree:.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
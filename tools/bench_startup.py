@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Import time of every module in groundkg/ and tools/, checked against a budget.
+
+Each module is imported in a fresh interpreter under ``python -X importtime``.
+Tools are loaded the way they run as scripts (their directory first on
+sys.path, ``main`` not called). A module's time is the cumulative time of the
+top-level imports it triggers, after interpreter startup, as the best of
+--repeat runs. Modules over budget, or failing to import, are listed with
+their slowest direct imports, and the exit status is 1. A heavy dependency
+(torch, spaCy, onnxruntime, sklearn) imported at module level shows up here
+long before anyone notices ``--help`` taking seconds.
+
+    python tools/bench_startup.py                  # everything, default budget
+    python tools/bench_startup.py groundkg/re_score.py --budget-ms 150
+"""
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_BUDGET_MS = 250  # numpy alone is ~100 ms; spaCy ~800 ms, torch seconds
+BUDGETS_MS = {}  # per-module overrides, e.g. {"tools/crawl.py": 400}
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+MARK = "@@startup-check@@"
+
+CHILD = """
+import importlib, importlib.util, sys
+path, name = sys.argv[1], sys.argv[2]
+sys.stderr.write({mark!r} + "\\n")
+sys.stderr.flush()
+if name:
+    importlib.import_module(name)
+else:
+    sys.path.insert(0, str(__import__("pathlib").Path(path).parent))
+    spec = importlib.util.spec_from_file_location("startup_check", path)
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+""".format(mark=MARK)
+
+
+def modules(paths):
+    """(relative path, dotted name or None for a script) for the given files, or all of groundkg/ and tools/."""
+    files = [Path(p).resolve() for p in paths] or sorted((ROOT / "groundkg").glob("*.py")) + sorted(
+        (ROOT / "tools").glob("*.py")
+    )
+    for f in files:
+        rel = f.relative_to(ROOT).as_posix()
+        name = None
+        if rel.startswith("groundkg/"):
+            name = "groundkg" if f.stem == "__init__" else f"groundkg.{f.stem}"
+        yield rel, name
+
+
+def measure(rel, name):
+    """(milliseconds, [(ms, import)] of the top-level imports, error text or None)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, str(ROOT / rel), name or ""],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    err = proc.stderr.split(MARK, 1)[-1]
+    top = []
+    for line in err.splitlines():
+        m = LINE.match(line)
+        if m and not m.group(3):
+            top.append((int(m.group(2)) / 1000, m.group(4)))
+    if proc.returncode != 0:
+        return None, top, err.strip().splitlines()[-1] if err.strip() else f"exit {proc.returncode}"
+    return sum(ms for ms, _ in top), top, None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("paths", nargs="*", help="module files to check (default: groundkg/*.py and tools/*.py)")
+    ap.add_argument("--budget-ms", type=float, default=None, help=f"budget for every module (default {DEFAULT_BUDGET_MS})")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per module; the fastest counts")
+    ap.add_argument("--top", type=int, default=3, help="slowest imports listed for modules over budget")
+    args = ap.parse_args()
+
+    failed = 0
+    for rel, name in modules(args.paths):
+        budget = args.budget_ms or BUDGETS_MS.get(rel, DEFAULT_BUDGET_MS)
+        runs = [measure(rel, name) for _ in range(max(1, args.repeat))]
+        ms, top, error = min(runs, key=lambda r: float("inf") if r[0] is None else r[0])
+        if error:
+            status = f"ERROR {error}"
+        else:
+            status = "ok" if ms <= budget else "OVER"
+        print(f"{rel:42s} {ms if ms is not None else float('nan'):8.1f} ms  (budget {budget:.0f})  {status}")
+        if status != "ok":
+            failed += 1
+            for t, imp in sorted(top, reverse=True)[: args.top]:
+                print(f"    {t:8.1f} ms  {imp}")
+    print(f"{failed} module(s) over budget or failing" if failed else "All modules within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
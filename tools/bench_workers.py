@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Throughput of re_score --workers N for a range of N on one candidates file.
+
+Each run is a separate re_score process scoring the same candidates, with
+the workers' threads pinned to cores / N. The aggregate pairs/s reported by
+re_score is printed with the speedup over one worker. Every run's output is
+also checked against the single-worker output. Pass --embed-cache to measure
+warm-cache runs. Without it, every run encodes all pairs.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+RATE = re.compile(r"Scored \d+ pairs \(.*\) in [\d.]+s: ([\d.]+) pairs/s")
+
+
+def run(args, workers):
+    cmd = [sys.executable, "-m", "groundkg.re_score", args.candidates, args.onnx, args.classes]
+    cmd += ["--batch-size", str(args.batch_size), "--bucket-window", str(args.bucket_window)]
+    cmd += ["--workers", str(workers)]
+    if workers == 1:
+        cmd += ["--intra-op-threads", str(os.cpu_count() or 1)]
+    if args.embed_cache:
+        cmd += ["--embed-cache", args.embed_cache]
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(proc.returncode)
+    return proc.stdout, proc.stderr
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("candidates", help="candidates JSONL (flat or normalized layout)")
+    ap.add_argument("--onnx", default="models/promoter_v1.onnx", help="ONNX head or fused model")
+    ap.add_argument("--classes", default="models/classes.json")
+    ap.add_argument("--workers", default=None, help="comma-separated worker counts (default: 1, 2, 4, ... up to cores)")
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--bucket-window", type=int, default=0)
+    ap.add_argument("--embed-cache", default=None)
+    args = ap.parse_args()
+
+    n_cpu = os.cpu_count() or 1
+    counts = [int(w) for w in args.workers.split(",")] if args.workers else sorted(
+        {w for w in (1, 2, 4, 8, 16, 32, 64) if w <= n_cpu} | {n_cpu}
+    )
+    print(f"{'workers':>8} {'threads':>8} {'pairs/s':>10} {'speedup':>8}  (cores: {n_cpu})")
+    base_out = base_rate = None
+    for w in counts:
+        out, err = run(args, w)
+        rate = float(RATE.search(err).group(1))
+        threads = n_cpu if w == 1 else max(1, n_cpu // w)
+        if base_out is None:
+            base_out, base_rate = out, rate
+        same = "" if out == base_out else "  OUTPUT DIFFERS"
+        print(f"{w:>8} {threads:>8} {rate:>10.1f} {rate / base_rate:>8.2f}{same}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
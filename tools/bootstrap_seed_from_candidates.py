@@ -2,6 +2,12 @@ import json
 import os
 import re
 import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from groundkg.pack_io import iter_records  # noqa: E402
+from groundkg.re_types import ALLOWED_TYPES  # noqa: E402
 
 
 INP_DEFAULT = "out/pack.candidates.jsonl"
@@ -53,58 +59,9 @@ MID = {
 }
 
 
-# Type guards (aligned with groundkg/re_infer.py ALLOWED_TYPES)
-SUB_ALLOWED = {
-    "headquartered_in": {"ORG", "PERSON", "FAC", "NORP"},
-    "operates_in": {"ORG", "PRODUCT"},
-    "subsidiary_of": {"ORG"},
-    "member_of": {"ORG", "PERSON", "PRODUCT"},
-    "part_of": {"ORG", "PRODUCT", "FAC", "WORK_OF_ART", "LOC", "GPE"},
-    "covered_by": {
-        "ORG",
-        "PRODUCT",
-        "PERSON",
-        "FAC",
-        "GPE",
-        "EVENT",
-        "LAW",
-        "NORP",
-        "LOC",
-        "WORK_OF_ART",
-        "NOUNPHRASE",
-    },
-    "requires": {"LAW", "ORG"},
-    "prohibits": {"LAW", "ORG"},
-    "provides": {"ORG", "PRODUCT"},
-    "uses": {"ORG", "PERSON", "PRODUCT"},
-    "type": {
-        "ORG",
-        "PRODUCT",
-        "PERSON",
-        "FAC",
-        "GPE",
-        "EVENT",
-        "LAW",
-        "NORP",
-        "LOC",
-        "WORK_OF_ART",
-        "NOUNPHRASE",
-    },
-}
-
-OBJ_ALLOWED = {
-    "headquartered_in": {"GPE", "LOC", "FAC"},
-    "operates_in": {"GPE", "LOC", "NORP"},
-    "subsidiary_of": {"ORG"},
-    "member_of": {"ORG"},
-    "part_of": {"ORG", "PRODUCT", "FAC", "WORK_OF_ART", "LOC", "GPE"},
-    "covered_by": {"LAW"},
-    "requires": {"NOUNPHRASE", "WORK_OF_ART"},
-    "prohibits": {"NOUNPHRASE", "WORK_OF_ART"},
-    "provides": {"NOUNPHRASE", "PRODUCT", "WORK_OF_ART"},
-    "uses": {"PRODUCT", "WORK_OF_ART", "LAW", "NOUNPHRASE"},
-    "type": {"NOUNPHRASE", "ORG", "PRODUCT", "WORK_OF_ART"},
-}
+# Type guards (shared table in groundkg/re_types.py)
+SUB_ALLOWED = {pred: subj for pred, (subj, _) in ALLOWED_TYPES.items()}
+OBJ_ALLOWED = {pred: obj for pred, (_, obj) in ALLOWED_TYPES.items()}
 
 
 def type_ok(lbl: str, s_lab: str, o_lab: str) -> bool:
@@ -202,10 +159,8 @@ def main():
     seen_per_sentence = {}  # Track seen pairs per (doc_id, sent_idx)
     with open(outp, "w", encoding="utf-8") as w:
         with open(inp, "r", encoding="utf-8") as f:
-            for line in f:
-                if not line.strip():
-                    continue
-                c = json.loads(line)
+            # flat or normalized layout
+            for c in iter_records(json.loads(line) for line in f if line.strip()):
                 text = c["text"]
                 s, o = c["subject"], c["object"]
                 
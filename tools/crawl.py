@@ -3,16 +3,11 @@ import csv, sys, time, json, urllib.parse
 from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore', message='urllib3 v2 only supports OpenSSL')
-import requests
-from requests.adapters import HTTPAdapter, Retry
-from bs4 import BeautifulSoup
-import trafilatura
-from pdfminer.high_level import extract_text as pdf_extract_text
 from urllib import robotparser
-from slugify import slugify
+# requests, bs4, trafilatura, pdfminer and slugify are imported where they are used
 
-RAW_DIR = Path("data/raw"); RAW_DIR.mkdir(parents=True, exist_ok=True)
-CORPUS_DIR = Path("data/corpus"); CORPUS_DIR.mkdir(parents=True, exist_ok=True)
+RAW_DIR = Path("data/raw")
+CORPUS_DIR = Path("data/corpus")
 META_P = Path("data/meta.jsonl")
 UA = "GroundKGFetcher/1.0 (Educational/Research; +https://github.com/groundkg)"
 SKIP_ROBOTS_DOMAINS = {"wikipedia.org", "arxiv.org"}  # Trusted domains where we skip robots.txt
@@ -41,6 +36,8 @@ def allowed_by_robots(url: str)->bool:
         return True
 
 def session():
+    import requests
+    from requests.adapters import HTTPAdapter, Retry
     s = requests.Session()
     r = Retry(total=3, backoff_factor=0.5, status_forcelist=[429,500,502,503,504])
     s.headers["User-Agent"] = UA
@@ -49,6 +46,7 @@ def session():
     return s
 
 def filename_for(doc_id: str, ctype: str)->Path:
+    from slugify import slugify
     ext = ".html"
     if "pdf" in (ctype or "").lower(): ext = ".pdf"
     return RAW_DIR / f"{slugify(doc_id)}{ext}"
@@ -77,6 +75,8 @@ def fetch_and_snapshot(doc_id: str, url: str):
     return out, ctype, data
 
 def html_to_text(data: bytes, url: str):
+    from bs4 import BeautifulSoup
+    import trafilatura
     html = data.decode("utf-8", errors="ignore")
     title = ""
     try:
@@ -89,6 +89,7 @@ def html_to_text(data: bytes, url: str):
 
 def pdf_to_text(data: bytes)->str:
     import tempfile
+    from pdfminer.high_level import extract_text as pdf_extract_text
     with tempfile.NamedTemporaryFile(suffix=".pdf", delete=True) as tmp:
         tmp.write(data); tmp.flush()
         try:
@@ -107,6 +108,8 @@ def main():
     seed = Path("data/seed.csv")
     if not seed.exists():
         print("Missing data/seed.csv", file=sys.stderr); sys.exit(2)
+    RAW_DIR.mkdir(parents=True, exist_ok=True)
+    CORPUS_DIR.mkdir(parents=True, exist_ok=True)
     META_P.unlink(missing_ok=True)
     with seed.open("r", encoding="utf-8") as f:
         rdr = csv.DictReader(f)
@@ -1,5 +1,10 @@
 # tools/mine_patterns.py
 import sys, json, re, collections, argparse,os
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from groundkg.pack_io import iter_records  # noqa: E402
 
 # Simple tokenization
 TOKEN_RE = re.compile(r"\w+|[^\w\s]")
@@ -24,8 +29,7 @@ def mine_from_candidates(cand_path, min_count=5):
     counts = collections.Counter()
     examples = {}
     with open(cand_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            c = json.loads(line)
+        for c in iter_records(json.loads(line) for line in f if line.strip()):
             text = c['text']; s=c['subject']; o=c['object']
             s0,s1 = s['start'], s['end']; o0,o1 = o['start'], o['end']
             toks = window_between(text, s0, s1, o0, o1)
@@ -42,8 +46,7 @@ def mine_from_scored(scored_path, min_count=3, min_prob=0.9):
     counts = {}  # {(label, key): count}
     examples = {}
     with open(scored_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            r = json.loads(line)
+        for r in iter_records(json.loads(line) for line in f if line.strip()):
             if float(r.get('prob',0)) < min_prob: 
                 continue
             text = r['text']; s=r['subject']; o=r['object']; lbl = r.get('pred','')
@@ -1,31 +1,72 @@
-import sys, json
+import sys, json, argparse
+from pathlib import Path
 
-def main():
-    scored_path, thr_path = sys.argv[1:3]
-    thresholds = json.load(open(thr_path, 'r', encoding='utf-8'))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from groundkg.pack_io import iter_records, read_records  # noqa: E402
+
+def to_edge(r, pred):
+    s = r['subject']; o = r['object']
+    return {
+        'subject': s.get('text','').strip(),
+        'predicate': pred,
+        'object': o.get('text','').strip(),
+        'evidence': {
+            'doc_id': r.get('doc_id'),
+            'quote': r.get('text',''),
+            'char_start': r.get('sent_start', 0),
+            'char_end': r.get('sent_start', 0) + len(r.get('text',''))
+        }
+    }
+
+def iter_edges(scored, thresholds):
+    """Yield edges for scored records whose prob clears the class threshold."""
+    for r in scored:
+        pred = r.get('pred', 'none')
+        prob = float(r.get('prob', 0.0))
+        thr = float(thresholds.get(pred, 0.85))
+        if pred == 'none' or prob < thr:
+            continue
+        yield to_edge(r, pred)
+
+def iter_edges_from_probs(scored_path, probs_path, thresholds):
+    """Like ``iter_edges``, but decided on the probability sidecar written by ``re_score --probs``.
+
+    In a flat scored file only the lines of passing rows are parsed.
+    """
+    from groundkg import probs_io  # numpy; only needed with --probs
+    probs, classes = probs_io.load(probs_path)
+    keep = probs_io.passing_mask(probs, classes, thresholds)
     with open(scored_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            r = json.loads(line)
-            pred = r.get('pred', 'none')
-            prob = float(r.get('prob', 0.0))
-            thr = float(thresholds.get(pred, 0.85))
-            if pred == 'none' or prob < thr:
-                continue
-            s = r['subject']; o = r['object']
-            edge = {
-                'subject': s.get('text','').strip(),
-                'predicate': pred,
-                'object': o.get('text','').strip(),
-                'evidence': {
-                    'doc_id': r.get('doc_id'),
-                    'quote': r.get('text',''),
-                    'char_start': r.get('sent_start', 0),
-                    'char_end': r.get('sent_start', 0) + len(r.get('text',''))
-                }
-            }
-            sys.stdout.write(json.dumps(edge, ensure_ascii=False) + "\n")
+        first = next((line for line in f if line.strip()), None)
+    flat = first is not None and 'subject' in json.loads(first)
+    n = 0
+    with open(scored_path, 'r', encoding='utf-8') as f:
+        lines = (line for line in f if line.strip())
+        if flat:  # one line per pair
+            records = (json.loads(line) if i < len(keep) and keep[i] else None for i, line in enumerate(lines))
+        else:
+            records = iter_records((json.loads(line) for line in lines), expand=True)
+        for r in records:
+            if n < len(keep) and keep[n]:
+                yield to_edge(r, classes[int(probs[n].argmax())])
+            n += 1
+    if n != len(probs):
+        raise ValueError(f"{probs_path} has {len(probs)} rows but {scored_path} has {n} scored pairs")
+
+def main():
+    ap = argparse.ArgumentParser(description="Promote scored pairs that clear their class threshold to edges.")
+    ap.add_argument('scored_path')
+    ap.add_argument('thr_path')
+    ap.add_argument('--probs', default=None, help="decide on this probability sidecar (re_score --probs) instead of pred/prob")
+    args = ap.parse_args()
+    thresholds = json.load(open(args.thr_path, 'r', encoding='utf-8'))
+    if args.probs:
+        edges = iter_edges_from_probs(args.scored_path, args.probs, thresholds)
+    else:
+        edges = iter_edges(read_records(args.scored_path), thresholds)  # flat or normalized layout
+    for edge in edges:
+        sys.stdout.write(json.dumps(edge, ensure_ascii=False) + "\n")
 
 if __name__ == '__main__':
     main()
-
-
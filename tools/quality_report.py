@@ -1,4 +1,9 @@
-import json, sys, os, collections, statistics
+import json, sys, os, collections, statistics, argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from groundkg.pack_io import iter_records  # noqa: E402
 
 def safe_load_jsonl(path):
     if not os.path.exists(path):
@@ -15,14 +20,35 @@ def safe_load_jsonl(path):
                 continue
     return rows
 
+def scored_stats(scored_path, probs_path=None):
+    """(count per predicted class, mean top probability per predicted class)."""
+    if probs_path:
+        from groundkg import probs_io  # numpy; only needed with --probs
+
+        probs, classes = probs_io.load(probs_path)
+        by_class = probs_io.probs_by_class(probs, classes)
+        counts = collections.Counter({lbl: len(p) for lbl, p in by_class.items()})
+        return counts, {lbl: float(p.astype('float64').mean()) for lbl, p in by_class.items()}
+    pred_counts = collections.Counter()
+    pred_probs = collections.defaultdict(list)
+    for r in iter_records(safe_load_jsonl(scored_path), expand=False):  # flat or normalized layout
+        lbl = r.get('pred','none')
+        p = float(r.get('prob',0))
+        pred_counts[lbl] += 1
+        pred_probs[lbl].append(p)
+    return pred_counts, {lbl: statistics.mean(probs) for lbl, probs in pred_probs.items() if probs}
+
 def main():
-    # Inputs
-    scored_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('out','pack.scored.jsonl')
-    edges_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join('out','edges.jsonl')
-    train_path = sys.argv[3] if len(sys.argv) > 3 else os.path.join('training','re_train.jsonl')
-    thr_path = sys.argv[4] if len(sys.argv) > 4 else os.path.join('models','thresholds.json')
+    ap = argparse.ArgumentParser(description="Print scored/edge/training/threshold statistics.")
+    ap.add_argument('scored_path', nargs='?', default=os.path.join('out','pack.scored.jsonl'))
+    ap.add_argument('edges_path', nargs='?', default=os.path.join('out','edges.jsonl'))
+    ap.add_argument('train_path', nargs='?', default=os.path.join('training','re_train.jsonl'))
+    ap.add_argument('thr_path', nargs='?', default=os.path.join('models','thresholds.json'))
+    ap.add_argument('--probs', default=None, help="read scored stats from this probability sidecar (re_score --probs)")
+    args = ap.parse_args()
+    edges_path, train_path, thr_path = args.edges_path, args.train_path, args.thr_path
 
-    scored = safe_load_jsonl(scored_path)
+    pred_counts, pred_avg = scored_stats(args.scored_path, args.probs)
     edges = safe_load_jsonl(edges_path)
     train = safe_load_jsonl(train_path)
     thresholds = {}
@@ -32,15 +58,6 @@ def main():
         except Exception:
             thresholds = {}
 
-    # Scored stats
-    pred_counts = collections.Counter()
-    pred_probs = collections.defaultdict(list)
-    for r in scored:
-        lbl = r.get('pred','none')
-        p = float(r.get('prob',0))
-        pred_counts[lbl] += 1
-        pred_probs[lbl].append(p)
-
     # Edge stats
     edge_counts = collections.Counter(e.get('predicate','') for e in edges)
     total_edges = len(edges)
@@ -52,8 +69,7 @@ def main():
     print('=== Quality Report ===')
     print('- Scored predictions per class:')
     for lbl, cnt in pred_counts.most_common():
-        probs = pred_probs.get(lbl, [])
-        avg = statistics.mean(probs) if probs else 0.0
+        avg = pred_avg.get(lbl, 0.0)
         print(f"  {lbl:16s} count={cnt:6d} avg_prob={avg:.3f} thr={thresholds.get(lbl,'-')}")
     print('- Edges emitted (post-threshold):')
     print(f"  total_edges={total_edges}")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Run NER → candidates → scoring → edges in one process, streaming records in memory.
+
+Each stage is the generator API of its module (``ner_tag.iter_sentences``,
+``candidates.iter_candidates``, ``re_score.iter_scored``,
+``promote_from_scored.iter_edges``, ``dedupe_edges.iter_unique``). NER,
+pairing and scoring each run in their own thread behind a bounded queue, so
+nothing is serialized between stages and model work overlaps. Intermediate
+JSONL files are only written when asked for (--ner-out/--cand-out/--scored-out);
+their content matches the per-stage scripts.
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from groundkg import candidates, dedupe_edges, ner_tag, re_score, re_types  # noqa: E402
+from groundkg.streams import threaded  # noqa: E402
+from promote_from_scored import iter_edges  # noqa: E402
+
+
+def tap(records, path):
+    """Pass records through, also writing them as JSONL to ``path`` if given."""
+    if not path:
+        yield from records
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            yield rec
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("input", nargs="?", default=ner_tag.CORPUS_DIR, help="file, directory, glob or manifest")
+    ap.add_argument("--profile", choices=sorted(ner_tag.PROFILES), default="accurate")
+    ap.add_argument("--model", default=None)
+    ap.add_argument("--batch-size", type=int, default=8, help="nlp.pipe batch size")
+    ap.add_argument("--chunk-chars", type=int, default=0)
+    ap.add_argument("--cache-dir", default=None, help="NER sentence cache (see ner_tag --cache-dir)")
+    ap.add_argument("--onnx", default="models/promoter_v1.onnx")
+    ap.add_argument("--classes", default="models/classes.json")
+    ap.add_argument("--thresholds", default="models/thresholds.json")
+    ap.add_argument("--type-filter", action="store_true", help="drop pairs no predicate's entity types accept before scoring")
+    ap.add_argument("--queue-size", type=int, default=16, help="bound of each inter-stage queue (in chunks of 64)")
+    ap.add_argument("--ner-out", default=None, help="also write sentence records here")
+    ap.add_argument("--cand-out", default=None, help="also write candidates here")
+    ap.add_argument("--scored-out", default=None, help="also write scored records here")
+    ap.add_argument("--out", default=None, help="deduplicated edges (default: stdout)")
+    args = ap.parse_args()
+    if not os.path.exists(args.onnx):
+        print(f"ERROR: {args.onnx} missing", file=sys.stderr)
+        return 2
+
+    nlp = ner_tag.load_pipeline(args.model, profile=args.profile)
+    classes = json.load(open(args.classes, "r", encoding="utf-8"))
+    sess = re_score.load_session(args.onnx)
+    embedder = None if re_score.is_fused(sess) else re_score.get_embedder()
+    thresholds = json.load(open(args.thresholds, "r", encoding="utf-8"))
+
+    docs = ner_tag.iter_documents(args.input)
+    sents = ner_tag.iter_sentences(nlp, docs, args.batch_size, args.chunk_chars, args.cache_dir)
+    sents = threaded(tap(sents, args.ner_out), args.queue_size)
+    cands = candidates.iter_candidates(sents)
+    if args.type_filter:
+        prune_stats = {}
+        cands = re_types.prune_candidates(cands, re_types.allowed_label_pairs(classes), prune_stats)
+    cands = threaded(tap(cands, args.cand_out), args.queue_size)
+    scored = threaded(tap(re_score.iter_scored(cands, embedder, sess, classes), args.scored_out), args.queue_size)
+    edges = dedupe_edges.iter_unique(iter_edges(scored, thresholds))
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    n = 0
+    try:
+        for edge in edges:
+            out.write(json.dumps(edge, ensure_ascii=False) + "\n")
+            n += 1
+    finally:
+        if args.out:
+            out.close()
+    print(f"Wrote {n} edges", file=sys.stderr)
+    if args.type_filter:
+        re_types.report_pruning(prune_stats)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,6 +6,7 @@ import argparse
 import ast
 import pathlib
 import sys
+import threading
 from trace import Trace
 
 import pytest
@@ -28,7 +29,11 @@ def main() -> int:
         parser.error(f"Package path {pkg_path} not found")
 
     tracer = Trace(count=True, trace=False, ignoredirs=[sys.prefix, sys.exec_prefix])
-    exit_code = tracer.runfunc(pytest.main, args.pytest_args or [])
+    threading.settrace(tracer.globaltrace)  # also count code run on threads (servers, pipelines)
+    try:
+        exit_code = tracer.runfunc(pytest.main, args.pytest_args or [])
+    finally:
+        threading.settrace(None)
     if exit_code != 0:
         return exit_code
 
@@ -1,5 +1,11 @@
 # tools/select_training_from_scored.py
 import sys, json, os, random
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from groundkg.pack_io import iter_records  # noqa: E402
+
 random.seed(0)
 
 POS_THR = float(os.environ.get("GK_POS_THR", "0.95"))
@@ -23,10 +29,7 @@ def adaptive_thresholds(inp_path, initial_pos_thr, initial_neg_thr, min_examples
     neg_count = 0
     
     with open(inp_path, "r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            r = json.loads(line)
+        for r in iter_records((json.loads(line) for line in f if line.strip()), expand=False):
             lbl, p = r["pred"], float(r["prob"])
             if lbl != "none" and p >= initial_pos_thr:
                 pos_count[lbl] = pos_count.get(lbl, 0) + 1
@@ -76,8 +79,7 @@ def main():
     
     pos, pos_all, neg = {}, {}, []
     with open(inp,"r",encoding="utf-8") as f:
-        for line in f:
-            r = json.loads(line)
+        for r in iter_records(json.loads(line) for line in f if line.strip()):
             lbl, p = r["pred"], float(r["prob"])
             if lbl != "none" and p >= pos_thr:
                 pos.setdefault(lbl, []).append({"text": mark(r["text"], r["subject"], r["object"]), "label": lbl})
@@ -126,10 +128,7 @@ def main():
     if patt_map and os.path.exists(cand_file):
         try:
             with open(cand_file, "r", encoding="utf-8") as cf:
-                for line in cf:
-                    if not line.strip():
-                        continue
-                    c = json.loads(line)
+                for c in iter_records(json.loads(line) for line in cf if line.strip()):
                     text = c["text"]; s=c["subject"]; o=c["object"]
                     s0,s1 = s["start"], s["end"]; o0,o1 = o["start"], o["end"]
                     lo, hi = (s1, o0) if s1 <= o0 else (o1, s0)
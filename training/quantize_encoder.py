@@ -0,0 +1,108 @@
+# training/quantize_encoder.py
+"""Dynamically quantize the fused scoring model to INT8, gated on the dev set.
+
+The encoder weights are quantized to int8 with onnxruntime's dynamic
+quantization, and activations are quantized per batch at run time. Both
+models then score training/re_dev.jsonl. The INT8 model is kept only if its
+predicted labels agree with the FP32 ones at least --min-agreement of the
+time and, for every class, the mean |Δp| stays within --max-prob-diff.
+Otherwise it is deleted and the script exits with status 1.
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+FP32_PATH = "models/promoter_v1.fused.onnx"
+INT8_PATH = "models/promoter_v1.fused.int8.onnx"
+
+
+def quantize(fp32_path, int8_path):
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    # re_score reads the tokenizer from the metadata; make sure it survives
+    src, dst = onnx.load(fp32_path), onnx.load(int8_path)
+    have = {p.key for p in dst.metadata_props}
+    for p in src.metadata_props:
+        if p.key not in have:
+            dst.metadata_props.add(key=p.key, value=p.value)
+    onnx.save(dst, int8_path)
+
+
+def dev_probs(path, classes, texts, batch_size=32):
+    import onnxruntime as ort
+
+    from groundkg.re_score import FusedHead
+
+    head = FusedHead(ort.InferenceSession(path, providers=["CPUExecutionProvider"]), classes)
+    return np.concatenate([head.probs(texts[i : i + batch_size]) for i in range(0, len(texts), batch_size)])
+
+
+def compare(ref, got, classes):
+    """Label agreement plus per-class mean/max |Δp| of ``got`` against ``ref`` ([N, C] each)."""
+    diff = np.abs(got.astype(np.float64) - ref)
+    return {
+        "n": len(ref),
+        "label_agreement": float((ref.argmax(1) == got.argmax(1)).mean()),
+        "per_class": {
+            c: {"mean_abs_diff": float(diff[:, i].mean()), "max_abs_diff": float(diff[:, i].max())}
+            for i, c in enumerate(classes)
+        },
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("fp32", nargs="?", default=FP32_PATH, help="fused FP32 model (train_re_transformers --export-fused)")
+    ap.add_argument("int8", nargs="?", default=INT8_PATH)
+    ap.add_argument("--dev", default="training/re_dev.jsonl")
+    ap.add_argument("--classes", default="models/classes.json")
+    ap.add_argument("--min-agreement", type=float, default=0.99, help="minimum predicted-label agreement with FP32")
+    ap.add_argument("--max-prob-diff", type=float, default=0.02, help="maximum per-class mean |Δp| against FP32")
+    ap.add_argument("--report", default=None, help="also write the comparison as JSON here")
+    args = ap.parse_args()
+
+    if not os.path.exists(args.fp32):
+        print(f"ERROR: {args.fp32} missing (train with --export-fused first)", file=sys.stderr)
+        return 2
+    texts = [json.loads(l)["text"] for l in open(args.dev, "r", encoding="utf-8") if l.strip()]
+    if not texts:
+        print(f"ERROR: no dev examples in {args.dev}; cannot check the INT8 model", file=sys.stderr)
+        return 2
+    classes = json.load(open(args.classes, "r", encoding="utf-8"))
+
+    print(f"Quantizing {args.fp32} → {args.int8} (dynamic INT8)...")
+    quantize(args.fp32, args.int8)
+    result = compare(dev_probs(args.fp32, classes, texts), dev_probs(args.int8, classes, texts), classes)
+    result["model_mb"] = {"fp32": os.path.getsize(args.fp32) / 1e6, "int8": os.path.getsize(args.int8) / 1e6}
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    print(f"Dev examples: {result['n']}, label agreement {result['label_agreement']:.4f}")
+    failed = result["label_agreement"] < args.min_agreement
+    for c, d in result["per_class"].items():
+        bad = d["mean_abs_diff"] > args.max_prob_diff
+        failed = failed or bad
+        print(f"  {c:24s} mean |Δp| {d['mean_abs_diff']:.4f}  max |Δp| {d['max_abs_diff']:.4f}{'  FAIL' if bad else ''}")
+    if failed:
+        os.remove(args.int8)
+        print(
+            f"ERROR: INT8 model rejected (need agreement >= {args.min_agreement}, "
+            f"per-class mean |Δp| <= {args.max_prob_diff}); removed {args.int8}",
+            file=sys.stderr,
+        )
+        return 1
+    print(f"Saved {args.int8} ({result['model_mb']['int8']:.1f} MB vs {result['model_mb']['fp32']:.1f} MB FP32)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,10 @@
 # training/train_re_transformers.py
+import argparse
 import json
 import os
+import sys
+from pathlib import Path
+
 import numpy as np
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import precision_recall_curve
@@ -8,9 +12,12 @@ from skl2onnx import convert_sklearn
 from skl2onnx.common.data_types import FloatTensorType
 from sentence_transformers import SentenceTransformer
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
 # Use lightweight, fast model with good quality
 MODEL_NAME = "all-MiniLM-L6-v2"
 EMBEDDING_DIM = 384  # Dimension for all-MiniLM-L6-v2
+FUSED_PATH = "models/promoter_v1.fused.onnx"
 
 
 def load_jsonl(p):
@@ -51,7 +58,97 @@ def pick_thresholds(clf, X, y, classes, target_prec=0.90):
     return thresholds
 
 
+def export_fused(embedder, clf, path, opset=14):
+    """Export tokenizer outputs → transformer → mean pooling → normalize → LR as one ONNX graph.
+
+    The fast tokenizer is stored in the model metadata, so groundkg/re_score.py
+    can score with onnxruntime + tokenizers alone (no torch).
+    """
+    import onnx
+    import torch
+    from sentence_transformers.models import Normalize, Pooling
+
+    transformer = embedder[0]
+    pooling = [m for m in embedder if isinstance(m, Pooling)]
+    if len(pooling) != 1 or not pooling[0].pooling_mode_mean_tokens:
+        raise SystemExit(f"--export-fused supports mean pooling only ({MODEL_NAME} uses it)")
+    normalize = any(isinstance(m, Normalize) for m in embedder)
+    coef = torch.tensor(clf.coef_, dtype=torch.float32)
+    intercept = torch.tensor(clf.intercept_, dtype=torch.float32)
+    # sklearn's predict_proba: liblinear / binary problems are one-vs-rest
+    ovr = clf.solver == "liblinear" or len(clf.classes_) <= 2 or clf.multi_class == "ovr"
+
+    class Fused(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = transformer.auto_model
+
+        def forward(self, input_ids, attention_mask):
+            tokens = self.model(input_ids=input_ids, attention_mask=attention_mask)[0]
+            mask = attention_mask.unsqueeze(-1).to(tokens.dtype)
+            emb = (tokens * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+            if normalize:
+                emb = torch.nn.functional.normalize(emb, p=2, dim=1)
+            scores = emb @ coef.T + intercept
+            if coef.shape[0] == 1:  # binary: one decision function
+                p = torch.sigmoid(scores)
+                return torch.cat([1 - p, p], dim=1)
+            if ovr:
+                p = torch.sigmoid(scores)
+                return p / p.sum(1, keepdim=True)
+            return torch.softmax(scores, dim=1)
+
+    tok = transformer.tokenizer
+    dummy = tok(["[E1]a[/E1] b [E2]c[/E2]"], return_tensors="pt")
+    model = Fused().eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dummy["input_ids"], dummy["attention_mask"]),
+            path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["probabilities"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "seq"},
+                "attention_mask": {0: "batch", 1: "seq"},
+                "probabilities": {0: "batch"},
+            },
+            opset_version=opset,
+        )
+    onnx_model = onnx.load(path)
+    meta = {
+        "tokenizer": tok.backend_tokenizer.to_str(),
+        "max_length": str(embedder.max_seq_length),
+        "pad_id": str(tok.pad_token_id),
+        "pad_token": tok.pad_token,
+        "encoder": MODEL_NAME,
+    }
+    for key, value in meta.items():
+        onnx_model.metadata_props.add(key=key, value=value)
+    onnx.save(onnx_model, path)
+
+
+def check_fused(path, classes, texts, expected):
+    """Compare the fused model with encoder + LR on the dev texts; returns (argmax agreement, max |Δp|)."""
+    import onnxruntime as ort
+
+    from groundkg.re_score import FusedHead
+
+    head = FusedHead(ort.InferenceSession(path, providers=["CPUExecutionProvider"]), classes)
+    got = np.concatenate([head.probs(texts[i : i + 32]) for i in range(0, len(texts), 32)])
+    agree = float((got.argmax(1) == expected.argmax(1)).mean()) if len(texts) else 1.0
+    return agree, float(np.abs(got - expected).max()) if len(texts) else 0.0
+
+
 def main():
+    ap = argparse.ArgumentParser(description="Train the LR head on sentence-transformer embeddings and export ONNX.")
+    ap.add_argument(
+        "--export-fused",
+        action="store_true",
+        help=f"also write {FUSED_PATH}: encoder + pooling + head in one graph, scorable without torch",
+    )
+    args = ap.parse_args()
+
     os.makedirs("models", exist_ok=True)
     (Xtr, ytr), (Xdv, ydv) = load_data("training/re_train.jsonl", "training/re_dev.jsonl")
 
@@ -89,6 +186,12 @@ def main():
         f.write(onnx_model.SerializeToString())
 
     print(f"Saved models/promoter_v1.onnx, thresholds.json, classes.json")
+
+    if args.export_fused:
+        print(f"Exporting fused encoder + head to {FUSED_PATH}...")
+        export_fused(embedder, clf, FUSED_PATH)
+        agree, max_diff = check_fused(FUSED_PATH, classes, Xdv, clf.predict_proba(Xdv_embeddings))
+        print(f"Fused vs encoder + head on dev: argmax agreement {agree:.4f}, max |Δp| {max_diff:.2e}")
     print(f"Model uses {MODEL_NAME} embeddings ({EMBEDDING_DIM} dimensions)")
 
 